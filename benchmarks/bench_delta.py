@@ -0,0 +1,156 @@
+"""
+差分フィード（indexer/delta.py）のベンチマーク。
+seed 付きの合成インデックスを1日ごとに更新（追加・分析結果による変更・削除）しながら
+main.py と同じ経路で global-index.json と差分フィードを書き出し、
+毎日・毎週同期するクライアントと最終日に初めて同期するクライアントの転送量を、
+毎回 global-index.json（gzip）を丸ごと取得する場合と比べる。
+
+    python -m benchmarks.bench_delta --size 20000 --days 60 --added 50 --changed 30 --removed 5
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.bench_scale import environment
+from benchmarks.corpus import CATEGORIES, ORGANIZATIONS, REGIONS, VOCABULARY
+from indexer.delta import DeltaClient, DeltaPublisher, doc_key
+from indexer.jsonstream import JsonArrayWriter
+from indexer.incremental import date_key
+
+
+def make_doc(n, day, rng):
+    return {
+        "title": " ".join(rng.choice(VOCABULARY) for _ in range(6)).title(),
+        "url": f"https://gov{n % 190}.example/documents/{n}.pdf",
+        "date": day.isoformat(),
+        "summary": " ".join(rng.choice(VOCABULARY) for _ in range(30)),
+        "status_level": rng.choice(("Info", "Notice", "Warning")),
+        "organization": rng.choice(ORGANIZATIONS),
+        "category": rng.choice(CATEGORIES),
+        "country_code": f"c{n % 190}",
+        "region": REGIONS[n % len(REGIONS)],
+    }
+
+
+def publish(corpus, out_dir):
+    """main.py と同じく global-index.json と差分フィードを同時に書き出す"""
+    index_path = out_dir / "global-index.json"
+    start = time.perf_counter()
+    with JsonArrayWriter(index_path) as writer, DeltaPublisher(out_dir / "delta", previous=index_path) as delta:
+        for doc in sorted(corpus.values(), key=date_key, reverse=True):
+            writer.write(doc)
+            delta.add(doc)
+    elapsed = time.perf_counter() - start
+    full_gz = len(gzip.compress(index_path.read_bytes(), compresslevel=9, mtime=0))
+    written = 0
+    if delta.result:
+        entries = delta.result["deltas"][-1:] + [s for s in delta.result["snapshots"] if s["version"] == delta.version + 1]
+        written = sum(e["bytes"] + e["gz_bytes"] for e in entries if e["version"] == delta.result["version"])
+        written += (out_dir / "delta" / "version.json").stat().st_size
+    return elapsed, index_path.stat().st_size, full_gz, written
+
+
+def run(size=20000, days=60, added=50, changed=30, removed=5, seed=0):
+    rng = random.Random(seed)
+    start_day = date(2025, 1, 1)
+    corpus = {}
+    for n in range(size):
+        doc = make_doc(n, start_day - timedelta(days=rng.randint(0, 3650)), rng)
+        corpus[doc_key(doc)] = doc
+    next_n = size
+
+    clients = {"daily": 1, "weekly": 7}
+    totals = {name: {"bytes": 0, "full_bytes": 0, "syncs": 0, "modes": {}} for name in clients}
+    publish_seconds = []
+    written_bytes = []
+    index_bytes = []
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        feed = tmp / "site" / "delta"
+        states = {name: DeltaClient(feed, tmp / "clients" / name) for name in clients}
+        for day in range(days):
+            today = start_day + timedelta(days=day)
+            if day:
+                keys = list(corpus)
+                for key in rng.sample(keys, min(removed, len(keys))):
+                    del corpus[key]
+                for key in rng.sample(list(corpus), min(changed, len(corpus))):
+                    corpus[key] = dict(corpus[key], summary=f"AI要約（更新 {today}）", risk_level="Warning")
+                for _ in range(added):
+                    doc = make_doc(next_n, today, rng)
+                    corpus[doc_key(doc)] = doc
+                    next_n += 1
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, raw_bytes, full_gz, written = publish(corpus, tmp / "site")
+            publish_seconds.append(elapsed)
+            index_bytes.append(raw_bytes)
+            written_bytes.append(written)
+
+            for name, every in clients.items():
+                if day % every:
+                    continue
+                client = states[name]
+                result = client.sync()
+                total = totals[name]
+                total["bytes"] += result["bytes"]
+                total["full_bytes"] += full_gz
+                total["syncs"] += 1
+                total["modes"][result["mode"]] = total["modes"].get(result["mode"], 0) + 1
+                mismatches += client.docs != corpus
+
+        # 最終日に初めて同期するクライアント（スナップショット + 差分）
+        late = DeltaClient(feed, tmp / "clients" / "late")
+        late_result = late.sync()
+        mismatches += late.docs != corpus
+        feed_files = sum(1 for p in feed.rglob("*") if p.is_file())
+        feed_bytes = sum(p.stat().st_size for p in feed.rglob("*") if p.is_file())
+
+    for total in totals.values():
+        total["saving"] = round(total["full_bytes"] / total["bytes"], 1) if total["bytes"] else None
+    return {
+        "docs": len(corpus),
+        "clients": totals,
+        "late_client": dict(late_result, full_bytes=full_gz),
+        "mismatches": mismatches,
+        "publish_seconds_median": round(sorted(publish_seconds)[len(publish_seconds) // 2], 4),
+        "global_index_bytes": index_bytes[-1],
+        # 1回の実行で書き換わるファイルの大きさ（global-index.json は毎回全体が書き換わる）
+        "feed_bytes_written_median": sorted(written_bytes)[len(written_bytes) // 2],
+        "feed_files": feed_files,
+        "feed_bytes_on_disk": feed_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes transferred by delta sync vs full index downloads")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--added", type=int, default=50, help="1日あたりの追加件数")
+    parser.add_argument("--changed", type=int, default=30, help="1日あたりの変更件数")
+    parser.add_argument("--removed", type=int, default=5, help="1日あたりの削除件数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    args = parser.parse_args()
+    result = {
+        "benchmark": "delta",
+        "environment": environment(),
+        "params": {"size": args.size, "days": args.days, "added": args.added,
+                   "changed": args.changed, "removed": args.removed, "seed": args.seed},
+        "run": run(args.size, args.days, args.added, args.changed, args.removed, args.seed),
+    }
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+SourceVerifier のベンチマーク。ローカルの文書掲載ページの偽サーバー（2ドメイン）に対して
+AI が返しそうな候補（掲載ページ・リダイレクト・PDF 直リンク・404・表記揺れの重複）を確認し、
+逐次確認と並行確認の所要時間、ドメインごとの同時接続数、キャッシュ再実行時のリクエスト数を比べる。
+
+    python -m benchmarks.bench_discovery --candidates 200 --latency 0.05 --workers 16 --per-domain 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.bench_scale import environment
+from benchmarks.fakes import LocalCatalogServer
+from collectors.source_verifier import SourceVerifier, VerificationCache
+
+
+def make_candidates(port, count):
+    """候補の種類を順に混ぜる。ドメインは 127.0.0.1 と localhost の2つ"""
+    candidates = []
+    for i in range(count):
+        host = "127.0.0.1" if i % 2 else "localhost"
+        kind = i % 6
+        if kind == 0:
+            url = f"http://{host}:{port}/redirect/{i}"
+        elif kind == 1:
+            url = f"http://{host}:{port}/report/{i}.pdf"
+        elif kind == 2:
+            url = f"http://{host}:{port}/missing/{i}"
+        elif kind == 3:
+            # 登録済みページの表記揺れ（取得せずに重複と判定される）
+            url = f"http://www.localhost:{port}/site/1/publications/index.html"
+        else:
+            url = f"http://{host}:{port}/site/{i}/publications"
+        candidates.append({"id": f"cand_{i}", "country": "XXX", "org": f"ORG{i}", "url": url, "category": "Economic"})
+    return candidates
+
+
+def run_mode(server, candidates, existing, cache, workers, per_domain):
+    server.requests = 0
+    server.max_in_flight.clear()
+    verifier = SourceVerifier(max_workers=workers, per_domain=per_domain, timeout=10, cache=cache)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        checks = verifier.verify(candidates, existing)
+    elapsed = time.perf_counter() - start
+    verifier.close()
+    return checks, {
+        "elapsed": round(elapsed, 4),
+        "requests": server.requests,
+        "max_in_flight_per_domain": max(server.max_in_flight.values(), default=0),
+        "statuses": dict(Counter(c.status for c in checks)),
+        "cached": sum(c.cached for c in checks),
+    }
+
+
+def run(count=200, latency=0.05, workers=16, per_domain=4):
+    with LocalCatalogServer(latency=latency) as server, tempfile.TemporaryDirectory() as tmp:
+        port = server.httpd.server_port
+        existing = [{"id": "registered", "url": f"http://localhost:{port}/site/1/publications"}]
+        candidates = make_candidates(port, count)
+
+        sequential_checks, sequential = run_mode(
+            server, candidates, existing, VerificationCache(Path(tmp) / "sequential.json"), 1, 1)
+        cache = VerificationCache(Path(tmp) / "concurrent.json")
+        concurrent_checks, concurrent = run_mode(server, candidates, existing, cache, workers, per_domain)
+        # 保存したキャッシュを読み直して再実行（ページは取得しない）
+        _, cached = run_mode(server, candidates, existing, VerificationCache(cache.path), workers, per_domain)
+
+    same = [(c.status, c.score) for c in sequential_checks] == [(c.status, c.score) for c in concurrent_checks]
+    return {
+        "candidates": count,
+        "sequential": sequential,
+        "concurrent": concurrent,
+        "cached_rerun": cached,
+        "speedup": round(sequential["elapsed"] / concurrent["elapsed"], 2) if concurrent["elapsed"] else None,
+        "same_results": same,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent verification of discovered sources")
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="偽サーバーの応答遅延（秒）")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-domain", type=int, default=4)
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    args = parser.parse_args()
+    result = {
+        "benchmark": "discovery",
+        "environment": environment(),
+        "params": {"candidates": args.candidates, "latency": args.latency,
+                   "workers": args.workers, "per_domain": args.per_domain},
+        "run": run(args.candidates, args.latency, args.workers, args.per_domain),
+    }
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+ドキュメントの持ち方ごとのメモリと CPU を比べるベンチマーク。
+seed 付きの合成コーパスを NDJSON に書き出し、表現ごとに別プロセスで読み込んで
+保持メモリ（RSS の増分）と、並べ替え・絞り込み・集計の所要時間を計測する。
+
+    python -m benchmarks.bench_documents --size 1000000 --out bench_documents.json
+
+表現:
+    dict            json.loads した dict のリスト（これまでの経路）
+    dict_interned   dict のリスト + 分類フィールドの intern（SegmentStore の読み込みと同じ）
+    document        __slots__ の Document のリスト（比較用。本番の経路では使わない）
+    batch           列指向の DocumentBatch（分類フィールドと日付はコード配列）
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_scale import environment
+from benchmarks.corpus import make_collectors
+from indexer.aggregates import Rollup
+from indexer.document import CATEGORICAL_FIELDS, FIELDS, DocumentBatch, intern_fields, intern_value
+from indexer.incremental import date_key
+from indexer.jsonstream import NdjsonWriter, iter_ndjson
+
+REPRESENTATIONS = ("dict", "dict_interned", "document", "batch")
+
+_FIELD_SET = frozenset(FIELDS)
+_INTERNED_FIELDS = frozenset(CATEGORICAL_FIELDS + ("date",))
+_MISSING = object()
+
+
+class Document:
+    """
+    __slots__ で持つドキュメント。よく使うフィールドは属性、それ以外は extra（dict）に入れる。
+    分類フィールドは intern 済みの文字列を共有する。dict と同じ get / [] / in / update が使えるので、
+    Rollup などの dict 前提の処理にもそのまま渡せる。
+    """
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        self.extra = None
+        self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        doc = cls.__new__(cls)
+        extra = None
+        for key, value in data.items():
+            if key in _INTERNED_FIELDS:
+                setattr(doc, key, intern_value(value))
+            elif key in _FIELD_SET:
+                setattr(doc, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        doc.extra = extra
+        return doc
+
+    def to_dict(self):
+        """JSON に書き出せる dict（既知のフィールド -> extra の順）"""
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, intern_value(value) if key in _INTERNED_FIELDS else value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def update(self, data):
+        for key, value in data.items():
+            self[key] = value
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def __repr__(self):
+        return f"Document({self.to_dict()!r})"
+
+
+def batch_where(batch, **conditions):
+    """分類フィールドの値が一致する行番号（コード配列の上で比べる）"""
+    rows = range(len(batch))
+    for field, value in conditions.items():
+        code = batch.vocab[field].codes.get(value)
+        if code is None:
+            return []
+        column = batch.codes[field]
+        rows = [i for i in rows if column[i] == code]
+    return list(rows)
+
+
+def write_corpus(path, size, countries=190, seed=0):
+    """main.py の国ストア読み込みと同じく country_code / region を付けて NDJSON に書き出す"""
+    with NdjsonWriter(path) as writer:
+        for collector in make_collectors(size, countries=countries, seed=seed):
+            for items, _ in collector.fetch_pages():
+                for item in items:
+                    doc = collector.normalize(item)
+                    doc["country_code"] = collector.country_code
+                    doc["region"] = collector.region
+                    writer.write(doc)
+    return writer.count
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def load(representation, path):
+    docs = iter_ndjson(path)
+    if representation == "dict":
+        return list(docs)
+    if representation == "dict_interned":
+        return [intern_fields(doc) for doc in docs]
+    if representation == "document":
+        return [Document.from_dict(doc) for doc in docs]
+    return DocumentBatch.from_docs(docs)
+
+
+def run_representation(representation, path, filter_country, filter_level):
+    """1つの表現を読み込み、保持メモリと各操作の時間を返す（別プロセスで実行する）"""
+    gc.collect()
+    before = rss_mb()
+    start = time.perf_counter()
+    data = load(representation, path)
+    load_time = time.perf_counter() - start
+    gc.collect()
+    held = rss_mb() - before if before is not None else None
+
+    timings = {}
+    start = time.perf_counter()
+    if representation == "batch":
+        order = data.order_by_date()
+    else:
+        order = sorted(data, key=date_key, reverse=True)
+    timings["sort_by_date"] = time.perf_counter() - start
+    del order
+
+    start = time.perf_counter()
+    if representation == "batch":
+        matched = len(batch_where(data, country_code=filter_country, status_level=filter_level))
+    else:
+        matched = sum(1 for doc in data
+                      if doc.get("country_code") == filter_country and doc.get("status_level") == filter_level)
+    timings["filter"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if representation == "batch":
+        rollup = Rollup.from_batch(data)
+    else:
+        rollup = Rollup.from_docs(data)
+    timings["aggregate"] = time.perf_counter() - start
+
+    return {
+        "docs": len(data),
+        "held_memory_mb": round(held, 1) if held is not None else None,
+        "bytes_per_doc": round(held * 1024 * 1024 / len(data), 1) if held is not None and len(data) else None,
+        "load_time": round(load_time, 4),
+        "sort_by_date": round(timings["sort_by_date"], 4),
+        "filter": round(timings["filter"], 4),
+        "filter_matched": matched,
+        "aggregate": round(timings["aggregate"], 4),
+        "aggregate_total": rollup.total,
+    }
+
+
+def _child(conn, *args):
+    try:
+        conn.send(run_representation(*args))
+    except Exception as e:
+        conn.send({"error": repr(e)})
+    finally:
+        conn.close()
+
+
+def run(size, representations=REPRESENTATIONS, countries=190, seed=0, verbose=False):
+    ctx = multiprocessing.get_context("fork")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "corpus.jsonl"
+        start = time.perf_counter()
+        written = write_corpus(path, size, countries, seed)
+        if verbose:
+            print(f"  [Bench] corpus: {written} docs, {path.stat().st_size / 1024 / 1024:.1f}MB "
+                  f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        # 最初の文書の国と重要度で絞り込む（全表現で同じ条件）
+        first = next(iter_ndjson(path))
+        for representation in representations:
+            # 表現ごとに新しいプロセスで測り、前の表現が解放したメモリの再利用に影響されないようにする
+            parent, child = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_child, args=(child, representation, path,
+                                                       first["country_code"], first["status_level"]))
+            process.start()
+            child.close()
+            results[representation] = parent.recv()
+            process.join()
+            if verbose:
+                print(f"  [Bench] {representation:<14} {results[representation]}", file=sys.stderr)
+
+    base = results.get("dict")
+    if base and "error" not in base:
+        for representation, r in results.items():
+            if "error" in r or representation == "dict":
+                continue
+            r["vs_dict"] = {
+                key: round(base[key] / r[key], 2) if r[key] else None
+                for key in ("held_memory_mb", "load_time", "sort_by_date", "filter", "aggregate")
+            }
+    return {"size": size, "countries": countries, "representations": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory / CPU of dict vs slotted vs columnar documents")
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--countries", type=int, default=190)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", default="", help=f"計測する表現（カンマ区切り）: {','.join(REPRESENTATIONS)}")
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    representations = [r.strip() for r in args.only.split(",") if r.strip()] or list(REPRESENTATIONS)
+    result = {
+        "benchmark": "documents",
+        "environment": environment(),
+        "params": {"size": args.size, "countries": args.countries, "seed": args.seed},
+        "run": run(args.size, representations, args.countries, args.seed, args.verbose),
+    }
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
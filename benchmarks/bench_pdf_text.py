@@ -0,0 +1,160 @@
+"""
+PDFのテキスト抽出 + map-reduce 要約のベンチマーク。
+seed 付きで合成PDF（短い文書・長い予算書・テキスト層のないスキャンPDF）を作り、
+偽モデルに対して「全PDFをアップロード」と「テキストだけ送信（長文は map-reduce）」の
+所要時間・送信量・モデル呼び出し回数と、テキストキャッシュの効果を比べる。
+偽モデルの遅延は 1回あたり --latency 秒 + 送信量に比例する分（--upload-seconds-per-mb / --seconds-per-100k-chars）。
+
+    python -m benchmarks.bench_pdf_text --short 12 --long 4 --scanned 3 --long-pages 150
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from benchmarks.bench_scale import environment
+from benchmarks.corpus import VOCABULARY
+from benchmarks.fakes import FakeModelClient
+from collectors.analysis_scheduler import AnalysisScheduler
+from collectors.pdf_text import PDFTextCache, extractor_name
+from collectors.sources.pdf_analyzer import PDFAnalyzer
+
+
+def write_pdf(path, pages, rng, lines_per_page=45, image_bytes=20000):
+    """
+    pages ページのPDFを書き出す。text=False のページは画像（スキャン相当）だけを持つ。
+    pages は各ページがテキストを持つかどうかの bool のリスト。
+    """
+    objects = [None, b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for has_text in pages:
+        page_num = len(objects)
+        content_num, image_num = page_num + 1, page_num + 2
+        kids.append(page_num)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {content_num} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> /XObject << /Im1 {image_num} 0 R >> >> >>".encode())
+        ops = [b"q 200 0 0 100 72 600 cm /Im1 Do Q"]
+        if has_text:
+            ops.append(b"BT /F1 10 Tf 12 TL 72 560 Td")
+            for _ in range(lines_per_page):
+                line = " ".join(rng.choice(VOCABULARY) for _ in range(12))
+                ops.append(b"(" + line.encode("latin-1") + b") Tj T*")
+            ops.append(b"ET")
+        content = zlib.compress(b"\n".join(ops))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        # 画像は圧縮できない乱数（スキャンページは大きめ）
+        image = rng.randbytes(image_bytes if has_text else image_bytes * 4)
+        objects.append(b"<< /Type /XObject /Subtype /Image /Width 200 /Height 100 /ColorSpace /DeviceGray "
+                       b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n" % len(image)
+                       + image + b"\nendstream")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for num, body in enumerate(objects[1:], 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % len(objects)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects), xref)
+    Path(path).write_bytes(bytes(out))
+
+
+def make_corpus(directory, short, long, scanned, short_pages, long_pages, scanned_pages, seed):
+    rng = random.Random(seed)
+    jobs = []
+    for kind, count, pages, has_text in (("short", short, short_pages, True), ("long", long, long_pages, True),
+                                         ("scanned", scanned, scanned_pages, False)):
+        for i in range(count):
+            path = Path(directory) / f"{kind}_{i}.pdf"
+            write_pdf(path, [has_text] * pages, rng)
+            jobs.append((path.stem, path))
+    return jobs
+
+
+def run_mode(jobs, mode, text_cache, args):
+    client = FakeModelClient(latency=args.latency, upload_seconds_per_mb=args.upload_seconds_per_mb,
+                             seconds_per_100k_chars=args.seconds_per_100k_chars, seed=args.seed)
+    analyzer = PDFAnalyzer("", client=client, text_cache=False if mode == "upload" else text_cache,
+                           max_calls=args.max_calls)
+    scheduler = AnalysisScheduler(analyzer, max_in_flight=args.in_flight)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = scheduler.run(jobs)
+    elapsed = time.perf_counter() - start
+    return {
+        "wall_time": round(elapsed, 3),
+        "succeeded": len(results),
+        "model_calls": client.calls,
+        "uploads": client.uploads,
+        "bytes_sent": client.bytes_sent,
+        "max_calls_in_flight": client.max_in_flight,
+        "text_docs": analyzer.stats["text"],
+        "upload_docs": analyzer.stats["upload"],
+        "pages": analyzer.stats["pages"],
+        "text_chars": analyzer.stats["text_chars"],
+    }
+
+
+def extraction_time(jobs, text_cache):
+    """全PDFのテキストを取り出す時間（キャッシュが空なら抽出、あれば読み込みだけ）"""
+    start = time.perf_counter()
+    for _, path in jobs:
+        text_cache.extract(path, PDFAnalyzer.content_hash(path))
+    return round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local PDF text extraction + map-reduce vs whole-file upload (fake model)")
+    parser.add_argument("--short", type=int, default=12)
+    parser.add_argument("--long", type=int, default=4)
+    parser.add_argument("--scanned", type=int, default=3)
+    parser.add_argument("--short-pages", type=int, default=4)
+    parser.add_argument("--long-pages", type=int, default=150)
+    parser.add_argument("--scanned-pages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="モデル呼び出し1回あたりの固定の遅延（秒）")
+    parser.add_argument("--upload-seconds-per-mb", type=float, default=2.0)
+    parser.add_argument("--seconds-per-100k-chars", type=float, default=1.0)
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--max-calls", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = make_corpus(tmp, args.short, args.long, args.scanned, args.short_pages, args.long_pages,
+                           args.scanned_pages, args.seed)
+        pdf_bytes = sum(path.stat().st_size for _, path in jobs)
+        text_cache = PDFTextCache(Path(tmp) / "text")
+        cold = extraction_time(jobs, text_cache)
+        warm = extraction_time(jobs, text_cache)
+        upload = run_mode(jobs, "upload", text_cache, args)
+        text = run_mode(jobs, "text", text_cache, args)
+
+    result = {
+        "benchmark": "pdf_text",
+        "environment": environment(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "extractor": extractor_name(),
+        "pdfs": len(jobs),
+        "pdf_bytes": pdf_bytes,
+        "extract_seconds_cold": cold,
+        "extract_seconds_cached": warm,
+        "upload_all": upload,
+        "text_map_reduce": text,
+        "speedup": round(upload["wall_time"] / text["wall_time"], 2) if text["wall_time"] else None,
+    }
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+収集 -> ダウンロード -> 分析 -> インデックス の通し実行ベンチマーク。
+ローカルの偽サーバー（e-Gov RSS / 連邦官報API / PDF）と偽モデルを使い、
+一時ディレクトリで main.main() をそのまま実行して段ごとの統計を出力する。
+
+    python -m benchmarks.bench_pipeline --fr-docs 300 --rss-items 50 --pdf-latency 0.02 --model-latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeModelClient, LocalSourceServer
+from collectors.real_collectors import JapanEgovCollector, USFederalRegisterCollector
+
+
+def run(fr_docs=300, rss_items=50, pdf_latency=0.02, model_latency=0.05, failure_rate=0.0,
+        in_flight=8, download_workers=8, queue_size=64, seed=0, verbose=False):
+    env = {
+        "BACKFILL_FROM": "2024-01-01",
+        "COLLECT_MAX_PAGES": "1000",
+        "GEMINI_RPM": "1000000",
+        "GEMINI_TPM": "1000000000",
+        "ANALYSIS_IN_FLIGHT": str(in_flight),
+        "DOWNLOAD_WORKERS": str(download_workers),
+        "PIPELINE_QUEUE_SIZE": str(queue_size),
+    }
+    saved_env = {k: os.environ.get(k) for k in env}
+    cwd = os.getcwd()
+    with LocalSourceServer(rss_items=rss_items, fr_docs=fr_docs, latency=pdf_latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(env)
+        os.chdir(tmp)
+        try:
+            import main as pipeline_main
+
+            jp = JapanEgovCollector()
+            jp.rss_url = f"{server.base_url}/rss"
+            us = USFederalRegisterCollector()
+            us.api_url = f"{server.base_url}/api/v1/documents.json"
+            client = FakeModelClient(latency=model_latency, failure_rate=failure_rate, seed=seed)
+
+            quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            start = time.perf_counter()
+            with quiet:
+                summary = pipeline_main.main(collectors=[jp, us], client=client)
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+    return {
+        "fr_docs": fr_docs,
+        "rss_items": rss_items,
+        "pdf_latency": pdf_latency,
+        "model_latency": model_latency,
+        "indexed_docs": summary["docs"],
+        "analyzed": summary["analyzed"],
+        "model_calls": client.calls,
+        "http_requests": server.requests,
+        "wall_time": round(elapsed, 4),
+        "pipeline": summary["pipeline"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark (local fake sources and model)")
+    parser.add_argument("--fr-docs", type=int, default=300)
+    parser.add_argument("--rss-items", type=int, default=50)
+    parser.add_argument("--pdf-latency", type=float, default=0.02)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--in-flight", type=int, default=8)
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="パイプラインのログも表示する")
+    args = parser.parse_args()
+    result = run(args.fr_docs, args.rss_items, args.pdf_latency, args.model_latency, args.failure_rate,
+                 args.in_flight, args.download_workers, args.queue_size, args.seed, args.verbose)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
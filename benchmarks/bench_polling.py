@@ -0,0 +1,127 @@
+"""
+PollingScheduler のシミュレーション。registry.json の収集元に近い公表頻度の収集元を用意し、
+1日1回の cron を N 日分回して、毎回全件を確認する場合と
+確認回数・収集時間・新着の検出遅れ（公表から取り込みまでの日数）を比べる。
+
+    python -m benchmarks.bench_polling --days 365 --budget 60
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from benchmarks.bench_scale import environment
+from collectors.polling import PollingScheduler
+
+# (ID, 公表間隔の日数, 揺れの日数, 1回の収集にかかる秒数)
+SOURCES = (
+    ("us_federal_register", 1, 0, 40.0),
+    ("jp_egov", 1, 0, 15.0),
+    ("iea", 14, 5, 3.0),
+    ("ecb", 42, 7, 3.0),
+    ("jp_boj", 91, 10, 3.0),
+    ("imf", 182, 14, 3.0),
+    ("oecd", 182, 14, 3.0),
+    ("worldbank", 182, 21, 3.0),
+    ("us_fed", 45, 5, 3.0),
+    ("jp_mof", 365, 20, 3.0),
+)
+
+
+class SimulatedSource:
+    """公表日の予定を持ち、確認した時点までに公表された分を取り込む収集元"""
+    def __init__(self, source_id, period, jitter, cost, start, end, rng):
+        self.source_id = source_id
+        self.country_code = source_id
+        self.cost = cost
+        self.published = []
+        day = start - timedelta(days=period * 12)
+        while day <= end:
+            self.published.append(day)
+            day += timedelta(days=max(1, period + rng.randint(-jitter, jitter)))
+        # 開始時点で公表済みのものは取り込み済みとする
+        self.stored = {d for d in self.published if d < start}
+
+    def publication_dates(self, limit=50):
+        return [d.isoformat() for d in sorted(self.stored, reverse=True)[:limit]]
+
+    def poll(self, today):
+        """today までに公表された未取り込み分を取り込み、各件の検出遅れ（日数）を返す"""
+        new = [d for d in self.published if d <= today and d not in self.stored]
+        self.stored.update(new)
+        return [(today - d).days for d in new]
+
+
+def simulate(days, adaptive, budget=None, seed=0, start=date(2025, 1, 1)):
+    rng = random.Random(seed)
+    end = start + timedelta(days=days)
+    sources = [SimulatedSource(*spec, start, end, rng) for spec in SOURCES]
+    polls = 0
+    seconds = 0.0
+    daily_seconds = []
+    delays = []
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = Path(tmp) / "polling.json"
+        for offset in range(days):
+            today = start + timedelta(days=offset)
+            # cron の起動は 0:00 から最大90分遅れる
+            now = datetime.combine(today, datetime.min.time()) + timedelta(minutes=rng.randint(0, 90))
+            scheduler = None
+            due = sources
+            if adaptive:
+                scheduler = PollingScheduler(state_path, budget=budget, now=now)
+                scheduler.report = lambda plans, spent=None: None
+                due = scheduler.select(sources)
+            spent = 0.0
+            for source in due:
+                found = source.poll(today)
+                delays.extend(found)
+                polls += 1
+                spent += source.cost
+                if scheduler is not None:
+                    scheduler.record(source, source.cost, len(found))
+            if scheduler is not None:
+                scheduler.save()
+            seconds += spent
+            daily_seconds.append(spent)
+        # 期間の最後までに取り込めなかった公表分
+        missed = sum(1 for s in sources for d in s.published if start <= d < end and d not in s.stored)
+    return {
+        "polls": polls,
+        "collect_seconds": round(seconds, 1),
+        "mean_run_seconds": round(statistics.mean(daily_seconds), 2),
+        "documents": len(delays),
+        "missed": missed,
+        "delay_days_mean": round(statistics.mean(delays), 2) if delays else None,
+        "delay_days_p95": sorted(delays)[int(len(delays) * 0.95)] if delays else None,
+        "delay_days_max": max(delays) if delays else None,
+        "delay_days_mean_excluding_daily": round(statistics.mean(
+            [d for d in delays if d > 0] or [0]), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated adaptive polling vs polling every source every run")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--budget", type=float, help="1回の実行の収集時間の上限（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    args = parser.parse_args()
+    result = {
+        "benchmark": "polling",
+        "environment": environment(),
+        "params": {"days": args.days, "budget": args.budget, "seed": args.seed, "sources": len(SOURCES)},
+        "every_run": simulate(args.days, adaptive=False, seed=args.seed),
+        "adaptive": simulate(args.days, adaptive=True, budget=args.budget, seed=args.seed),
+    }
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
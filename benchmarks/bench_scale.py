@@ -0,0 +1,326 @@
+"""
+データ量を増やしたときの各段の挙動を測るベンチマーク。
+seed 付きの合成コーパス（約190か国）を一時ディレクトリに作り、段ごとに
+所要時間・スループット・ピークメモリを計測して JSON で出力する。
+
+    python -m benchmarks.bench_scale --sizes 10000,100000 --out bench_results.json
+    python -m benchmarks.bench_scale --sizes 1000000,10000000 --skip http,rebuild_index
+
+段:
+    save_data       SyntheticCollector のページを BaseCollector.save_data で追記
+    index_full      IncrementalIndexBuilder による全件ビルドとマージ結果の読み出し
+    index_noop      変更なしでの差分ビルド
+    index_one       1か国だけ追記した後の差分ビルド
+    dedupe          収集元をまたいだ重複排除（マージ結果をストリーミングで読む）
+    write_global    global-index.json のストリーミング書き出し（main.py と同じコンパクトな JSON 配列）
+    read_global     global-index.json のストリーミング読み出し（ドキュメントストア同期の入力）
+    write_partitions 月 x 地域 チャンクの書き出し
+    aggregates      集計の合算と aggregates.json の書き出し
+    rebuild_index   scripts/rebuild_index.py 相当（1文書1ファイル。--max-file-docs まで）
+    http            偽の e-Gov RSS / 連邦官報API からの収集（--http-docs 件まで）
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.corpus import SyntheticCollector, make_collectors
+from benchmarks.fakes import LocalSourceServer
+from collectors.engine import CollectionEngine
+from collectors.real_collectors import JapanEgovCollector, USFederalRegisterCollector
+from collectors.storage import iter_country_stores
+from indexer.aggregates import Rollup, summarize_docs, update_aggregates
+from indexer.dedup import iter_dedupe
+from indexer.incremental import IncrementalIndexBuilder, IndexSource
+from indexer.jsonstream import iter_json_array, write_json_array
+from indexer.partitions import write_partitions
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+STAGES = ("save_data", "index_full", "index_noop", "index_one", "dedupe", "write_global",
+          "read_global", "write_partitions", "aggregates", "rebuild_index", "http")
+
+
+class PeakMemory:
+    """
+    段ごとのピークメモリ。Linux では VmHWM を /proc/self/clear_refs でリセットして測り、
+    それ以外では tracemalloc（Python のメモリ確保のみ、計測で遅くなる）を使う。
+    """
+    def __init__(self):
+        self.use_proc = Path("/proc/self/clear_refs").exists() and self._reset_proc()
+        if not self.use_proc:
+            tracemalloc.start()
+
+    @staticmethod
+    def _reset_proc():
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+
+    def reset(self):
+        gc.collect()
+        if self.use_proc:
+            self._reset_proc()
+        else:
+            tracemalloc.reset_peak()
+
+    def peak_mb(self):
+        if self.use_proc:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+            return None
+        return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+
+    @property
+    def method(self):
+        return "rss_hwm" if self.use_proc else "tracemalloc"
+
+
+class StageRecorder:
+    def __init__(self, memory, verbose=False):
+        self.memory = memory
+        self.verbose = verbose
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """items は処理件数（throughput の分子）。with の中で record["items"] を上書きしてもよい"""
+        record = {"items": items}
+        self.memory.reset()
+        start = time.perf_counter()
+        yield record
+        wall = time.perf_counter() - start
+        record["wall_time"] = round(wall, 4)
+        record["throughput"] = round(record["items"] / wall, 1) if record["items"] and wall else None
+        record["peak_memory_mb"] = self.memory.peak_mb()
+        self.stages[name] = record
+        if self.verbose:
+            print(f"  [Bench] {name:<16} {wall:8.3f}s  {record['items'] or '-':>10} items  "
+                  f"{record['throughput'] or '-':>10}/s  peak {record['peak_memory_mb']}MB", file=sys.stderr)
+
+
+@contextmanager
+def quiet(enabled=True):
+    """パイプライン側のログを抑える"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def _load_rebuild_script():
+    spec = importlib.util.spec_from_file_location("rebuild_index", REPO_ROOT / "scripts" / "rebuild_index.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def index_sources(regions_path):
+    """main.py と同じく国ストアごとに IndexSource を作る"""
+    def loader(region, country_code, store):
+        def load():
+            # 1件ずつ渡す（IncrementalIndexBuilder が列指向のバッチに詰める）
+            for doc in store.iter_all():
+                doc["country_code"] = country_code
+                doc["region"] = region
+                yield doc
+        return load
+    return [
+        IndexSource(f"{region}/{cc}", store.files(), loader(region, cc, store))
+        for region, cc, store in iter_country_stores(regions_path)
+    ]
+
+
+def run_size(size, countries=190, seed=0, page_size=1000, skip=(), max_file_docs=20000,
+             http_docs=5000, api_latency=0.0, payload_bytes=0, verbose=False):
+    memory = PeakMemory()
+    rec = StageRecorder(memory, verbose)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with quiet(not verbose):
+                collectors = make_collectors(size, countries=countries, seed=seed, page_size=page_size)
+                regions_path = Path("data/regions")
+
+                if "save_data" not in skip:
+                    with rec.stage("save_data", size) as r:
+                        added = 0
+                        for collector in collectors:
+                            for items, _ in collector.fetch_pages():
+                                added += collector.save_data(items)
+                        r["added"] = added
+
+                builder = IncrementalIndexBuilder("data/cache/index/global", summarize=summarize_docs)
+                # main.py と同じく、マージ結果は全件をメモリに載せずに各段で読み直す
+                if "index_full" not in skip:
+                    with rec.stage("index_full", size) as r:
+                        builder.update(index_sources(regions_path), full=True)
+                        r["items"] = sum(1 for _ in builder.iter_docs())
+                if "index_noop" not in skip:
+                    with rec.stage("index_noop", size):
+                        builder.update(index_sources(regions_path))
+                        sum(1 for _ in builder.iter_docs())
+                if "index_one" not in skip and collectors:
+                    target = max(collectors, key=lambda c: c.count)
+                    extra = SyntheticCollector(target.region, target.country_code, page_size,
+                                               seed=seed + 1, url_prefix="extra")
+                    for items, _ in extra.fetch_pages():
+                        extra.save_data(items)
+                    with rec.stage("index_one", size) as r:
+                        builder.update(index_sources(regions_path))
+                        r["changed_sources"] = builder.stats["changed"]
+                        r["items"] = sum(1 for _ in builder.iter_docs())
+                if not builder.manifest:
+                    builder.update(index_sources(regions_path))
+                total = builder.stats["docs"]
+
+                rollup = Rollup.combine(Rollup.from_json(s) for s in builder.summaries())
+                duplicates = set()
+                if "dedupe" not in skip and total:
+                    with rec.stage("dedupe", total) as r:
+                        def drop(position, doc):
+                            duplicates.add(position)
+                            rollup.remove(doc)
+                        for _ in iter_dedupe(builder.iter_docs(), on_drop=drop):
+                            pass
+                        r["duplicates"] = len(duplicates)
+
+                def kept_docs():
+                    return (doc for position, doc in enumerate(builder.iter_docs()) if position not in duplicates)
+
+                out_dir = Path("data/current")
+                out_dir.mkdir(parents=True, exist_ok=True)
+                if "write_global" not in skip and total:
+                    with rec.stage("write_global", total - len(duplicates)) as r:
+                        write_json_array(out_dir / "global-index.json", kept_docs())
+                        r["bytes"] = (out_dir / "global-index.json").stat().st_size
+                if "read_global" not in skip and (out_dir / "global-index.json").exists():
+                    with rec.stage("read_global") as r:
+                        r["items"] = sum(1 for _ in iter_json_array(out_dir / "global-index.json"))
+                if "write_partitions" not in skip and total:
+                    with rec.stage("write_partitions", total - len(duplicates)) as r:
+                        manifest = write_partitions(kept_docs(), out_dir / "partitions")
+                        r["chunks"] = sum(len(m["partitions"]) for m in manifest["months"])
+                if "aggregates" not in skip:
+                    with rec.stage("aggregates", rollup.total):
+                        update_aggregates(rollup, "global", out_dir / "aggregates.json")
+
+                if "rebuild_index" not in skip and size <= max_file_docs:
+                    rebuild = _load_rebuild_script()
+                    data_dir = Path("data_master")
+                    for collector in collectors:
+                        for items, _ in collector.fetch_pages():
+                            for item in items:
+                                folder = data_dir / collector.country_code.upper() / item["organization"]
+                                folder.mkdir(parents=True, exist_ok=True)
+                                name = item["url"].rsplit("/", 1)[-1].replace(".pdf", ".json")
+                                with open(folder / f"{collector.country_code}_{name}", "w", encoding="utf-8") as f:
+                                    json.dump(collector.normalize(item), f, ensure_ascii=False)
+                    with rec.stage("rebuild_index", size) as r:
+                        master = IncrementalIndexBuilder(data_dir / "cache" / "index" / "master",
+                                                         summarize=summarize_docs)
+                        master.update(rebuild.collect_sources(str(data_dir)), full=True)
+                        r["items"] = write_json_array(data_dir / "master_index.json",
+                                                      iter_dedupe(master.iter_docs()))
+
+                if "http" not in skip:
+                    fr_docs = min(size, http_docs)
+                    with LocalSourceServer(rss_items=min(size, 500), fr_docs=fr_docs, start_date="2020-01-01",
+                                           api_latency=api_latency, payload_bytes=payload_bytes) as server:
+                        saved_backfill = os.environ.get("BACKFILL_FROM")
+                        os.environ["BACKFILL_FROM"] = "2020-01-01"
+                        jp = JapanEgovCollector()
+                        jp.rss_url = f"{server.base_url}/rss"
+                        us = USFederalRegisterCollector(max_pages=fr_docs // USFederalRegisterCollector.PER_PAGE + 2)
+                        us.api_url = f"{server.base_url}/api/v1/documents.json"
+                        engine = CollectionEngine()
+                        with rec.stage("http", fr_docs + min(size, 500)) as r:
+                            results = engine.run([jp, us])
+                            r["added"] = sum(x.added for x in results)
+                            r["requests"] = server.requests
+                            r["bytes"] = server.bytes_sent
+                            r["errors"] = [str(x.error) for x in results if x.error]
+                        engine.close()
+                        if saved_backfill is None:
+                            os.environ.pop("BACKFILL_FROM", None)
+                        else:
+                            os.environ["BACKFILL_FROM"] = saved_backfill
+        finally:
+            os.chdir(cwd)
+    return {"size": size, "countries": countries, "memory_method": memory.method, "stages": rec.stages}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scale benchmark over a seeded synthetic corpus")
+    parser.add_argument("--sizes", default="10000,100000", help="カンマ区切りの文書数（例: 10000,100000,1000000,10000000）")
+    parser.add_argument("--countries", type=int, default=190)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--skip", default="", help=f"省略する段（カンマ区切り）: {','.join(STAGES)}")
+    parser.add_argument("--max-file-docs", type=int, default=20000, help="rebuild_index 段を実行する最大文書数")
+    parser.add_argument("--http-docs", type=int, default=5000, help="http 段で偽APIから取得する最大文書数")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="偽 RSS / API の応答遅延（秒）")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="偽 API の要約に足すバイト数")
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    parser.add_argument("--verbose", action="store_true", help="段ごとの進捗とパイプラインのログを表示する")
+    args = parser.parse_args()
+
+    skip = {s.strip() for s in args.skip.split(",") if s.strip()}
+    result = {
+        "benchmark": "scale",
+        "environment": environment(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "verbose")},
+        "runs": [],
+    }
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        if args.verbose:
+            print(f"--- size={size} ---", file=sys.stderr)
+        result["runs"].append(run_size(
+            size, countries=args.countries, seed=args.seed, page_size=args.page_size, skip=skip,
+            max_file_docs=args.max_file_docs, http_docs=args.http_docs, api_latency=args.api_latency,
+            payload_bytes=args.payload_bytes, verbose=args.verbose,
+        ))
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+コールドスタートの計測。新しいプロセスで `main.py --list` を繰り返し起動し、
+インタープリター起動からコレクターの準備完了までの時間と、import に時間のかかるモジュールを出力する。
+
+    python -m benchmarks.bench_startup --runs 10 --only JPN,USA
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.bench_scale import REPO_ROOT, environment
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def time_command(args, runs):
+    """コマンドを runs 回起動し、各回の所要時間（秒）を返す"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=REPO_ROOT, capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(args):
+    """-X importtime の出力から、トップレベルの import ごとの累積時間（ms）を返す"""
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=REPO_ROOT,
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_LINE.match(line)
+        if m and len(m.group(3)) == 1:
+            times[m.group(4)] = round(int(m.group(2)) / 1000, 1)
+    return times
+
+
+def top_imports(args, limit=15):
+    """main.py が読み込むモジュールのうち、累積時間の大きいもの（インタープリター起動分は除く）"""
+    startup = import_times(["-c", "pass"])
+    modules = [{"module": name, "cumulative_ms": ms} for name, ms in import_times(args).items() if name not in startup]
+    modules.sort(key=lambda m: -m["cumulative_ms"])
+    return modules[:limit]
+
+
+def summarize(times):
+    return {
+        "median": round(statistics.median(times), 4),
+        "min": round(min(times), 4),
+        "max": round(max(times), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of main.py")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--only", help="main.py --only に渡す収集元（省略時は全件）")
+    parser.add_argument("--out", help="結果 JSON の保存先（省略時は標準出力のみ）")
+    args = parser.parse_args()
+
+    main_args = ["main.py", "--list"] + (["--only", args.only] if args.only else [])
+    interpreter = time_command([sys.executable, "-c", "pass"], args.runs)
+    ready = time_command([sys.executable] + main_args, args.runs)
+    result = {
+        "benchmark": "startup",
+        "environment": environment(),
+        "params": {"runs": args.runs, "only": args.only},
+        "interpreter": summarize(interpreter),
+        "main_ready": summarize(ready),
+        # インタープリター自体の起動を除いた、main.py の import とコレクター準備の時間
+        "main_overhead_median": round(statistics.median(ready) - statistics.median(interpreter), 4),
+        "top_imports": top_imports(main_args),
+    }
+    output = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+ベンチマーク用の再現可能な合成コーパス。
+MockAggregator の国リストとドキュメント形式をもとに、約190か国へ seed 付きで文書を割り振る。
+"""
+import random
+import string
+from datetime import date, timedelta
+
+from collectors.sources.mock_aggregator import MockAggregator
+
+REGIONS = ("asia", "europe", "americas", "africa", "oceania")
+WORDS = (
+    "budget fiscal monetary policy inflation outlook growth trade tariff energy market labor "
+    "employment banking supervision stability report statistics quarterly annual review "
+    "framework regulation reform debt deficit revenue expenditure investment infrastructure "
+    "climate agriculture industry export import currency exchange reserve interest rate"
+).split()
+# 実データに近い語彙の広さにするため、音節を組み合わせた擬似語を足す
+SYLLABLES = ("ka", "to", "ri", "mon", "sel", "ta", "gra", "vi", "lo", "pen", "dus", "mer", "an", "col", "ex", "tri")
+VOCABULARY = WORDS + [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES[:12]]
+ORGANIZATIONS = ("MOF", "CB", "STAT", "MOE", "MOT", "FSA")
+CATEGORIES = ("Budget", "Monetary", "Statistics", "Energy", "Trade", "Regulation")
+
+
+def country_list(count=190):
+    """MockAggregator の28か国に、未使用の2文字コードを足して count か国にする"""
+    countries = [dict(c) for c in MockAggregator.COUNTRIES]
+    used = {c["code"] for c in countries}
+    codes = (a + b for a in string.ascii_lowercase for b in string.ascii_lowercase)
+    for code in codes:
+        if len(countries) >= count:
+            break
+        if code in used:
+            continue
+        countries.append({
+            "code": code,
+            "name": f"Country {code.upper()}",
+            "region": REGIONS[len(countries) % len(REGIONS)],
+        })
+    return countries[:count]
+
+
+class SyntheticCollector(MockAggregator):
+    """
+    1か国分の合成ドキュメントを古い順にページ単位で返すコレクター。
+    URL は一意、タイトルと要約は語彙からランダムに作るので、重複排除や全文検索の計測にも使える。
+    """
+    def __init__(self, region, country_code, count, seed=0, start=date(2015, 1, 1), days=3650,
+                 page_size=1000, summary_words=30, url_prefix="documents"):
+        super().__init__(region, country_code, rng=random.Random(f"{seed}:{country_code}"))
+        self.count = count
+        self.start = start
+        self.days = days
+        self.page_size = page_size
+        self.summary_words = summary_words
+        self.url_prefix = url_prefix
+
+    def make_document(self, n):
+        rng = self.random
+        day = self.start + timedelta(days=n * self.days // max(self.count, 1))
+        item = self.make_item(day.isoformat())
+        title_words = " ".join(rng.choice(VOCABULARY) for _ in range(5)).title()
+        item.update({
+            "title": f"{title_words} {day.year}-{n}",
+            "url": f"https://{self.country_code}.gov.example/{self.url_prefix}/{n}.pdf",
+            "summary": " ".join(rng.choice(VOCABULARY) for _ in range(self.summary_words)),
+            "organization": rng.choice(ORGANIZATIONS),
+            "category": rng.choice(CATEGORIES),
+        })
+        return item
+
+    def fetch(self) -> list:
+        return [item for items, _ in self.fetch_pages() for item in items]
+
+    def fetch_pages(self):
+        for offset in range(0, self.count, self.page_size):
+            yield [self.make_document(n) for n in range(offset, min(offset + self.page_size, self.count))], None
+
+    def normalize(self, raw_data):
+        doc = super().normalize(raw_data)
+        doc["organization"] = raw_data.get("organization")
+        doc["category"] = raw_data.get("category")
+        # collected_at を固定して、同じ seed なら同じバイト列になるようにする
+        doc["collected_at"] = f"{raw_data['date']}T00:00:00"
+        return doc
+
+
+def make_collectors(total, countries=190, seed=0, **kwargs):
+    """total 件を countries か国に（seed 付きの偏りをつけて）割り振ったコレクターのリスト"""
+    rng = random.Random(seed)
+    country_rows = country_list(countries)
+    # 国ごとの文書量は大きく偏るので、重み付きで配分する
+    weights = [rng.paretovariate(1.2) for _ in country_rows]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % len(counts)] += 1
+    return [
+        SyntheticCollector(c["region"], c["code"], n, seed=seed, **kwargs)
+        for c, n in zip(country_rows, counts)
+        if n
+    ]
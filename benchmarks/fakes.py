@@ -0,0 +1,280 @@
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class TransientModelError(Exception):
+    """偽モデルが返す一時的なエラー（429 相当）"""
+    code = 429
+
+
+class FakeModelClient:
+    """
+    PDFAnalyzer 用のローカル偽モデルクライアント。
+    レイテンシと一時的エラーの発生率を指定でき、APIキーなしで
+    スケジューラーのスループットやバックオフを計測できる。
+    """
+    def __init__(self, latency=0.05, failure_rate=0.0, seed=0, upload_seconds_per_mb=0.0, seconds_per_100k_chars=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        # 送信量に比例する遅延（PDFのアップロードと、テキストの入力処理）
+        self.upload_seconds_per_mb = upload_seconds_per_mb
+        self.seconds_per_100k_chars = seconds_per_100k_chars
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.uploads = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, name, size, delay):
+        with self._lock:
+            self.calls += 1
+            self.bytes_sent += size
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.random.random() < self.failure_rate
+        try:
+            time.sleep(self.latency + delay)
+            if fail:
+                with self._lock:
+                    self.failures += 1
+                raise TransientModelError("rate limited (fake)")
+            return json.dumps({
+                "summary": f"{name} の要約（偽モデル）",
+                "risk_level": "Info",
+                "category": "経済",
+                "insights": ["ポイント1", "ポイント2", "ポイント3"],
+            }, ensure_ascii=False)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def generate(self, prompt, pdf_path):
+        size = pdf_path.stat().st_size
+        with self._lock:
+            self.uploads += 1
+        return self._respond(pdf_path.name, size, size / (1024 * 1024) * self.upload_seconds_per_mb)
+
+    def generate_text(self, prompt, text):
+        size = len(text.encode("utf-8"))
+        return self._respond("text", size, len(text) / 100000 * self.seconds_per_100k_chars)
+
+
+class LocalSourceServer:
+    """
+    e-Gov RSS / 連邦官報API / PDF を模したローカルHTTPサーバー（別スレッドで動く）。
+        /rss                      : RSS 2.0（pubDate 付き）
+        /api/v1/documents.json    : per_page / page / order / conditions[publication_date][gte]
+        /documents/<n>.pdf        : 偽PDF（latency 秒待ってから返す）
+    api_latency は RSS / API 応答の遅延、payload_bytes は要約・PDF本文の水増しサイズ。
+    文書は番号から都度生成するので、件数を増やしてもメモリは増えない。
+    """
+    def __init__(self, rss_items=50, fr_docs=300, latency=0.0, start_date="2024-01-01", docs_per_day=20,
+                 api_latency=0.0, payload_bytes=0):
+        self.latency = latency
+        self.api_latency = api_latency
+        self.padding = "x" * payload_bytes
+        self.start_date = date.fromisoformat(start_date)
+        self.docs_per_day = docs_per_day
+        self.rss_count = rss_items
+        self.fr_count = fr_docs
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.httpd = None
+
+    def _day(self, n):
+        return self.start_date + timedelta(days=n // self.docs_per_day)
+
+    def _first_on_or_after(self, since):
+        """公開日が since 以降になる最初の文書番号"""
+        try:
+            days = (date.fromisoformat(since[:10]) - self.start_date).days
+        except ValueError:
+            return 0
+        return min(max(days, 0) * self.docs_per_day, self.fr_count)
+
+    def _fr_doc(self, n):
+        return {
+            "title": f"Federal Register Document {n}",
+            "html_url": f"{self.base_url}/documents/{n}.pdf",
+            "publication_date": self._day(n).isoformat(),
+            "abstract": f"Abstract of document {n} {self.padding}",
+        }
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def _rss(self):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>e-Gov</title>']
+        for n in reversed(range(self.rss_count)):
+            day = self._day(n)
+            pub = format_datetime(datetime(day.year, day.month, day.day, tzinfo=timezone.utc))
+            parts.append(f"<item><title>意見募集 {n}</title><link>{self.base_url}/pc/{n}</link>"
+                         f"<description>{self.padding}</description><pubDate>{pub}</pubDate></item>")
+        parts.append("</channel></rss>")
+        return "".join(parts).encode("utf-8")
+
+    def _documents(self, query):
+        since = query.get("conditions[publication_date][gte]", ["0000-00-00"])[0]
+        per_page = int(query.get("per_page", ["20"])[0])
+        page = int(query.get("page", ["1"])[0])
+        numbers = range(self._first_on_or_after(since), self.fr_count)
+        if query.get("order", ["newest"])[0] != "oldest":
+            numbers = numbers[::-1]
+        chunk = numbers[(page - 1) * per_page:page * per_page]
+        has_next = page * per_page < len(numbers)
+        return json.dumps({
+            "count": len(numbers),
+            "total_pages": -(-len(numbers) // per_page),
+            "results": [self._fr_doc(n) for n in chunk],
+            "next_page_url": f"{self.base_url}/api/v1/documents.json?page={page + 1}" if has_next else None,
+        }).encode("utf-8")
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                url = urlparse(self.path)
+                if url.path == "/rss":
+                    time.sleep(server.api_latency)
+                    body, content_type = server._rss(), "application/rss+xml"
+                elif url.path == "/api/v1/documents.json":
+                    time.sleep(server.api_latency)
+                    body, content_type = server._documents(parse_qs(url.query)), "application/json"
+                elif url.path.startswith("/documents/") or url.path.startswith("/pc/"):
+                    time.sleep(server.latency)
+                    body = b"%PDF-1.4 fake " + url.path.encode("utf-8") + server.padding.encode("ascii")
+                    content_type = "application/pdf"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="fake-sources", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class LocalCatalogServer:
+    """
+    SourceVerifier 用のローカルHTTPサーバー。公的機関の文書掲載ページを模す。
+        /site/<n>/publications   : PDF リンクを n % 8 件（相対・絶対・重複を混ぜる）含む HTML
+        /redirect/<n>            : /site/<n>/publications へ 302
+        /report/<n>.pdf          : PDF そのもの（掲載ページではない）
+        その他                   : 404
+    Host ヘッダーごとの同時処理数の最大値（max_in_flight）を記録する。
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self._lock = threading.Lock()
+        self.httpd = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    @staticmethod
+    def _catalog(n):
+        links = [f'<li><a href="/files/{n}/doc{i}.pdf">Report {i}</a></li>' for i in range(n % 8)]
+        if n % 8:
+            # 同じ文書への別表記のリンクと、文書ではないリンク
+            links.append('<li><a href="doc0.pdf#page=2">Report 0 (p.2)</a></li>')
+        links.append('<li><a href="/about.html">About</a></li>')
+        return (f"<html><head><title>Publications {n}</title></head><body><ul>"
+                f"{''.join(links)}</ul></body></html>").encode("utf-8")
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                host = self.headers.get("Host", "")
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight[host] = server.in_flight.get(host, 0) + 1
+                    server.max_in_flight[host] = max(server.max_in_flight.get(host, 0), server.in_flight[host])
+                try:
+                    time.sleep(server.latency)
+                    self._respond(urlparse(self.path).path)
+                finally:
+                    with server._lock:
+                        server.in_flight[host] -= 1
+
+            def _respond(self, path):
+                parts = path.strip("/").split("/")
+                if len(parts) == 3 and parts[0] == "site" and parts[1].isdigit() and parts[2] == "publications":
+                    body, content_type = server._catalog(int(parts[1])), "text/html; charset=utf-8"
+                elif len(parts) == 2 and parts[0] == "redirect" and parts[1].isdigit():
+                    self.send_response(302)
+                    self.send_header("Location", f"/site/{parts[1]}/publications")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                elif len(parts) == 2 and parts[0] == "report" and parts[1].endswith(".pdf"):
+                    body, content_type = b"%PDF-1.4 fake report", "application/pdf"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="fake-catalog", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
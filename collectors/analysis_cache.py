@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class AnalysisCache:
+    """
+    PDF分析結果の永続キャッシュ。
+    キーは (PDFの内容ハッシュ, プロンプトのバージョン, モデル名) で、
+    プロンプトかモデルが変われば自動的に別キーとなり再分析される。
+    エントリ数が上限を超えた場合は最終利用時刻の古い順に削除する。
+    """
+    def __init__(self, path="data/cache/analysis.json", max_entries=50000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def make_key(content_hash, prompt_version, model):
+        return f"{content_hash}:{prompt_version}:{model}"
+
+    def get(self, content_hash, prompt_version, model):
+        key = self.make_key(content_hash, prompt_version, model)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["accessed_at"] = time.time()
+            self._dirty = True
+            return dict(entry["result"])
+
+    def put(self, content_hash, prompt_version, model, result):
+        key = self.make_key(content_hash, prompt_version, model)
+        now = time.time()
+        with self._lock:
+            self.entries[key] = {
+                "content_hash": content_hash,
+                "prompt_version": prompt_version,
+                "model": model,
+                "result": {k: result[k] for k in ("summary", "risk_level", "category", "insights") if k in result},
+                "created_at": now,
+                "accessed_at": now,
+            }
+            self._dirty = True
+
+    def invalidate(self, prompt_version, model):
+        """現在のプロンプト・モデル以外で作られたエントリを削除する"""
+        with self._lock:
+            stale = [k for k, e in self.entries.items()
+                     if e.get("prompt_version") != prompt_version or e.get("model") != model]
+            for k in stale:
+                del self.entries[k]
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def evict(self):
+        """エントリ数を上限以下に保つ（LRU）"""
+        with self._lock:
+            overflow = len(self.entries) - self.max_entries
+            if overflow <= 0:
+                return 0
+            oldest = sorted(self.entries, key=lambda k: self.entries[k].get("accessed_at", 0))[:overflow]
+            for k in oldest:
+                del self.entries[k]
+            self._dirty = True
+        return overflow
+
+    def save(self):
+        if not self._dirty:
+            return
+        self.evict()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            self._dirty = False
+        os.replace(tmp_path, self.path)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        print(f"  [Analysis Cache] hits={self.hits} misses={self.misses} "
+              f"hit_rate={self.hit_rate:.0%} entries={len(self.entries)}")
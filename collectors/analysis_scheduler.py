@@ -0,0 +1,204 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from collectors.metrics import metrics
+from collectors.sources.pdf_analyzer import AnalysisUnavailable
+
+# 一時的な障害とみなす例外名（google.api_core / requests / 標準ライブラリ）
+TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "Aborted",
+    "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "TimeoutError",
+    "TransientModelError",
+}
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    if type(error).__name__ in TRANSIENT_ERRORS:
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS
+
+
+class RateBudget:
+    """
+    1分間のスライディングウィンドウで消費量を制限する（リクエスト数・トークン数の両方に使う）。
+    limit が None なら無制限。clock と sleep は差し替え可能。
+    """
+    def __init__(self, limit, window=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+        self._events = deque()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] >= self.window:
+            _, amount = self._events.popleft()
+            self._used -= amount
+
+    def acquire(self, amount=1):
+        if self.limit is None:
+            return
+        # 1件で上限を超える場合でも、ウィンドウが空になれば通す
+        amount = min(amount, self.limit)
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._expire(now)
+                if self._used + amount <= self.limit:
+                    self._events.append((now, amount))
+                    self._used += amount
+                    return
+                wait = self.window - (now - self._events[0][0])
+            self.sleep(max(wait, 0.01))
+
+
+class RetryQueue:
+    """失敗したドキュメントを次回実行に持ち越すための永続キュー"""
+    def __init__(self, path="data/cache/analysis_queue.json"):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def push(self, key, pdf_path, error):
+        with self._lock:
+            entry = self.entries.setdefault(key, {"pdf_path": str(pdf_path), "runs": 0})
+            entry["runs"] += 1
+            entry["last_error"] = f"{type(error).__name__}: {error}"
+            entry["queued_at"] = datetime.now().isoformat()
+
+    def discard(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def pending(self):
+        return [(key, Path(e["pdf_path"])) for key, e in self.entries.items()]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def estimate_tokens(pdf_path: Path):
+    """PDFの入力トークン数の概算（1ページ約258トークン、1ページ約50KBと仮定）"""
+    try:
+        size = pdf_path.stat().st_size
+    except OSError:
+        return 1000
+    return max(1000, size // 200)
+
+
+class AnalysisScheduler:
+    """
+    PDFAnalyzer.analyze_strict を並行実行するスケジューラー。
+    - 同時実行数は max_in_flight まで
+    - RPM / TPM の予算を超えないように待機（長い文書を分割して送る場合は呼び出しごとに確保する）
+    - 一時的な障害は指数バックオフ（ジッター付き）で再試行
+    - 最終的に失敗したものは RetryQueue に積み、フォールバック結果は返さない
+    """
+    def __init__(self, analyzer, max_in_flight=4, rpm=None, tpm=None, max_retries=3,
+                 base_delay=2.0, max_delay=60.0, retry_queue=None, token_estimator=estimate_tokens,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.analyzer = analyzer
+        self.max_in_flight = max_in_flight
+        self.requests_budget = RateBudget(rpm, clock=clock, sleep=sleep)
+        self.tokens_budget = RateBudget(tpm, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_queue = retry_queue
+        self.token_estimator = token_estimator
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = {"cached": 0, "completed": 0, "failed": 0, "skipped": 0, "retries": 0, "elapsed": 0.0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+        metrics.incr(f"analysis.{name}", amount)
+
+    def _backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _acquire(self, tokens=None, pdf_path=None):
+        """モデル呼び出し1回分の予算を確保する（テキスト送信は文字数から、PDF送信はファイルから見積もる）"""
+        self.requests_budget.acquire(1)
+        self.tokens_budget.acquire(tokens if tokens is not None else self.token_estimator(pdf_path))
+
+    def run_one(self, key, pdf_path):
+        """1件を分析して (key, 結果 or None) を返す（パイプラインの分析段からも呼ばれる）"""
+        # キャッシュヒットは予算を消費しない
+        cached = self.analyzer.cached(pdf_path)
+        if cached is not None:
+            self._count("cached")
+            if self.retry_queue is not None:
+                self.retry_queue.discard(key)
+            return key, cached
+        if self.analyzer.client is None:
+            self._count("skipped")
+            return key, None
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                result = self.analyzer.analyze_strict(pdf_path, check_cache=False, acquire=self._acquire)
+            except AnalysisUnavailable:
+                self._count("skipped")
+                return key, None
+            except Exception as e:
+                if is_transient(e) and attempt < self.max_retries:
+                    self._count("retries")
+                    self.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                print(f"AI Analysis Error for {pdf_path.name}: {e} (queued for next run)")
+                self._count("failed")
+                if self.retry_queue is not None:
+                    self.retry_queue.push(key, pdf_path, e)
+                return key, None
+            metrics.observe("analysis.latency", time.perf_counter() - start)
+            self._count("completed")
+            if self.retry_queue is not None:
+                self.retry_queue.discard(key)
+            return key, result
+
+    def run(self, jobs):
+        """jobs: (key, pdf_path) のリスト。成功した分だけ {key: 分析結果} を返す"""
+        start = self.clock()
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="analysis") as pool:
+            for key, result in pool.map(lambda job: self.run_one(*job), jobs):
+                if result is not None:
+                    results[key] = result
+        self.stats["elapsed"] += self.clock() - start
+        if self.retry_queue is not None:
+            self.retry_queue.save()
+        return results
+
+    def report(self):
+        s = self.stats
+        rate = s["completed"] / s["elapsed"] if s["elapsed"] else 0.0
+        print(f"  [Analysis] cached={s['cached']} completed={s['completed']} failed={s['failed']} skipped={s['skipped']} "
+              f"retries={s['retries']} elapsed={s['elapsed']:.2f}s throughput={rate:.2f}/s")
@@ -7,16 +7,81 @@ class BaseCollector(ABC):
     """
     全てのスクレイパーの親クラス。
     """
+    # 直近の項目だけを載せるフィード（RSS など）で、項目がフィードに残るおおよその日数。
+    # PollingScheduler はこれより十分短い間隔で確認する（None なら制限なし）
+    feed_retention_days = None
+
     def __init__(self, region: str, country_code: str):
         self.region = region
         self.country_code = country_code
         self.base_data_path = Path("data/regions") / region
+        # CollectionEngine から共有HTTPクライアントとHTTPキャッシュが注入される
+        self.http = None
+        self.http_cache = None
+        self.not_modified = False
+        # 200 応答のバリデータ。保存が済むまで HTTPキャッシュには書かない（commit_validators）
+        self.pending_validators = []
 
     @abstractmethod
     def fetch(self) -> list:
         """データを取得し、辞書のリストを返す"""
         pass
 
+    def fetch_pages(self):
+        """
+        (items, checkpoint_state) を1ページずつ返すジェネレーター。
+        CollectionEngine はページごとに保存し、保存後に checkpoint_state を記録する
+        （None なら記録しない）。既定では fetch() の結果を1ページとして返す。
+        """
+        yield self.fetch(), None
+
+    def http_get(self, url, **kwargs):
+        """共有クライアントがあればプール済みセッションで、なければ単発で GET する"""
+        if self.http is not None:
+            return self.http.get(url, **kwargs)
+        import requests
+        return requests.get(url, **kwargs)
+
+    def conditional_get(self, url, params=None, conditional=True, **kwargs):
+        """
+        HTTPキャッシュを使った条件付きGET。
+        304 Not Modified の場合は None を返し、呼び出し側はパースを省略する。
+        conditional=False なら無条件に取得する（収集位置がまだない場合など。バリデータは記録する）。
+        200 応答のバリデータは取り置くだけで、CollectionEngine がページを保存し終えてから
+        commit_validators() で記録する（パースや保存に失敗した内容を次回 304 で読み飛ばさないように）。
+        """
+        if self.http_cache is None:
+            return self.http_get(url, params=params, **kwargs)
+        key = self.http_cache.make_key(url, params)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if conditional:
+            headers.update(self.http_cache.conditional_headers(key))
+        response = self.http_get(url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304:
+            # stream=True の応答は閉じるまでホストの枠を持ち続けるので、ここで閉じる
+            response.close()
+            self.http_cache.record_hit(key)
+            self.not_modified = True
+            return None
+        self.http_cache.record_miss()
+        if response.status_code == 200:
+            # stream=True の場合は本文を読み切らず、呼び出し側で逐次パースさせる
+            validators = self.http_cache.validators(response, stream=kwargs.get("stream", False))
+            if validators:
+                self.pending_validators.append((key, url, validators))
+        return response
+
+    def commit_validators(self):
+        """取り置いたバリデータを HTTPキャッシュに記録する（全ページの保存後に呼ぶ）"""
+        if self.http_cache is not None:
+            for key, url, validators in self.pending_validators:
+                self.http_cache.store(key, url, validators)
+        self.pending_validators = []
+
+    def discard_validators(self):
+        """取得やパースに失敗した場合に呼ぶ。次回は 304 にならず取り直す"""
+        self.pending_validators = []
+
     def normalize(self, raw_data: dict) -> dict:
         """共通フォーマットに整形"""
         return {
@@ -28,29 +93,75 @@ class BaseCollector(ABC):
             "collected_at": datetime.now().isoformat()
         }
 
+    def storage(self):
+        from collectors.storage import SegmentStore
+        return SegmentStore.for_country(self.base_data_path, self.country_code)
+
+    def checkpoint(self):
+        """前回どこまで取得したか（国ディレクトリの checkpoint.json）"""
+        from collectors.checkpoint import Checkpoint
+        return Checkpoint(self.storage().root / Checkpoint.FILE_NAME)
+
+    def publication_dates(self, limit=50):
+        """保存済みドキュメントの公表日（新しい順）。PollingScheduler が更新頻度を推定する"""
+        return self.storage().recent_dates(limit)
+
     def save_data(self, new_items: list):
-        """JSONファイルに保存（重複排除）"""
-        file_path = self.base_data_path / f"{self.country_code}.json"
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        existing_data = []
-        if file_path.exists():
+        """追記専用ストレージに保存（重複排除）。コストは新規件数分のみ"""
+        return self.storage().append([self.normalize(item) for item in new_items])
+
+
+class EconomicDocumentCollector(ABC):
+    """
+    機関の公表資料を1件1ファイルで保存するコレクターの親クラス。
+    data/<国>/<機関>/<doc_id>.json に保存し、scripts/rebuild_index.py が master_index.json に取り込む。
+    """
+    def __init__(self, country: str, org: str, base_path="data"):
+        self.country = country
+        self.org = org
+        # CollectionEngine のコレクターと同じ名前で国を参照できるようにする
+        self.country_code = country
+        self.data_dir = Path(base_path) / country / org
+        self.added = 0
+
+    @abstractmethod
+    def fetch_latest_documents(self) -> int:
+        """最新の資料を取得して save_metadata で保存し、件数を返す"""
+        pass
+
+    def publication_dates(self, limit=50):
+        """保存済みファイルの date（無ければ collected_at の日付）を新しい順に返す"""
+        dates = set()
+        for path in self.data_dir.glob("*.json"):
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-            except:
-                existing_data = []
-
-        existing_urls = {item["url"] for item in existing_data}
-        added_count = 0
-        for item in new_items:
-            normalized = self.normalize(item)
-            if normalized["url"] not in existing_urls:
-                existing_data.append(normalized)
-                added_count += 1
-
-        existing_data.sort(key=lambda x: x["date"], reverse=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
-            
-        return added_count
+                with open(path, "r", encoding="utf-8") as f:
+                    doc = json.load(f)
+            except (OSError, ValueError):
+                continue
+            value = doc.get("date") or str(doc.get("collected_at") or "")[:10]
+            if value:
+                dates.add(str(value))
+        return sorted(dates, reverse=True)[:limit]
+
+    def doc_id(self, name):
+        # 国際機関（INT）以外は国コードを前に付ける（例: jpn_mof_20241224）
+        return name if self.country == "INT" else f"{self.country.lower()}_{name}"
+
+    def save_metadata(self, name, metadata: dict):
+        """1件保存する。既にあるファイルは書き換えない（collected_at と git の差分を保つ）"""
+        doc_id = self.doc_id(name)
+        path = self.data_dir / f"{doc_id}.json"
+        if path.exists():
+            return False
+        doc = dict(metadata)
+        doc.update({
+            "country": self.country,
+            "organization": self.org,
+            "collected_at": datetime.now().isoformat(),
+            "doc_id": doc_id,
+        })
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=4)
+        self.added += 1
+        return True
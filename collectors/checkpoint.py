@@ -0,0 +1,40 @@
+import json
+import os
+from pathlib import Path
+
+
+class Checkpoint:
+    """
+    コレクターごとの収集位置（ハイウォーターマーク）。
+    data/regions/<region>/<cc>/checkpoint.json に保存し、次回は続きから取得する。
+    保存はページの保存が終わってから行うので、途中で落ちても取りこぼしは出ない
+    （重複はストレージ側の URL 重複排除で吸収される）。
+    """
+    FILE_NAME = "checkpoint.json"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save(self, state):
+        """state で上書きして原子的に書き出す（内容が同じなら書かない）"""
+        state = dict(self.state, **state)
+        if state == self.state and self.path.exists():
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.state = state
@@ -1,6 +1,4 @@
-import requests
-# collectors パッケージ内の base.py から EconomicDocumentCollector をインポート
-from collectors.base import EconomicDocumentCollector
+from collectors.base_collector import EconomicDocumentCollector
 
 class IMFCollector(EconomicDocumentCollector):
     def __init__(self):
@@ -76,10 +74,3 @@ class BOJCollector(EconomicDocumentCollector):
         docs = [{"title": "経済・物価情勢の展望（2025年1月）", "date": "2025-01-23", "url": "https://www.boj.or.jp/mopo/outlook/gor2501.pdf", "category": "Monetary"}]
         for d in docs: self.save_metadata(f"boj_{d['date'].replace('-', '')}", d)
         return len(docs)
-
-# 実行リスト
-STABLE_COLLECTORS = [
-    IMFCollector, JapanMOFCollector, USFedCollector, 
-    IEACollector, OECDCollector, WorldBankCollector, 
-    ECBCollector, BOJCollector
-]
@@ -0,0 +1,272 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from collectors.metrics import metrics
+
+
+class HostLimiter:
+    """
+    ホスト単位の同時接続数とリクエスト間隔を制御する。
+    rate は 1秒あたりの最大リクエスト数（None なら無制限）。
+    """
+    def __init__(self, concurrency=2, rate=None):
+        self.concurrency = concurrency
+        self.min_interval = 1.0 / rate if rate else 0.0
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def acquire(self):
+        self._semaphore.acquire()
+        if self.min_interval:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + self.min_interval
+            if slot > now:
+                time.sleep(slot - now)
+
+    def release(self):
+        self._semaphore.release()
+
+
+def _release_on_close(response, limiter):
+    """stream=True の応答を閉じるまでホストの枠を持ち続ける（close() で1回だけ解放する）"""
+    close = response.close
+    released = threading.Event()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if not released.is_set():
+                released.set()
+                limiter.release()
+    response.close = close_and_release
+    return response
+
+
+class PooledHttpClient:
+    """
+    ホストごとに requests.Session を使い回す HTTP クライアント。
+    接続はホスト単位でプールされ、HostLimiter で流量を制御する。
+    stream=True の応答は本文を読み終えて close() するまで枠を使うので、呼び出し側は必ず閉じること。
+    pool_size は1ホストあたりに保持する接続数（このクライアントを共有するワーカー数に合わせる）。
+    """
+    def __init__(self, per_host_concurrency=2, per_host_rate=None, host_limits=None, user_agent=None,
+                 pool_size=None):
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rate = per_host_rate
+        self.pool_size = pool_size
+        # {"www.federalregister.gov": {"concurrency": 4, "rate": 5.0}} の形式で個別指定
+        self.host_limits = host_limits or {}
+        self.user_agent = user_agent or "Document-Data-Base/1.0"
+        self._sessions = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _host_of(self, url):
+        return urlsplit(url).netloc.lower()
+
+    def limiter(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                conf = self.host_limits.get(host, {})
+                limiter = HostLimiter(
+                    concurrency=conf.get("concurrency", self.per_host_concurrency),
+                    rate=conf.get("rate", self.per_host_rate),
+                )
+                self._limiters[host] = limiter
+            return limiter
+
+    def session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                # requests は最初のセッション作成時に読み込む（起動を軽くする）
+                import requests
+                from requests.adapters import HTTPAdapter
+                conf = self.host_limits.get(host, {})
+                size = max(conf.get("concurrency", self.per_host_concurrency), self.pool_size or 0)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(size, 1))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = self.user_agent
+                self._sessions[host] = session
+            return session
+
+    def request(self, method, url, **kwargs):
+        host = self._host_of(url)
+        limiter = self.limiter(host)
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = self.session(host).request(method, url, **kwargs)
+        except Exception:
+            limiter.release()
+            metrics.incr("http.errors", host=host)
+            raise
+        # stream=True の応答は本文を読む前の時間（ヘッダー受信まで）になる
+        metrics.observe("http.latency", time.perf_counter() - start, host=host)
+        metrics.incr("http.requests", host=host, status=f"{response.status_code // 100}xx")
+        if kwargs.get("stream"):
+            return _release_on_close(response, limiter)
+        limiter.release()
+        metrics.incr("http.bytes", len(response.content), host=host)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class CollectionResult:
+    """1つのコレクターの実行結果"""
+    def __init__(self, collector):
+        self.collector = collector
+        self.items = []
+        self.pages = 0
+        self.added = 0
+        self.elapsed = 0.0
+        self.error = None
+        self.timed_out = False
+        self.not_modified = False
+
+    @property
+    def name(self):
+        return f"{self.collector.__class__.__name__}[{self.collector.country_code}]"
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+
+class CollectionEngine:
+    """
+    複数のコレクターの fetch() をスレッドプールで並行実行する。
+    1つのソースが遅くても他の収集は止まらず、結果はコレクター単位で集計される。
+    """
+    def __init__(self, max_workers=8, per_host_concurrency=2, per_host_rate=None,
+                 host_limits=None, deadline=None, http=None, http_cache=None, pool_size=None):
+        self.max_workers = max_workers
+        # 全体の待ち時間上限（秒）。超過したコレクターは timed_out として報告する
+        self.deadline = deadline
+        self.http = http or PooledHttpClient(per_host_concurrency, per_host_rate, host_limits,
+                                             pool_size=pool_size or max_workers)
+        self.http_cache = http_cache
+        self._file_locks = {}
+        self._file_locks_lock = threading.Lock()
+
+    def _file_lock(self, collector):
+        key = (collector.region, collector.country_code)
+        with self._file_locks_lock:
+            return self._file_locks.setdefault(key, threading.Lock())
+
+    def collect(self, collector, result=None, save=True, on_page=None):
+        """
+        1つのコレクターを実行して CollectionResult を返す。
+        on_page を渡すと、各ページを保存した直後にそのページのドキュメントで呼ばれる
+        （パイプラインの次の段へ流すため）。
+        """
+        return self._run_one(collector, result or CollectionResult(collector), save, on_page)
+
+    def _run_one(self, collector, result, save, on_page=None):
+        start = time.perf_counter()
+        try:
+            collector.http = self.http
+            collector.http_cache = self.http_cache
+            collector.not_modified = False
+            collector.pending_validators = []
+            checkpoint = collector.checkpoint() if save else None
+            for items, state in collector.fetch_pages():
+                # 期限切れで切り離された後は保存も収集位置の更新もしない（次回そのページから取り直す）
+                if result.timed_out:
+                    break
+                items = items or []
+                result.items.extend(items)
+                result.pages += 1
+                # 304 や新着なしの場合は保存処理そのものを省略する
+                if save and items:
+                    # 同じ国ファイルへの同時書き込みを防ぐ
+                    with self._file_lock(collector):
+                        if result.timed_out:
+                            break
+                        result.added += collector.save_data(items)
+                # ページを保存し終えてから収集位置を進める（途中で止まっても続きから再開できる）
+                if checkpoint is not None and state:
+                    checkpoint.save(state)
+                if on_page is not None and items:
+                    on_page(items)
+            # 304 のページを読み飛ばして次のページで新着があった場合は「変更なし」にしない
+            result.not_modified = collector.not_modified and not result.items
+            # 全ページを保存し終えてから ETag / Last-Modified を記録する
+            if save and not result.timed_out:
+                collector.commit_validators()
+        except Exception as e:
+            result.error = e
+        finally:
+            result.elapsed = time.perf_counter() - start
+            name = result.name
+            metrics.observe("collect.elapsed", result.elapsed, collector=name)
+            metrics.incr("collect.fetched", len(result.items), collector=name)
+            metrics.incr("collect.added", result.added, collector=name)
+            if result.not_modified:
+                metrics.incr("collect.not_modified", collector=name)
+            if result.error is not None:
+                metrics.incr("collect.errors", collector=name)
+        return result
+
+    def run(self, collectors, save=True):
+        """全コレクターを実行し、CollectionResult のリストを投入順で返す"""
+        results = [CollectionResult(c) for c in collectors]
+        if not results:
+            return results
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector")
+        futures = {pool.submit(self._run_one, r.collector, r, save): r for r in results}
+        _, pending = wait(futures, timeout=self.deadline)
+        for future in pending:
+            future.cancel()
+            futures[future].timed_out = True
+        # 期限切れのスレッドは待たずに切り離す
+        pool.shutdown(wait=not pending, cancel_futures=True)
+        return results
+
+    def report(self, results):
+        """コレクターごとの所要時間と失敗を表示する"""
+        print("--- Collection Report ---")
+        for r in sorted(results, key=lambda x: x.elapsed, reverse=True):
+            if r.timed_out:
+                status = "TIMEOUT"
+            elif r.error is not None:
+                status = f"ERROR: {r.error}"
+            elif r.not_modified:
+                status = "304 not modified"
+            else:
+                status = f"{len(r.items)} fetched / {r.added} added"
+                if r.pages > 1:
+                    status += f" ({r.pages} pages)"
+            print(f"  {r.name:<40} {r.elapsed:7.2f}s  {status}")
+        failed = [r for r in results if not r.ok]
+        print(f"  Total: {len(results)} collectors, {len(failed)} failed")
+        if self.http_cache is not None:
+            self.http_cache.report()
+
+    def close(self):
+        self.http.close()
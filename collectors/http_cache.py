@@ -0,0 +1,139 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+from collectors.metrics import metrics
+
+
+class HttpCache:
+    """
+    ETag / Last-Modified を保存し、条件付きGETを行うためのディスクキャッシュ。
+    全コレクターで共有し、304 応答ならパースと保存を丸ごと省略できる。
+    本文は保存しない（304 の内容は前回保存済みなので使い道がない）。エントリは <key>.json のみ。
+    """
+    def __init__(self, cache_dir="data/cache/http", max_age_days=30, max_entries=20000):
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age_days * 86400
+        # ディスクにあるのは小さなバリデータだけなので、件数で上限を決める
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url, params=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(dict(params).items()))}"
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def load_meta(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, key):
+        """保存済みのバリデータから If-None-Match / If-Modified-Since を組み立てる"""
+        meta = self.load_meta(key)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    @staticmethod
+    def validators(response, stream=False):
+        """200 応答のバリデータと本文の大きさ。バリデータがなければ None"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return None
+        if stream:
+            size = int(response.headers.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+        return {"etag": etag, "last_modified": last_modified, "size": size}
+
+    def store(self, key, url, validators):
+        """validators（validators() の戻り値）を保存する"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        meta = dict(validators, url=url, stored_at=now, accessed_at=now)
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def touch(self, key):
+        """304 で再検証されたエントリの最終アクセス時刻を更新する"""
+        meta = self.load_meta(key)
+        if meta is None:
+            return 0
+        meta["accessed_at"] = time.time()
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return meta.get("size", 0)
+
+    def record_hit(self, key):
+        size = self.touch(key)
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+        metrics.incr("http_cache.hits")
+        metrics.incr("http_cache.bytes_saved", size)
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+        metrics.incr("http_cache.misses")
+
+    def evict(self):
+        """古いエントリを削除し、件数が上限を超えていれば LRU 順に削除する"""
+        if not self.cache_dir.exists():
+            return 0
+        now = time.time()
+        entries = []
+        removed = 0
+        # 以前の形式で保存した本文は読まれないので削除する
+        for body_path in self.cache_dir.glob("*.body"):
+            try:
+                body_path.unlink()
+            except OSError:
+                pass
+        for meta_path in self.cache_dir.glob("*.json"):
+            key = meta_path.stem
+            meta = self.load_meta(key)
+            if meta is None or now - meta.get("accessed_at", 0) > self.max_age:
+                self._remove(key)
+                removed += 1
+                continue
+            entries.append((meta.get("accessed_at", 0), key))
+
+        entries.sort()
+        for _, key in entries[:max(len(entries) - self.max_entries, 0)]:
+            self._remove(key)
+            removed += 1
+        return removed
+
+    def _remove(self, key):
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        print(f"  [HTTP Cache] hits={self.hits} misses={self.misses} "
+              f"hit_rate={self.hit_rate:.0%} saved={self.bytes_saved / 1024:.1f}KB")
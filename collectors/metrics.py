@@ -0,0 +1,227 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+STATUS_PATH = "data/status.json"
+HISTORY_PATH = "data/metrics/history.jsonl"
+PROFILE_DIR = "data/metrics/profiles"
+
+# レイテンシのバケット境界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def metric_key(name, labels):
+    """"http.latency" + {"host": "x"} -> "http.latency{host=x}" """
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+
+
+class Histogram:
+    """固定バケットのヒストグラム（パーセンタイルはバケット上限で近似）"""
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": round(self.min, 6) if self.min is not None else None,
+            "max": round(self.max, 6) if self.max is not None else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+    def to_json(self):
+        data = self.summary()
+        data["buckets"] = {
+            (f"le_{b}" if i < len(self.bounds) else "inf"): n
+            for i, (b, n) in enumerate(zip(list(self.bounds) + [None], self.buckets))
+            if n
+        }
+        return data
+
+
+class Metrics:
+    """
+    実行ごとのカウンター・ゲージ・ヒストグラム（スレッドセーフ）。
+    各モジュールはモジュール共通の `metrics` に記録し、main が実行の最後に
+    status.json と履歴（JSON Lines）へ書き出す。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+            self._lap = self._start
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def incr(self, name, amount=1, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[metric_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def lap(self, stage):
+        """前回の lap()（または reset()）からの経過時間を stage.seconds{stage=...} に記録する"""
+        now = time.perf_counter()
+        with self._lock:
+            elapsed, self._lap = now - self._lap, now
+        self.gauge("stage.seconds", round(elapsed, 4), stage=stage)
+        return elapsed
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with metrics.timer("stage", stage="index"): ... で所要時間をヒストグラムに記録する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self, detail=True):
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "elapsed": round(time.perf_counter() - self._start, 4),
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "histograms": {
+                    key: (h.to_json() if detail else h.summary())
+                    for key, h in sorted(self.histograms.items())
+                },
+            }
+
+    def write_status(self, path=STATUS_PATH, **fields):
+        """
+        data/status.json を更新する。既存のキー（new_sources_found など）は残し、
+        fields と今回のメトリクスで上書きする。
+        """
+        path = Path(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            status = {}
+        status.update(fields)
+        status["last_run"] = datetime.now().isoformat()
+        status["metrics"] = self.snapshot()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(status, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+        return status
+
+    def append_history(self, path=HISTORY_PATH, **fields):
+        """1実行1行の追記専用履歴（ヒストグラムは要約のみ）"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = dict(fields, **self.snapshot(detail=False))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profile_run(enabled=False, out_dir=PROFILE_DIR, top=40):
+    """
+    enabled（または環境変数 PROFILE=1）のとき、cProfile と tracemalloc で実行全体を計測し、
+    <out_dir>/<日時>.prof（pstats 形式）/ -cpu.txt / -memory.txt を書き出す。
+    収集・分析はワーカースレッドで動くので、新しく起動したスレッドにも個別のプロファイラを付けて合算する。
+    """
+    enabled = enabled or os.environ.get("PROFILE") == "1"
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+    profilers = [cProfile.Profile()]
+    profilers_lock = threading.Lock()
+
+    def start_thread_profiler(frame, event, arg):
+        profiler = cProfile.Profile()
+        with profilers_lock:
+            profilers.append(profiler)
+        profiler.enable()
+
+    tracemalloc.start(25)
+    threading.setprofile(start_thread_profiler)
+    profilers[0].enable()
+    try:
+        yield
+    finally:
+        profilers[0].disable()
+        threading.setprofile(None)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = out_dir / datetime.now().strftime("%Y%m%d-%H%M%S")
+        with profilers_lock:
+            stats = pstats.Stats(*profilers)
+        stats.dump_stats(f"{stem}.prof")
+        buf = io.StringIO()
+        stats.stream = buf
+        stats.sort_stats("cumulative").print_stats(top)
+        stats.sort_stats("tottime").print_stats(top)
+        with open(f"{stem}-cpu.txt", "w", encoding="utf-8") as f:
+            f.write(f"threads profiled: {len(profilers)}\n")
+            f.write(buf.getvalue())
+        with open(f"{stem}-memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"current={current / 1024 / 1024:.1f}MB peak={peak / 1024 / 1024:.1f}MB\n\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+        print(f"  [Profile] CPU/memory reports -> {stem}-cpu.txt, {stem}-memory.txt")
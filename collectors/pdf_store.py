@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from collectors.metrics import metrics
+from indexer.dedup import canonicalize_url
+
+
+class PDFStore:
+    """
+    data/pdfs 以下のコンテンツアドレス型ダウンロードストア。
+    - objects/<hh>/<sha256>.pdf : 内容の SHA-256 で命名（同じPDFは1つだけ保存）
+    - partial/<url digest>.part : 途中まで取得したファイル（Range で再開）
+    - partial/<url digest>.part.json : その取得時の ETag / Last-Modified（If-Range で同じ版か確かめる）
+    - manifest.json             : 正規化URL -> sha256, size, fetched_at, path
+      （追跡パラメータ違いなど同じ資料を指すURLはどれでも同じエントリを引く）
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, root="data/pdfs", max_workers=4, http=None, timeout=30):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.partial_dir = self.root / "partial"
+        self.manifest_path = self.root / "manifest.json"
+        self.max_workers = max_workers
+        self.http = http
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    @staticmethod
+    def url_digest(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def path_for(self, url):
+        """取得済みなら保存先パス（リポジトリ相対の文字列）を返す"""
+        # 以前の形式では取得したURLそのものをキーにしていた
+        entry = self.manifest.get(canonicalize_url(url)) or self.manifest.get(url)
+        if entry and Path(entry["path"]).exists():
+            return entry["path"]
+        return None
+
+    def _get(self, url, headers):
+        if self.http is not None:
+            return self.http.get(url, headers=headers, timeout=self.timeout, stream=True)
+        import requests
+        return requests.get(url, headers=headers, timeout=self.timeout, stream=True)
+
+    @staticmethod
+    def _validator_path(part_path):
+        return part_path.with_name(part_path.name + ".json")
+
+    def _load_validator(self, part_path):
+        """途中ファイルを取得したときの If-Range の値（強い ETag か Last-Modified）。なければ None"""
+        try:
+            with open(self._validator_path(part_path), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        etag = data.get("etag")
+        # 弱い ETag（W/"..."）は If-Range に使えない
+        if etag and not etag.startswith("W/"):
+            return etag
+        return data.get("last_modified")
+
+    def _save_validator(self, part_path, response):
+        data = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        with open(self._validator_path(part_path), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def _download_partial(self, url, part_path):
+        """
+        part_path に追記ダウンロードする。既存の途中ファイルがあれば Range + If-Range で再開する。
+        途中でリモートのPDFが変わっていればサーバーは 200 で全体を返すので、最初から書き直す
+        （バリデータがない途中ファイルは版を確かめられないので再開しない）。
+        """
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if_range = self._load_validator(part_path) if offset else None
+        if offset and if_range is None:
+            offset = 0
+        headers = {"Range": f"bytes={offset}-", "If-Range": if_range} if offset else {}
+        r = self._get(url, headers)
+        try:
+            if r.status_code == 416:
+                # 既に全体を取得済み
+                return
+            r.raise_for_status()
+            mode = "ab"
+            if r.status_code != 206:
+                # 新規取得・Range 非対応・リモートの版が変わった場合は最初から取り直す
+                mode = "wb"
+                self._save_validator(part_path, r)
+            with open(part_path, mode) as f:
+                for chunk in r.iter_content(chunk_size=self.CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+        finally:
+            r.close()
+
+    def _file_digest(self, path):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def fetch(self, url):
+        """URL のPDFを取得し、保存先パスを返す。失敗時は None"""
+        existing = self.path_for(url)
+        if existing:
+            metrics.incr("download.reused")
+            return existing
+
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        part_path = self.partial_dir / f"{self.url_digest(url)}.part"
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        start = time.perf_counter()
+        try:
+            self._download_partial(url, part_path)
+        except Exception as e:
+            metrics.incr("download.failed")
+            print(f"  [PDFStore] Download failed (resumable): {url}: {e}")
+            return None
+        metrics.observe("download.latency", time.perf_counter() - start)
+        metrics.incr("download.completed")
+        metrics.incr("download.bytes", max(part_path.stat().st_size - offset, 0))
+
+        digest = self._file_digest(part_path)
+        size = part_path.stat().st_size
+        try:
+            self._validator_path(part_path).unlink()
+        except OSError:
+            pass
+        target = self.objects_dir / digest[:2] / f"{digest}.pdf"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            # 別URLで同じ内容を取得済み
+            part_path.unlink()
+        else:
+            os.replace(part_path, target)
+
+        with self._lock:
+            self.manifest[canonicalize_url(url)] = {
+                "sha256": digest,
+                "size": size,
+                "fetched_at": datetime.now().isoformat(),
+                "path": target.as_posix(),
+            }
+        return target.as_posix()
+
+    def fetch_all(self, urls):
+        """複数URLを並列ダウンロードし、{url: path or None} を返す"""
+        unique_urls = list(dict.fromkeys(urls))
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf") as pool:
+                for url, path in zip(unique_urls, pool.map(self.fetch, unique_urls)):
+                    results[url] = path
+        finally:
+            self.save_manifest()
+        return results
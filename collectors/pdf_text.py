@@ -0,0 +1,218 @@
+import gzip
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from collectors.metrics import metrics
+
+TEXT_CACHE_DIR = "data/cache/pdf_text"
+
+# 1チャンクの文字数の目安と、1文書あたりのチャンク数の上限（超える場合はチャンクを大きくする）
+CHUNK_CHARS = 100000
+MAX_CHUNKS = 16
+# テキスト層があるとみなす、1ページあたりの文字数
+MIN_CHARS_PER_PAGE = 40
+# MIN_CHARS_PER_PAGE 以上の文字を読めたページがこの割合未満なら、テキストではなくPDFをアップロードする
+MIN_TEXT_PAGE_RATIO = 0.8
+# 文字・数字・空白・句読点の割合がこれ未満のページは読めないテキスト（独自エンコーディングのフォントなど）とみなす
+MIN_READABLE_RATIO = 0.6
+
+# pypdf のバージョン（未インストールなら ""）。最初の抽出時に読み込む（起動時には読み込まない）
+_pypdf_version = None
+_pypdf_lock = threading.Lock()
+
+
+def extractor_name():
+    """
+    抽出に使うライブラリとバージョン（"pypdf-4.3.1"）。pypdf が無ければ "none"。
+    テキストキャッシュのキーに含め、pypdf を入れた・更新した場合は抽出し直す。
+    """
+    global _pypdf_version
+    with _pypdf_lock:
+        if _pypdf_version is None:
+            try:
+                import pypdf
+                _pypdf_version = pypdf.__version__
+            except ImportError:
+                _pypdf_version = ""
+                print("  [PDFText] pypdf is not installed; PDFs are uploaded without local text extraction")
+    return f"pypdf-{_pypdf_version}" if _pypdf_version else "none"
+
+
+def _pypdf_pages(pdf_path):
+    import pypdf
+    reader = pypdf.PdfReader(str(pdf_path))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def readable(text):
+    """文字化けしていないテキストか（独自エンコーディングのフォントは記号や制御文字の列になる）"""
+    if not text:
+        return False
+    good = sum(1 for c in text if c.isalnum() or c.isspace() or c in ".,;:!?()[]%-/'\"、。・（）「」")
+    return good / len(text) >= MIN_READABLE_RATIO
+
+
+def extract_pages(pdf_path):
+    """
+    ページごとのテキストと、使った抽出方法を返す。読めないページは空文字列にする。
+    pypdf が無い場合はテキスト層のないPDFと同じ扱い（ページなし）になり、PDFごとアップロードされる。
+    """
+    extractor = extractor_name()
+    if extractor == "none":
+        return [], extractor
+    try:
+        pages = _pypdf_pages(pdf_path)
+    except Exception as e:
+        print(f"  [PDFText] {Path(pdf_path).name}: extraction failed: {e}")
+        return [], extractor
+    return [p.strip() if readable(p.strip()) else "" for p in pages], extractor
+
+
+def chunk_pages(pages, max_chars=CHUNK_CHARS, max_chunks=MAX_CHUNKS):
+    """
+    ページを順に詰めてチャンクにする。[(ラベル "p.3-7", テキスト)] を返す。
+    チャンク数が max_chunks を超える場合は、1チャンクの文字数を増やして収める。
+    1ページで max_chars を超える場合は段落（空行・改行）の区切りで分ける。
+    """
+    total = sum(len(p) for p in pages)
+    max_chars = max(max_chars, -(-total // max_chunks))
+    chunks = []
+    current, first, last = [], None, None
+
+    def flush():
+        nonlocal current, first
+        if current:
+            label = f"p.{first}" if first == last else f"p.{first}-{last}"
+            chunks.append((label, "\n\n".join(current)))
+        current, first = [], None
+
+    for number, text in enumerate(pages, 1):
+        if not text:
+            continue
+        pieces = [text]
+        if len(text) > max_chars:
+            pieces, piece = [], ""
+            for line in text.split("\n"):
+                if piece and len(piece) + len(line) + 1 > max_chars:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece}\n{line}" if piece else line
+                while len(piece) > max_chars:
+                    pieces.append(piece[:max_chars])
+                    piece = piece[max_chars:]
+            pieces.append(piece)
+        for piece in pieces:
+            if current and sum(len(c) for c in current) + len(piece) > max_chars:
+                flush()
+            if first is None:
+                first = number
+            last = number
+            current.append(piece)
+    flush()
+    return chunks
+
+
+class PDFText:
+    """1つのPDFの抽出結果"""
+    def __init__(self, pages, extractor, cached=False):
+        self.pages = pages
+        self.extractor = extractor
+        self.cached = cached
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    @property
+    def chars(self):
+        return sum(len(p) for p in self.pages)
+
+    @property
+    def has_text(self):
+        """
+        テキストだけで分析できるか（スキャン画像だけのPDFは False）。
+        平均の文字数に加えて、読めたページの割合も見る（一部のページしか読めないPDFを
+        その一部だけで要約しないように）。
+        """
+        if not self.pages or self.chars < MIN_CHARS_PER_PAGE * len(self.pages):
+            return False
+        covered = sum(len(p) >= MIN_CHARS_PER_PAGE for p in self.pages)
+        return covered >= MIN_TEXT_PAGE_RATIO * len(self.pages)
+
+    def chunks(self, max_chars=CHUNK_CHARS, max_chunks=MAX_CHUNKS):
+        return chunk_pages(self.pages, max_chars, max_chunks)
+
+
+class PDFTextCache:
+    """
+    PDFの内容ハッシュと抽出方法ごとのページテキストのキャッシュ（<hash>.<extractor>.json.gz）。
+    テキスト層のないPDFも結果を保存し、次回は解析し直さない
+    （pypdf を入れた・更新した場合はキーが変わり、抽出し直す）。
+    """
+    def __init__(self, cache_dir=TEXT_CACHE_DIR, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, content_hash):
+        return self.cache_dir / f"{content_hash}.{extractor_name()}.json.gz"
+
+    def get(self, content_hash):
+        path = self._path(content_hash)
+        try:
+            data = json.loads(gzip.decompress(path.read_bytes()))
+        except (OSError, ValueError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return PDFText(data["pages"], data.get("extractor", ""), cached=True)
+
+    def put(self, content_hash, text):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({
+            "pages": text.pages,
+            "extractor": text.extractor,
+            "page_count": text.page_count,
+            "chars": text.chars,
+            "extracted_at": time.time(),
+        }, ensure_ascii=False).encode("utf-8")
+        path = self._path(content_hash)
+        tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(gzip.compress(payload, mtime=0))
+        os.replace(tmp_path, path)
+
+    def extract(self, pdf_path, content_hash):
+        """キャッシュにあればそれを、無ければ抽出して保存したものを返す"""
+        text = self.get(content_hash)
+        if text is None:
+            start = time.perf_counter()
+            pages, extractor = extract_pages(pdf_path)
+            text = PDFText(pages, extractor)
+            metrics.observe("pdf_text.extract_seconds", time.perf_counter() - start)
+            self.put(content_hash, text)
+        metrics.incr("pdf_text.pages", text.page_count)
+        metrics.incr("pdf_text.chars", text.chars)
+        return text
+
+    def evict(self):
+        """合計サイズが上限を超えていれば、最終利用の古い順に削除する"""
+        if not self.cache_dir.exists():
+            return 0
+        files = [(p, p.stat()) for p in self.cache_dir.glob("*.json.gz")]
+        total = sum(st.st_size for _, st in files)
+        removed = 0
+        for path, st in sorted(files, key=lambda f: f[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink()
+            total -= st.st_size
+            removed += 1
+        return removed
@@ -0,0 +1,238 @@
+import queue
+import threading
+import time
+from pathlib import Path
+
+from collectors.engine import CollectionResult
+from indexer.dedup import canonicalize_url
+
+# ステージの終了を伝える番兵
+_DONE = object()
+
+
+def wants_pdf(url):
+    """実体(PDFなど)のダウンロードが期待されるURLか"""
+    return bool(url) and (".pdf" in url.lower() or "federalregister" in url)
+
+
+class Stage:
+    """
+    パイプラインの1段。入力キューは有界なので、下流が詰まると上流の emit が待たされる（背圧）。
+    handler(item, emit) は処理結果を emit で次の段へ流す（0件でも複数件でもよい）。
+    """
+    def __init__(self, name, handler, workers=1, queue_size=64):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.stats = {"in": 0, "out": 0, "errors": 0, "busy": 0.0, "max_depth": 0,
+                      "depth_total": 0, "started": None, "finished": None}
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def put(self, item):
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self._lock:
+            self.stats["in"] += 1
+            self.stats["depth_total"] += depth
+            self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+
+    def _emit(self, item):
+        with self._lock:
+            self.stats["out"] += 1
+        if self.next is not None:
+            self.next.put(item)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            with self._lock:
+                if self.stats["started"] is None:
+                    self.stats["started"] = start
+            try:
+                self.handler(item, self._emit)
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                print(f"  [Pipeline] {self.name} error: {e}")
+            end = time.perf_counter()
+            with self._lock:
+                self.stats["busy"] += end - start
+                self.stats["finished"] = end
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        # 最後のワーカーが終わったら次の段に終了を伝える
+        if last and self.next is not None:
+            self.next.close()
+
+    def start(self):
+        self._running = self.workers
+        threads = [
+            threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def close(self):
+        for _ in range(self.workers):
+            self.queue.put(_DONE)
+
+    def throughput(self):
+        s = self.stats
+        if s["started"] is None or s["finished"] is None or s["finished"] <= s["started"]:
+            return 0.0
+        return s["in"] / (s["finished"] - s["started"])
+
+
+class Pipeline:
+    """有界キューでつないだステージ群。各段は独自のワーカープールで並行に動く"""
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, nxt in zip(stages, stages[1:]):
+            stage.next = nxt
+        self.elapsed = 0.0
+
+    def run(self, inputs):
+        start = time.perf_counter()
+        threads = [t for stage in self.stages for t in stage.start()]
+        first = self.stages[0]
+        for item in inputs:
+            first.put(item)
+        first.close()
+        for t in threads:
+            t.join()
+        self.elapsed = time.perf_counter() - start
+        return self
+
+    def summary(self):
+        """段ごとの統計（JSON化できる形）"""
+        return {
+            "elapsed": round(self.elapsed, 4),
+            "stages": {
+                stage.name: {
+                    "workers": stage.workers,
+                    "in": stage.stats["in"],
+                    "out": stage.stats["out"],
+                    "errors": stage.stats["errors"],
+                    "busy": round(stage.stats["busy"], 4),
+                    "max_queue_depth": stage.stats["max_depth"],
+                    "avg_queue_depth": round(stage.stats["depth_total"] / stage.stats["in"], 2) if stage.stats["in"] else 0.0,
+                    "throughput": round(stage.throughput(), 2),
+                }
+                for stage in self.stages
+            },
+        }
+
+    def report(self):
+        print(f"--- Pipeline Report ({self.elapsed:.2f}s) ---")
+        for stage in self.stages:
+            s = stage.stats
+            avg_depth = s["depth_total"] / s["in"] if s["in"] else 0.0
+            print(f"  {stage.name:<10} workers={stage.workers:<3} in={s['in']:<6} out={s['out']:<6} "
+                  f"errors={s['errors']:<3} busy={s['busy']:7.2f}s queue(max={s['max_depth']}, avg={avg_depth:.1f}) "
+                  f"throughput={stage.throughput():.1f}/s")
+
+
+class DocumentPipeline:
+    """
+    collect -> download -> analyze -> index をステージとしてつなぐランナー。
+    コレクターはページを保存するたびにドキュメントを流すので、
+    他の収集・ダウンロードが続いている間にも届いたPDFから順に分析が始まる。
+    index 段は分析結果を URL ごとに集めるだけで、全体のインデックス構築は
+    全ソースが揃ってから（差分ビルドで）1回だけ行う。
+    """
+    def __init__(self, engine, pdf_store, scheduler, download_workers=4, queue_size=64):
+        self.engine = engine
+        self.pdf_store = pdf_store
+        self.scheduler = scheduler
+        self.results = []
+        self.analyses = {}
+        self._seen_urls = set()
+        self._seen_lock = threading.Lock()
+        self.pipeline = Pipeline([
+            Stage("collect", self._collect, workers=engine.max_workers, queue_size=queue_size),
+            Stage("download", self._download, workers=download_workers, queue_size=queue_size),
+            Stage("analyze", self._analyze, workers=scheduler.max_in_flight, queue_size=queue_size),
+            Stage("index", self._index, workers=1, queue_size=queue_size),
+        ])
+
+    def _collect(self, collector, emit):
+        result = CollectionResult(collector)
+        self.results.append(result)
+        self.engine.collect(collector, result, on_page=lambda items: [emit(item) for item in items])
+
+    def _download(self, item, emit):
+        url = item.get("url")
+        if not wants_pdf(url):
+            return
+        # 追跡パラメータ違いなど、同じ資料を指すURLは1回だけダウンロードする
+        canonical = canonicalize_url(url)
+        with self._seen_lock:
+            if canonical in self._seen_urls:
+                return
+            self._seen_urls.add(canonical)
+        path = self.pdf_store.fetch(url)
+        if path:
+            # 分析結果は正規化URLで引く（重複排除でどの表記のURLが残っても見つかるように）
+            emit((canonical, Path(path)))
+
+    def download_missing(self, urls, limit=None):
+        """
+        今回の実行で流れてこなかったドキュメントのうち、PDFがまだ無いものを取得する
+        （前回ダウンロードに失敗し、その後収集元に出てこなくなったもの。途中までの .part から再開する）。
+        urls は優先順（新しい順など）で、limit 件まで。{正規化URL: パス} を返す。
+        """
+        pending = {}
+        with self._seen_lock:
+            for url in urls:
+                if limit is not None and len(pending) >= limit:
+                    break
+                canonical = canonicalize_url(url)
+                if not wants_pdf(url) or canonical in self._seen_urls or canonical in pending:
+                    continue
+                self._seen_urls.add(canonical)
+                pending[canonical] = url
+        if not pending:
+            return {}
+        print(f"  [Pipeline] Retrying {len(pending)} missing PDF downloads")
+        fetched = self.pdf_store.fetch_all(pending.values())
+        return {canonical: Path(fetched[url]) for canonical, url in pending.items() if fetched.get(url)}
+
+    def _analyze(self, job, emit):
+        key, result = self.scheduler.run_one(*job)
+        if result is not None:
+            emit((key, result))
+
+    def _index(self, analysis, emit):
+        key, result = analysis
+        self.analyses[key] = result
+
+    def run(self, collectors):
+        """全コレクターを流し、(CollectionResult のリスト, {正規化URL: 分析結果}) を返す"""
+        try:
+            self.pipeline.run(collectors)
+        finally:
+            self.pdf_store.save_manifest()
+            if self.scheduler.retry_queue is not None:
+                self.scheduler.retry_queue.save()
+        analyze = self.pipeline.stages[2].stats
+        if analyze["started"] is not None:
+            self.scheduler.stats["elapsed"] += analyze["finished"] - analyze["started"]
+        # 投入順に並べ直す
+        order = {id(c): i for i, c in enumerate(collectors)}
+        self.results.sort(key=lambda r: order.get(id(r.collector), 0))
+        return self.results, self.analyses
+
+    def summary(self):
+        return self.pipeline.summary()
+
+    def report(self):
+        self.pipeline.report()
@@ -0,0 +1,200 @@
+import json
+import os
+import statistics
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from collectors.metrics import metrics
+
+POLLING_STATE_PATH = "data/metrics/polling.json"
+
+# cron は1日1回なので、これより短い間隔は「毎回」と同じ
+MIN_INTERVAL_HOURS = 12
+# cron の起動時刻の揺れ（GitHub Actions は遅れることがある）を吸収する余裕
+SLACK_HOURS = 2
+# どんなに更新の少ない収集元でも、この間隔では必ず確認する
+MAX_INTERVAL_HOURS = 30 * 24
+# 公表間隔のこの割合ごとに確認する（新着は平均して公表間隔の1/4程度の遅れで拾える）
+POLL_FRACTION = 0.5
+# 新着なしが続くと間隔を延ばす（新着があれば元に戻す）。
+# 公表間隔が推定できた収集元は MAX_BACKOFF_STEPS 回分まで、推定できない収集元は上限まで延ばす
+BACKOFF = 1.5
+MAX_BACKOFF_STEPS = 4
+# 直近の項目だけを載せるフィード（RSS など）は、保持期間のこの割合より長くは空けない
+# （空振りで間隔を延ばしても、次の確認までに項目がフィードから消えないように）
+FEED_POLL_FRACTION = 0.5
+# 公表間隔の推定に使う直近の公表日の数
+HISTORY_DATES = 30
+# 所要時間の指数移動平均の重み、初回の見込み（秒）
+ELAPSED_SMOOTHING = 0.3
+DEFAULT_ELAPSED = 10.0
+
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def estimate_cadence_days(dates):
+    """公表日の列から典型的な公表間隔（日数、間隔の中央値）を推定する。2日分未満なら None"""
+    days = sorted({d for d in (_parse_day(v) for v in dates) if d}, reverse=True)[:HISTORY_DATES]
+    gaps = [(a - b).days for a, b in zip(days, days[1:])]
+    return float(statistics.median(gaps)) if gaps else None
+
+
+def poll_interval_hours(cadence_days, misses=0, feed_retention_days=None):
+    """
+    確認間隔。公表間隔が分からない収集元は毎回確認から始め、空振りのたびに延ばす。
+    feed_retention_days（フィードに項目が残る日数）があれば、その FEED_POLL_FRACTION 倍を上限にする。
+    """
+    if cadence_days:
+        interval = cadence_days * 24 * POLL_FRACTION * BACKOFF ** min(misses, MAX_BACKOFF_STEPS)
+    else:
+        interval = MIN_INTERVAL_HOURS * BACKOFF ** misses
+    limit = MAX_INTERVAL_HOURS
+    if feed_retention_days:
+        limit = min(limit, feed_retention_days * 24 * FEED_POLL_FRACTION)
+    return max(min(interval, limit), MIN_INTERVAL_HOURS)
+
+
+def source_id(collector):
+    return getattr(collector, "source_id", None) or f"{collector.__class__.__name__}[{collector.country_code}]"
+
+
+class SourcePlan:
+    """1つの収集元の今回の判定"""
+    def __init__(self, collector, cadence_days, interval_hours, due_at, last_published, estimated_elapsed):
+        self.collector = collector
+        self.source_id = source_id(collector)
+        self.cadence_days = cadence_days
+        self.interval_hours = interval_hours
+        self.due_at = due_at
+        self.last_published = last_published
+        self.estimated_elapsed = estimated_elapsed
+        self.due = False
+        self.priority = 0.0
+        self.reason = ""
+
+
+class PollingScheduler:
+    """
+    収集元ごとの公表頻度に合わせて、今回の実行で確認する収集元を決める。
+    - 保存済みの公表日（date、無ければ collected_at）の間隔の中央値を公表間隔とし、その半分ごとに確認する
+    - 次の公表が見込まれる時期を過ぎていれば、確認間隔に関わらず確認する
+    - 新着なしが続くと間隔を延ばし、新着があれば元に戻す
+      （コレクターの feed_retention_days があれば、フィードから項目が消える前に確認する間隔で止める）
+    - 期限を過ぎた度合いの大きい順に並べ、見込み所要時間の合計が budget（秒）に収まる分だけ実行する
+    状態（最終確認日時・空振り回数・所要時間）は data/metrics/polling.json に保存する。
+    """
+    def __init__(self, path=POLLING_STATE_PATH, budget=None, workers=1, now=None):
+        self.path = Path(path)
+        self.budget = budget
+        self.workers = max(workers, 1)
+        self.now = now or datetime.now()
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _plan_one(self, collector):
+        entry = self.state.get(source_id(collector), {})
+        try:
+            dates = collector.publication_dates()
+        except Exception as e:
+            print(f"  [Polling] {source_id(collector)}: cannot read history: {e}")
+            dates = []
+        cadence = estimate_cadence_days(dates)
+        interval = poll_interval_hours(cadence, entry.get("misses", 0),
+                                       getattr(collector, "feed_retention_days", None))
+        last_published = max((d for d in map(_parse_day, dates) if d), default=None)
+        plan = SourcePlan(collector, cadence, interval, None, last_published,
+                          entry.get("avg_elapsed", DEFAULT_ELAPSED))
+
+        last_polled = entry.get("last_polled")
+        if not last_polled:
+            plan.due, plan.priority, plan.reason = True, float("inf"), "never polled"
+            return plan
+        last_polled = datetime.fromisoformat(last_polled)
+        due_at = last_polled + timedelta(hours=interval)
+        if cadence and last_published:
+            # 次の公表予定日を過ぎたら早めに確認する（長く途絶えている収集元には適用しない）
+            expected = datetime.combine(last_published + timedelta(days=cadence), datetime.min.time())
+            if self.now - expected < timedelta(days=cadence) and expected < due_at:
+                due_at = max(expected, last_polled + timedelta(hours=MIN_INTERVAL_HOURS))
+                plan.reason = "publication expected"
+        plan.due_at = due_at
+        if self.now + timedelta(hours=SLACK_HOURS) >= due_at:
+            plan.due = True
+            plan.priority = ((self.now - due_at).total_seconds() / 3600 + SLACK_HOURS) / interval
+            plan.reason = plan.reason or "interval elapsed"
+        return plan
+
+    def plan(self, collectors):
+        """全収集元の判定を、優先度の高い順に返す（budget はまだ適用しない）"""
+        plans = [self._plan_one(c) for c in collectors]
+        plans.sort(key=lambda p: (not p.due, -p.priority))
+        return plans
+
+    def select(self, collectors):
+        """今回実行するコレクターを返す"""
+        plans = self.plan(collectors)
+        selected = []
+        spent = 0.0
+        for plan in plans:
+            if not plan.due:
+                continue
+            cost = plan.estimated_elapsed / self.workers
+            if self.budget is not None and selected and spent + cost > self.budget:
+                plan.due = False
+                plan.reason = "over budget"
+                continue
+            spent += cost
+            selected.append(plan.collector)
+        self.plans = plans
+        metrics.gauge("polling.due", len(selected))
+        metrics.gauge("polling.skipped", len(plans) - len(selected))
+        metrics.gauge("polling.estimated_seconds", round(spent, 2))
+        self.report(plans, spent)
+        return selected
+
+    def record(self, collector, elapsed, added, error=None):
+        """実行結果を記録する（失敗は空振りに数えない）"""
+        entry = self.state.setdefault(source_id(collector), {})
+        entry["last_polled"] = self.now.isoformat(timespec="seconds")
+        previous = entry.get("avg_elapsed")
+        entry["avg_elapsed"] = round(elapsed if previous is None
+                                     else previous + ELAPSED_SMOOTHING * (elapsed - previous), 3)
+        if error:
+            entry["errors"] = entry.get("errors", 0) + 1
+            return
+        entry["errors"] = 0
+        if added:
+            entry["misses"] = 0
+            entry["last_new"] = entry["last_polled"]
+        else:
+            entry["misses"] = entry.get("misses", 0) + 1
+
+    def report(self, plans, spent=None):
+        due = sum(p.due for p in plans)
+        budget = f", budget {self.budget:.0f}s" if self.budget is not None else ""
+        estimate = f", est. {spent:.1f}s" if spent is not None else ""
+        print(f"  [Polling] {due} of {len(plans)} sources due{estimate}{budget}")
+        for p in plans:
+            cadence = f"{p.cadence_days:g}d" if p.cadence_days else "-"
+            when = "now" if p.due else (p.due_at.strftime("%Y-%m-%d %H:%M") if p.due_at else "-")
+            print(f"    {'RUN ' if p.due else 'skip'} {p.source_id:<22} cadence={cadence:<6} "
+                  f"every={p.interval_hours / 24:.1f}d next={when:<16} {p.reason}")
@@ -1,57 +1,187 @@
 import os
 import sys
-import requests
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 
 # インポートパスの解決（ModuleNotFoundError対策）
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from collectors.base_collector import BaseCollector
 
+# 収集位置がない初回に遡る日数（BACKFILL_FROM=YYYY-MM-DD で上書き可能）
+DEFAULT_LOOKBACK_DAYS = 7
+DC_DATE = "{http://purl.org/dc/elements/1.1/}date"
+
+
+def backfill_start(default_days=DEFAULT_LOOKBACK_DAYS):
+    """初回収集の開始日"""
+    value = os.environ.get("BACKFILL_FROM")
+    if value:
+        return value[:10]
+    return (date.today() - timedelta(days=default_days)).isoformat()
+
+
+def rss_item_date(item):
+    """RSS の pubDate / dc:date を YYYY-MM-DD に。どちらもなければ None"""
+    pub_date = item.findtext("pubDate")
+    if pub_date:
+        try:
+            return parsedate_to_datetime(pub_date).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            pass
+    dc_date = item.findtext(DC_DATE)
+    if dc_date and len(dc_date) >= 10:
+        return dc_date[:10]
+    return None
+
 class JapanEgovCollector(BaseCollector):
-    """日本のe-GovパブリックコメントRSSから取得"""
+    """
+    日本のe-GovパブリックコメントRSSから取得。
+    フィードは iterparse で1件ずつ処理し（全体をツリーにしない）、
+    前回の最新公開日（high_water）より古い項目は読み飛ばす。
+    """
+    BATCH_SIZE = 200
+    # フィードは直近の案件だけを載せる。保持期間は控えめに見積もり、2日より空けずに確認する
+    feed_retention_days = 4
+
     def __init__(self):
         super().__init__("asia", "jp")
         self.rss_url = "https://public-comment.e-gov.go.jp/servlet/PcmSearch?format=rss&target=0"
 
     def fetch(self) -> list:
-        items = []
+        return [item for items, _ in self.fetch_pages() for item in items]
+
+    def fetch_pages(self):
+        high_water = self.checkpoint().get("high_water")
+        newest = high_water
+        batch = []
+        response = None
         try:
-            response = requests.get(self.rss_url, timeout=20)
-            root = ET.fromstring(response.content)
-            for item in root.findall(".//item"):
-                title = item.find("title").text
-                link = item.find("link").text
-                items.append({
+            # 収集位置がまだなければ 304 で読み飛ばさず、フィードを読み切って収集位置を作る
+            response = self.conditional_get(self.rss_url, conditional=high_water is not None,
+                                            timeout=20, stream=True)
+            if response is None:
+                return
+            response.raw.decode_content = True
+            for _, elem in ET.iterparse(response.raw, events=("end",)):
+                if elem.tag != "item":
+                    continue
+                title = elem.findtext("title")
+                link = elem.findtext("link")
+                item_date = rss_item_date(elem)
+                elem.clear()
+                # 同じ日付は再取得する（同日の追加分を拾うため。重複は保存時に除かれる）
+                if not link or (high_water and item_date and item_date < high_water):
+                    continue
+                batch.append({
                     "title": title,
                     "url": link,
-                    "date": datetime.now().strftime("%Y-%m-%d"),
+                    "date": item_date or datetime.now().strftime("%Y-%m-%d"),
                     "summary": f"日本 e-Gov: {title}",
                     "status_level": "Notice"
                 })
+                if item_date and (newest is None or item_date > newest):
+                    newest = item_date
+                if len(batch) >= self.BATCH_SIZE:
+                    # フィードの並び順は保証されないので、収集位置は読み切ってから進める
+                    yield batch, None
+                    batch = []
         except Exception as e:
             print(f"JP Fetch Error: {e}")
-        return items
+            self.discard_validators()
+            if batch:
+                yield batch, None
+            return
+        finally:
+            # ストリーミング応答は閉じるまでホストの同時接続枠を使う
+            if response is not None:
+                response.close()
+        yield batch, {"high_water": newest} if newest else None
 
 class USFederalRegisterCollector(BaseCollector):
-    """米国連邦官報 APIから取得"""
-    def __init__(self):
+    """
+    米国連邦官報 APIから取得。
+    前回の最終公開日（high_water）以降を古い順にページングして取得し、
+    ページを保存するたびに収集位置を進めるので、数日がかりの遡及取得も続きから再開できる。
+    max_pages で打ち切った場合は、次に読むページ（cursor: クエリの起点日とページ番号）も記録し、
+    1日分が1回の実行で読み切れないほど多くても次回はその続きから取得する。
+    """
+    PER_PAGE = 100
+    # API は1クエリで取得できるページ数に上限があるため、上限に達したら日付で区切り直す
+    MAX_QUERY_PAGES = 50
+
+    def __init__(self, max_pages=None):
         super().__init__("americas", "us")
         self.api_url = "https://www.federalregister.gov/api/v1/documents.json"
+        # 1回の実行で取得する最大ページ数（残りは次回に持ち越す）
+        self.max_pages = max_pages or int(os.environ.get("COLLECT_MAX_PAGES", "20"))
 
     def fetch(self) -> list:
-        items = []
+        return [item for items, _ in self.fetch_pages() for item in items]
+
+    def _params(self, since, page):
+        return {
+            "per_page": self.PER_PAGE,
+            "page": page,
+            "order": "oldest",
+            "conditions[publication_date][gte]": since,
+        }
+
+    def _next_cursor(self, data, since, page, last_date):
+        """次に読むページ。None なら次回は high_water の日の1ページ目から（同日の追加分を拾うため）"""
+        if not data.get("next_page_url"):
+            return None
+        if page + 1 > self.MAX_QUERY_PAGES:
+            if last_date <= since:
+                # 1日分だけで API の上限を超える場合はこれ以上進めない
+                print(f"  [US] More than {self.MAX_QUERY_PAGES * self.PER_PAGE} documents on {since}; "
+                      f"the rest of that day cannot be paged")
+                return None
+            return {"since": last_date, "page": 1}
+        return {"since": since, "page": page + 1}
+
+    def fetch_pages(self):
+        checkpoint = self.checkpoint()
+        cursor = checkpoint.get("cursor") or {}
+        since = cursor.get("since") or checkpoint.get("high_water") or backfill_start()
+        page = cursor.get("page", 1)
+        high_water = checkpoint.get("high_water")
         try:
-            response = requests.get(self.api_url, params={"per_page": 5}, timeout=20)
-            for doc in response.json().get("results", []):
-                items.append({
-                    "title": doc.get("title"),
-                    "url": doc.get("html_url"),
-                    "date": doc.get("publication_date"),
-                    "summary": doc.get("abstract"),
-                    "status_level": "Warning"
-                })
+            for _ in range(self.max_pages):
+                response = self.conditional_get(self.api_url, params=self._params(since, page), timeout=20)
+                if response is None:
+                    # このページは保存済みのまま変わっていない。新着は後ろのページに付くので次を読む
+                    page += 1
+                    if page > self.MAX_QUERY_PAGES:
+                        return
+                    continue
+                if response.status_code != 200:
+                    # エラー応答の JSON を「結果なし」と取り違えて収集位置を消さないよう、記録せずに止める
+                    raise RuntimeError(f"HTTP {response.status_code} for {since} page {page}")
+                data = response.json()
+                items = [
+                    {
+                        "title": doc.get("title"),
+                        "url": doc.get("html_url"),
+                        "date": doc.get("publication_date"),
+                        "summary": doc.get("abstract"),
+                        "status_level": "Warning"
+                    }
+                    for doc in data.get("results", [])
+                ]
+                if not items:
+                    # 続きのページが空になった（記録していたページ位置を捨てる）
+                    if cursor:
+                        yield [], {"cursor": None}
+                    return
+                last_date = max(item["date"] or since for item in items)
+                high_water = max(high_water or last_date, last_date)
+                cursor = self._next_cursor(data, since, page, last_date)
+                yield items, {"high_water": high_water, "cursor": cursor}
+                if cursor is None:
+                    return
+                since, page = cursor["since"], cursor["page"]
         except Exception as e:
             print(f"US Fetch Error: {e}")
-        return items
+            self.discard_validators()
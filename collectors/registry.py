@@ -0,0 +1,90 @@
+import importlib
+import json
+import time
+from pathlib import Path
+
+from collectors.metrics import metrics
+
+REGISTRY_PATH = Path(__file__).with_name("registry.json")
+
+
+class CollectorRegistry:
+    """
+    collectors/registry.json の収集元とコレクタークラスの対応表。
+    各エントリの "collector" は "モジュール:クラス" の形式で、モジュールは実際に使う時に初めて読み込む
+    （--only で選ばれなかった収集元のモジュールや依存ライブラリは読み込まれない）。
+    "collector" のないエントリ（SourceDiscoverer が見つけた未実装の収集元など）は実行対象にならない。
+    任意の "options" はコンストラクタの引数、"enabled": false で一時的に外せる。
+    """
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = Path(path)
+        self.entries = self._load()
+        self.import_times = {}
+        self.errors = []
+        self._classes = {}
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  [Registry] Failed to load {self.path}: {e}")
+            return []
+        return [e for e in entries if isinstance(e, dict) and e.get("id")]
+
+    def select(self, only=None):
+        """
+        実行するエントリ。only は国コード（ISO3）またはエントリIDのリスト・カンマ区切り文字列
+        （大文字小文字は区別しない）。
+        """
+        if isinstance(only, str):
+            only = only.split(",")
+        wanted = {s.strip().lower() for s in only or () if s.strip()}
+        selected = []
+        for entry in self.entries:
+            if not entry.get("collector") or entry.get("enabled") is False:
+                continue
+            if wanted and str(entry.get("country", "")).lower() not in wanted and entry["id"].lower() not in wanted:
+                continue
+            selected.append(entry)
+        return selected
+
+    def unimplemented(self):
+        return [e for e in self.entries if not e.get("collector")]
+
+    def resolve(self, entry):
+        """エントリのコレクタークラスを返す（モジュールはここで初めて import する）"""
+        spec = entry["collector"]
+        cls = self._classes.get(spec)
+        if cls is None:
+            module_name, _, class_name = spec.partition(":")
+            if module_name not in self.import_times:
+                start = time.perf_counter()
+                importlib.import_module(module_name)
+                self.import_times[module_name] = time.perf_counter() - start
+                metrics.gauge("startup.import_seconds", round(self.import_times[module_name], 4), module=module_name)
+            cls = self._classes[spec] = getattr(importlib.import_module(module_name), class_name)
+        return cls
+
+    def create(self, only=None):
+        """選ばれたエントリのコレクターを作る。読み込めないものは報告して飛ばす"""
+        collectors = []
+        for entry in self.select(only):
+            try:
+                collector = self.resolve(entry)(**entry.get("options", {}))
+            except Exception as e:
+                self.errors.append(f"{entry['id']}: {e}")
+                metrics.incr("registry.errors")
+                print(f"  [Registry] {entry['id']}: cannot load {entry['collector']}: {e}")
+                continue
+            # PollingScheduler などが収集元を識別するためのID
+            collector.source_id = entry["id"]
+            if entry.get("feed_retention_days"):
+                collector.feed_retention_days = entry["feed_retention_days"]
+            collectors.append(collector)
+        return collectors
+
+    def report(self, collectors):
+        modules = ", ".join(f"{m} {t * 1000:.0f}ms" for m, t in self.import_times.items()) or "-"
+        print(f"  [Registry] {len(collectors)} collectors from {len(self.entries)} entries "
+              f"({len(self.unimplemented())} without collector, {len(self.errors)} failed); imported: {modules}")
@@ -0,0 +1,320 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from collectors.engine import PooledHttpClient
+from collectors.metrics import metrics
+from indexer.dedup import canonicalize_url
+
+VERIFICATION_CACHE_PATH = "data/cache/source_checks.json"
+
+# 掲載ページとみなす最低スコア（PDF 1件 = 1点、その他の文書形式 = 0.5点）
+MIN_SCORE = 3
+DOCUMENT_WEIGHTS = {".pdf": 1.0, ".xlsx": 0.5, ".xls": 0.5, ".csv": 0.5, ".docx": 0.5, ".doc": 0.5}
+# 確認のために読む本文の上限（巨大なページやファイルを最後まで読まない）
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+# 確認結果を使い回す期間（成功は長め、失敗は一時的なことがあるので短め）
+VERIFIED_TTL_DAYS = 7
+FAILED_TTL_DAYS = 1
+
+REQUIRED_FIELDS = ("id", "country", "org", "url")
+HREF_PATTERN = re.compile(r"""href\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+
+
+def normalize_domain(url):
+    """"https://WWW.Example.org:443/x" -> "example.org"（canonicalize_url のホスト部分）"""
+    return urlsplit(canonicalize_url(url)).netloc
+
+
+def normalize_url(url):
+    """
+    重複判定用のキー（ドメイン + パス）。canonicalize_url の結果からスキームとクエリを除いたもので、
+    スキーム・www.・末尾の / や index.html・クエリとフラグメントの違いは同じページとみなす。
+    """
+    parts = urlsplit(canonicalize_url(url))
+    return parts.netloc + (parts.path or "/")
+
+
+class SourceIndex:
+    """登録済み収集元の URL の索引（正規化したキーの集合で重複を O(1) で判定する）"""
+    def __init__(self, entries=()):
+        self.keys = {}
+        self.domains = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        url = entry.get("url") if isinstance(entry, dict) else entry
+        if not url:
+            return
+        key = normalize_url(url)
+        self.keys.setdefault(key, entry.get("id") if isinstance(entry, dict) else url)
+        self.domains.setdefault(normalize_domain(url), set()).add(key)
+
+    def match(self, url):
+        """同じページが登録済みならそのエントリIDを返す"""
+        return self.keys.get(normalize_url(url))
+
+    def __contains__(self, url):
+        return normalize_url(url) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def document_links(html, base_url):
+    """ページ内の文書リンク（拡張子で判定、重複は除く）と、そのスコアを返す"""
+    links = {}
+    for href in HREF_PATTERN.findall(html):
+        url = urljoin(base_url, href.strip())
+        path = urlsplit(url).path.lower()
+        ext = os.path.splitext(path)[1]
+        if ext in DOCUMENT_WEIGHTS:
+            links[url.split("#", 1)[0]] = DOCUMENT_WEIGHTS[ext]
+    return sorted(links), sum(links.values())
+
+
+class SourceCheck:
+    """1つの候補の確認結果"""
+    FIELDS = ("status", "reason", "http_status", "final_url", "doc_links", "score", "sample_links", "checked_at")
+
+    def __init__(self, candidate, key=None):
+        self.candidate = candidate
+        self.key = key
+        self.status = "pending"
+        self.reason = ""
+        self.http_status = None
+        self.final_url = None
+        self.doc_links = 0
+        self.score = 0.0
+        self.sample_links = []
+        self.checked_at = None
+        self.elapsed = 0.0
+        self.cached = False
+
+    @property
+    def verified(self):
+        return self.status == "verified"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def load(self, data):
+        for name in self.FIELDS:
+            if name in data:
+                setattr(self, name, data[name])
+        self.cached = True
+        return self
+
+
+class VerificationCache:
+    """
+    URL（正規化したキー）ごとの確認結果のキャッシュ。
+    同じ候補が何度提案されても、有効期間内はページを取りに行かない。
+    """
+    def __init__(self, path=VERIFICATION_CACHE_PATH, verified_ttl_days=VERIFIED_TTL_DAYS,
+                 failed_ttl_days=FAILED_TTL_DAYS):
+        self.path = Path(path) if path else None
+        self.verified_ttl = verified_ttl_days * 86400
+        self.failed_ttl = failed_ttl_days * 86400
+        self.entries = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, now=None):
+        with self._lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return None
+        ttl = self.verified_ttl if entry.get("status") == "verified" else self.failed_ttl
+        if (now or time.time()) - entry.get("stored_at", 0) > ttl:
+            return None
+        return entry
+
+    def put(self, key, check):
+        entry = check.to_dict()
+        entry["stored_at"] = time.time()
+        with self._lock:
+            self.entries[key] = entry
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class SourceVerifier:
+    """
+    SourceDiscoverer が提案した収集元の候補を確認する。
+    1. 必須項目と URL の形式を確認し、登録済みの収集元・同じ回の候補と（ドメイン + パスで）重複を除く
+    2. 残った候補のページを並行して取得する（ホストごとの同時接続数は HTTP クライアントの HostLimiter が
+       per_domain までに抑える。http を渡した場合はそのクライアントの設定に従う）
+    3. ページ内の文書リンク（PDF など）を数えてスコアを付け、MIN_SCORE 以上を verified とする
+    確認結果は VerificationCache に保存し、有効期間内は再取得しない。
+    """
+    def __init__(self, http=None, max_workers=8, per_domain=2, timeout=15, min_score=MIN_SCORE,
+                 cache=None, user_agent=None):
+        self.http = http or PooledHttpClient(per_host_concurrency=per_domain, user_agent=user_agent)
+        self.max_workers = max_workers
+        self.per_domain = per_domain
+        self.timeout = timeout
+        self.min_score = min_score
+        self.cache = cache if cache is not None else VerificationCache()
+
+    def screen(self, candidates, index):
+        """取得前の確認（形式・重複）。取得が必要な候補は status "pending" のまま返す"""
+        seen = {}
+        checks = []
+        for candidate in candidates:
+            check = SourceCheck(candidate)
+            checks.append(check)
+            if not isinstance(candidate, dict) or any(not candidate.get(f) for f in REQUIRED_FIELDS):
+                check.status, check.reason = "invalid", "missing " + ", ".join(
+                    f for f in REQUIRED_FIELDS if not isinstance(candidate, dict) or not candidate.get(f))
+                continue
+            url = str(candidate["url"]).strip()
+            if urlsplit(url).scheme.lower() not in ("http", "https") or not normalize_domain(url):
+                check.status, check.reason = "invalid", f"not an http(s) URL: {url}"
+                continue
+            check.key = normalize_url(url)
+            registered = index.match(url)
+            if registered is not None:
+                check.status, check.reason = "duplicate", f"already registered as {registered}"
+            elif check.key in seen:
+                check.status, check.reason = "duplicate", f"same page as candidate {seen[check.key]}"
+            else:
+                seen[check.key] = candidate["id"]
+        return checks
+
+    def probe(self, check):
+        """候補のページを取得して文書リンクを数える"""
+        url = str(check.candidate["url"]).strip()
+        start = time.perf_counter()
+        try:
+            # 本文を読み終えて close() するまでホストの同時接続枠を使う
+            response = self.http.get(url, timeout=self.timeout, stream=True, allow_redirects=True)
+            try:
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) >= MAX_PAGE_BYTES:
+                        break
+            finally:
+                response.close()
+        except Exception as e:
+            check.status, check.reason = "unreachable", str(e)[:200]
+            return check
+        finally:
+            check.elapsed = time.perf_counter() - start
+            check.checked_at = datetime.now().isoformat(timespec="seconds")
+
+        check.http_status = response.status_code
+        check.final_url = response.url
+        content_type = response.headers.get("Content-Type", "").lower()
+        if response.status_code != 200:
+            check.status, check.reason = "unreachable", f"HTTP {response.status_code}"
+        elif "html" not in content_type:
+            # PDF そのものなどは掲載ページではない
+            check.status, check.reason = "not_listing", f"content type {content_type or 'unknown'}"
+        else:
+            encoding = response.encoding or "utf-8"
+            links, score = document_links(body.decode(encoding, errors="replace"), response.url)
+            check.doc_links, check.score, check.sample_links = len(links), score, links[:5]
+            if score >= self.min_score:
+                check.status, check.reason = "verified", f"{len(links)} document links"
+            else:
+                check.status, check.reason = "no_documents", f"{len(links)} document links (score {score:g})"
+        return check
+
+    def _probe_cached(self, check):
+        entry = self.cache.get(check.key)
+        if entry is not None:
+            metrics.incr("discovery.cache_hits")
+            return check.load(entry)
+        self.probe(check)
+        self.cache.put(check.key, check)
+        return check
+
+    def verify(self, candidates, existing=()):
+        """候補ごとの SourceCheck を候補の順で返す"""
+        index = existing if isinstance(existing, SourceIndex) else SourceIndex(existing)
+        checks = self.screen(candidates, index)
+        pending = [c for c in checks if c.status == "pending"]
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="verify") as pool:
+                list(pool.map(self._probe_cached, pending))
+            self.cache.save()
+        for check in pending:
+            # リダイレクト先が登録済みのページだった場合
+            registered = index.match(check.final_url) if check.final_url else None
+            if registered is not None and check.verified:
+                check.status, check.reason = "duplicate", f"redirects to {registered}"
+        for check in checks:
+            metrics.incr("discovery.checked", status=check.status)
+        return checks
+
+    def report(self, checks):
+        print("--- Source Verification ---")
+        for c in checks:
+            name = c.candidate.get("id", "?") if isinstance(c.candidate, dict) else "?"
+            cached = " (cached)" if c.cached else ""
+            print(f"  {name:<28} {c.status:<13} {c.reason}{cached}")
+        verified = sum(c.verified for c in checks)
+        print(f"  Total: {len(checks)} candidates, {verified} verified")
+
+    def close(self):
+        self.http.close()
+
+
+def promote(checks, registry_path):
+    """
+    verified の候補を registry.json に追記する（"collector" は付けないので、
+    コレクターを実装するまでは実行対象にならない）。追記したエントリを返す。
+    """
+    registry_path = Path(registry_path)
+    with open(registry_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    index = SourceIndex(entries)
+    ids = {e.get("id") for e in entries if isinstance(e, dict)}
+    added = []
+    for check in checks:
+        if not check.verified or check.candidate["url"] in index:
+            continue
+        entry = {k: check.candidate[k] for k in ("id", "country", "org", "url", "category") if k in check.candidate}
+        base_id, n = entry["id"], 2
+        while entry["id"] in ids:
+            entry["id"] = f"{base_id}_{n}"
+            n += 1
+        entry["verified"] = {"checked_at": check.checked_at, "doc_links": check.doc_links, "score": check.score}
+        entries.append(entry)
+        index.add(entry)
+        ids.add(entry["id"])
+        added.append(entry)
+    if added:
+        tmp_path = registry_path.with_name(registry_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=4)
+            f.write("\n")
+        os.replace(tmp_path, registry_path)
+    print(f"  [Discovery] Promoted {len(added)} verified sources to {registry_path}")
+    return added
@@ -48,8 +48,26 @@ class MockAggregator(BaseCollector):
 
     STATUS_LEVELS = ["Critical", "Warning", "Notice", "Info"]
 
-    def __init__(self, region, country_code):
+    def __init__(self, region, country_code, rng=None):
         super().__init__(region, country_code)
+        # 乱数生成器（ベンチマークでは seed 付きの random.Random を渡して再現可能にする）
+        self.random = rng or random
+
+    def make_item(self, date_str):
+        """ダミードキュメントを1件作る"""
+        title = f"Official Update: Regulatory Framework 2025-{self.random.randint(1, 100)}"
+        # 修正ポイント: 架空のURLではなく、Google検索などで「機能する」URLにする
+        # その国の政府ドキュメントを検索するクエリを作成
+        search_query = f"{self.country_code} government {title}"
+        encoded_query = urllib.parse.quote(search_query)
+        functional_url = f"https://www.google.com/search?q={encoded_query}"
+        return {
+            "title": title,
+            "url": functional_url,
+            "date": date_str,
+            "summary": f"Public notification from the government of {self.country_code} regarding regional updates and policy changes.",
+            "status_level": self.random.choice(self.STATUS_LEVELS)
+        }
 
     def fetch(self) -> list:
         """
@@ -58,38 +76,30 @@ class MockAggregator(BaseCollector):
         """
         items = []
         # すべての国で毎回更新があるわけではないため、頻度を調整
-        if random.random() > 0.3:
-            num_items = random.randint(1, 3)
+        if self.random.random() > 0.3:
+            num_items = self.random.randint(1, 3)
             for i in range(num_items):
-                days_ago = random.randint(0, 7)
+                days_ago = self.random.randint(0, 7)
                 date_str = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
-                
-                title = f"Official Update: Regulatory Framework 2025-{random.randint(1, 100)}"
-                # 修正ポイント: 架空のURLではなく、Google検索などで「機能する」URLにする
-                # その国の政府ドキュメントを検索するクエリを作成
-                search_query = f"{self.country_code} government {title}"
-                encoded_query = urllib.parse.quote(search_query)
-                functional_url = f"https://www.google.com/search?q={encoded_query}"
-                
-                items.append({
-                    "title": title,
-                    "url": functional_url,
-                    "date": date_str,
-                    "summary": f"Public notification from the government of {self.country_code} regarding regional updates and policy changes.",
-                    "status_level": random.choice(self.STATUS_LEVELS)
-                })
+                items.append(self.make_item(date_str))
         return items
 
     @classmethod
-    def run_all(cls):
+    def run_all(cls, engine=None):
         """
         全リストのデータを収集・保存します。
+        各国の fetch/save は CollectionEngine で並行実行されます。
         """
-        total_added = 0
+        from collectors.engine import CollectionEngine
+
+        own_engine = engine is None
+        engine = engine or CollectionEngine()
+        collectors = []
         for country in cls.COUNTRIES:
-            collector = cls(country["region"], country["code"])
             print(f"Processing: {country['name']} [{country['code'].upper()}]")
-            data = collector.fetch()
-            added = collector.save_data(data)
-            total_added += added
-        return total_added
+            collectors.append(cls(country["region"], country["code"]))
+        results = engine.run(collectors)
+        engine.report(results)
+        if own_engine:
+            engine.close()
+        return sum(r.added for r in results)
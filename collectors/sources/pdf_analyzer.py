@@ -1,28 +1,56 @@
 import os
 import json
-import google.generativeai as genai
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from collectors.metrics import metrics
+from collectors.pdf_text import CHUNK_CHARS, MAX_CHUNKS, PDFTextCache
+
+
+def _prompt_version(prompts, chunk_chars, max_chunks=MAX_CHUNKS):
+    """分析キャッシュのバージョン。結果を左右するプロンプトと分割の設定をまとめてハッシュする"""
+    h = hashlib.sha256()
+    for prompt in prompts:
+        h.update(prompt.encode("utf-8") + b"\0")
+    h.update(f"{chunk_chars}:{max_chunks}".encode())
+    return h.hexdigest()[:12]
+
+
+class AnalysisUnavailable(Exception):
+    """モデルクライアントが無く、キャッシュにも結果が無い場合"""
+
+
+class GeminiClient:
+    """
+    google.generativeai をラップしたモデルクライアント。
+    SDK は実際に使う時だけ読み込む（偽クライアントでの検証は SDK なしで動く）。
+    """
+    def __init__(self, api_key, model_name):
+        import google.generativeai as genai
+        self.genai = genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, pdf_path: Path):
+        # PDFファイルをアップロード
+        sample_file = self.genai.upload_file(path=pdf_path, mime_type="application/pdf")
+        response = self.model.generate_content([prompt, sample_file])
+        return response.text
+
+    def generate_text(self, prompt, text):
+        # 抽出済みのテキストだけを送る（アップロード不要）
+        response = self.model.generate_content([prompt, text])
+        return response.text
+
+
 class PDFAnalyzer:
     """Gemini APIを使用してPDFを分析する"""
-    def __init__(self, api_key):
-        self.api_key = api_key
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash-preview-09-2025')
-        else:
-            self.model = None
+    MODEL_NAME = 'gemini-2.5-flash-preview-09-2025'
 
-    def analyze(self, pdf_path: Path):
-        """PDFの内容をAIで要約・分類する"""
-        if not self.model:
-            return self._fallback_analysis()
-
-        try:
-            # PDFファイルをアップロード
-            sample_file = genai.upload_file(path=pdf_path, mime_type="application/pdf")
-            
-            prompt = """
+    PROMPT = """
             この公的ドキュメントを読み、以下の項目を日本語のJSON形式で出力してください。
             - summary: 150文字以内の簡潔な要約
             - risk_level: 文脈に基づいた重要度 (Critical, Warning, Notice, Info)
@@ -30,15 +58,163 @@ class PDFAnalyzer:
             - insights: 注目すべきポイント3点のリスト
             JSON以外のテキストは含めないでください。
             """
-            
-            response = self.model.generate_content([prompt, sample_file])
-            # JSON文字列を抽出
-            raw_text = response.text.strip().replace('```json', '').replace('```', '')
-            return json.loads(raw_text)
+
+    # 長い文書は分割して要点を抜き出し（map）、その要点から PROMPT で最終結果を作る（reduce）
+    MAP_PROMPT = """
+            以下は公的ドキュメントの一部（{label}）のテキストです。
+            数値・日付・政策変更・リスクに関わる記述を中心に、要点を日本語の箇条書き（10点以内）で抜き出してください。
+            """
+    REDUCE_PREFIX = "以下は長い公的ドキュメントを分割して抜き出した要点です。これを元の文書として扱ってください。\n\n"
+
+    # プロンプト（map / reduce 用を含む）やチャンクの大きさを変更すると自動的に変わり、分析キャッシュが無効化される
+    PROMPT_VERSION = _prompt_version((PROMPT, MAP_PROMPT, REDUCE_PREFIX), CHUNK_CHARS)
+
+    def __init__(self, api_key, cache=None, client=None, text_cache=None, max_calls=None, chunk_chars=CHUNK_CHARS):
+        self.api_key = api_key
+        self.cache = cache
+        # PDFのテキスト抽出結果のキャッシュ。False ならテキスト抽出を使わず常にPDFをアップロードする
+        self.text_cache = PDFTextCache() if text_cache is None else text_cache
+        self.chunk_chars = chunk_chars
+        self.prompt_version = _prompt_version((self.PROMPT, self.MAP_PROMPT, self.REDUCE_PREFIX), chunk_chars)
+        # 全文書を通したモデル呼び出しの同時実行数（map の並列数もこれで抑える）
+        max_calls = max_calls or int(os.environ.get("ANALYSIS_MAX_CALLS", "8"))
+        self.call_slots = threading.BoundedSemaphore(max_calls)
+        self.map_workers = max_calls
+        self.stats = {"text": 0, "upload": 0, "calls": 0, "pages": 0, "text_chars": 0, "upload_bytes": 0}
+        self._lock = threading.Lock()
+        # client は generate(prompt, pdf_path) -> str を持つ任意のオブジェクト（テスト用の偽クライアント可）
+        if client is not None:
+            self.client = client
+        elif self.api_key:
+            self.client = GeminiClient(self.api_key, self.MODEL_NAME)
+        else:
+            self.client = None
+
+    @staticmethod
+    def content_hash(pdf_path: Path):
+        """PDFの内容ハッシュ。PDFStore のファイル名（sha256）はそのまま使う"""
+        stem = pdf_path.stem
+        if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+            return stem
+        h = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def cached(self, pdf_path: Path):
+        """キャッシュ済みの分析結果を返す。無ければ None"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.content_hash(pdf_path), self.prompt_version, self.MODEL_NAME)
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+    def _call(self, acquire, generate, *args, tokens=None, pdf_path=None):
+        """モデルを1回呼ぶ（予算の確保と同時実行数の制限をここでまとめて行う）"""
+        if acquire is not None:
+            acquire(tokens=tokens, pdf_path=pdf_path)
+        with self.call_slots:
+            start = time.perf_counter()
+            try:
+                return generate(*args)
+            finally:
+                self._count(calls=1)
+                metrics.observe("analysis.call_latency", time.perf_counter() - start)
+
+    @staticmethod
+    def _text_tokens(*texts):
+        # 日本語と英語が混ざるので、3文字あたり1トークンと多めに見積もる
+        return sum(-(-len(t) // 3) for t in texts)
+
+    def _generate_text(self, prompt, text, acquire):
+        return self._call(acquire, self.client.generate_text, prompt, text,
+                          tokens=self._text_tokens(prompt, text))
+
+    def _map_reduce(self, chunks, acquire):
+        """チャンクごとの要点抽出を並行して行い、要点をまとめたものに PROMPT を適用する"""
+        while len(chunks) > 1:
+            def summarize(chunk):
+                label, text = chunk
+                return f"[{label}]\n" + self._generate_text(self.MAP_PROMPT.format(label=label), text, acquire).strip()
+
+            with ThreadPoolExecutor(max_workers=min(self.map_workers, len(chunks)), thread_name_prefix="map") as pool:
+                notes = list(pool.map(summarize, chunks))
+            # 要点がまだ長ければ、要点をさらにまとめる
+            joined = "\n\n".join(notes)
+            if len(joined) <= self.chunk_chars:
+                return self._generate_text(self.PROMPT, self.REDUCE_PREFIX + joined, acquire)
+            groups, group = [], []
+            for note in notes:
+                if group and sum(len(n) for n in group) + len(note) > self.chunk_chars:
+                    groups.append(group)
+                    group = []
+                group.append(note)
+            groups.append(group)
+            chunks = [(f"要点 {i + 1}", "\n\n".join(g)) for i, g in enumerate(groups)]
+        return self._generate_text(self.PROMPT, chunks[0][1], acquire)
+
+    def _extract_text(self, pdf_path: Path):
+        """テキストで分析できるならページテキストを返す。スキャンPDFなどは None"""
+        if self.text_cache is False or not hasattr(self.client, "generate_text"):
+            return None
+        text = self.text_cache.extract(pdf_path, self.content_hash(pdf_path))
+        return text if text.has_text else None
+
+    def analyze_strict(self, pdf_path: Path, check_cache=True, acquire=None):
+        """
+        PDFを分析し、失敗時は例外をそのまま送出する（AnalysisScheduler 用）。
+        キャッシュにあればAPIは呼ばない。
+        テキスト層のあるPDFはページごとのテキストだけを送り（長ければ分割して map-reduce）、
+        テキスト層のないスキャンPDFだけをファイルごとアップロードする。
+        acquire(tokens=, pdf_path=) はモデルを呼ぶたびに呼ばれる（AnalysisScheduler のレート予算）。
+        """
+        if check_cache:
+            cached = self.cached(pdf_path)
+            if cached is not None:
+                return cached
+
+        if self.client is None:
+            raise AnalysisUnavailable("model client is not configured")
+
+        text = self._extract_text(pdf_path)
+        if text is not None:
+            chunks = text.chunks(self.chunk_chars)
+            self._count(text=1, pages=text.page_count, text_chars=text.chars)
+            metrics.incr("analysis.mode", mode="text")
+            metrics.observe("analysis.chunks", len(chunks))
+            raw_text = self._map_reduce(chunks, acquire)
+        else:
+            self._count(upload=1, upload_bytes=pdf_path.stat().st_size)
+            metrics.incr("analysis.mode", mode="upload")
+            raw_text = self._call(acquire, self.client.generate, self.PROMPT, pdf_path, pdf_path=pdf_path)
+        # JSON文字列を抽出
+        raw_text = raw_text.strip().replace('```json', '').replace('```', '')
+        result = json.loads(raw_text)
+
+        if self.cache is not None:
+            self.cache.put(self.content_hash(pdf_path), self.prompt_version, self.MODEL_NAME, result)
+        return result
+
+    def analyze(self, pdf_path: Path):
+        """PDFの内容をAIで要約・分類する（キャッシュがあれば再分析しない）"""
+        try:
+            return self.analyze_strict(pdf_path)
+        except AnalysisUnavailable:
+            return self._fallback_analysis()
         except Exception as e:
+            # フォールバック結果はキャッシュしない
             print(f"AI Analysis Error for {pdf_path.name}: {e}")
             return self._fallback_analysis()
 
+    def report(self):
+        s = self.stats
+        print(f"  [Analyzer] text={s['text']} ({s['pages']} pages, {s['text_chars'] / 1024:.0f}K chars) "
+              f"upload={s['upload']} ({s['upload_bytes'] / 1024 / 1024:.1f}MB) model_calls={s['calls']}")
+
     def _fallback_analysis(self):
         return {
             "summary": "AI分析がスキップされました（APIキー未設定またはエラー）。",
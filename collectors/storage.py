@@ -0,0 +1,298 @@
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+from indexer.document import intern_fields
+
+
+class SegmentStore:
+    """
+    国ごとの追記専用ストレージ。
+    data/regions/<region>/<cc>/
+        seg-000001.jsonl ... : 1行1ドキュメントの追記専用セグメント
+        index.sqlite         : URL -> (セグメント, オフセット, 長さ, 日付) の索引（git には含めず、
+                               無いかセグメントの大きさが記録と違えばセグメントから作り直す）
+    追加は新規分だけのコスト（O(新規件数)）で済み、並べ替えや整理は compact() で別途行う。
+    旧形式の <cc>.json があれば初回オープン時に自動で取り込む。
+    """
+    SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, root, legacy_json=None, first_segment=1):
+        self.root = Path(root)
+        self.legacy_json = Path(legacy_json) if legacy_json else None
+        self.index_path = self.root / "index.sqlite"
+        # セグメントがまだない場合に使う番号（compact は既存と重ならない番号で書き出す）
+        self.first_segment = first_segment
+
+    @classmethod
+    def for_country(cls, region_dir, country_code):
+        region_dir = Path(region_dir)
+        return cls(region_dir / country_code, legacy_json=region_dir / f"{country_code}.json")
+
+    @property
+    def exists(self):
+        """索引かセグメントがあるか（旧形式の JSON だけの場合は False）"""
+        return self.index_path.exists() or bool(self._segments())
+
+    def _connect(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                url TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                date TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS docs_date ON docs(date)")
+        # 索引を作った時点の各セグメントの大きさ。実際のファイルと違えば索引は別の状態のもの
+        conn.execute("CREATE TABLE IF NOT EXISTS segments (segment INTEGER PRIMARY KEY, size INTEGER NOT NULL)")
+        sizes = self._segment_sizes()
+        if dict(conn.execute("SELECT segment, size FROM segments")) != sizes:
+            # 索引が無い・古い形式・キャッシュから戻した索引がコミットされたセグメントと合わない場合
+            self._reindex(conn, sizes)
+        return conn
+
+    def _segment_sizes(self):
+        return {number: self._segment_path(number).stat().st_size for number in self._segments()}
+
+    def _record_sizes(self, conn, sizes):
+        conn.execute("DELETE FROM segments")
+        conn.executemany("INSERT INTO segments VALUES (?, ?)", sizes.items())
+
+    def _reindex(self, conn, sizes):
+        """セグメントを先頭から読み、索引を作り直す（同じ URL は最初の行を使う。書きかけの行は無視する）"""
+        conn.execute("DELETE FROM docs")
+        self._record_sizes(conn, sizes)
+        if not sizes:
+            conn.commit()
+            return
+        rows = 0
+        for number in self._segments():
+            offset = 0
+            with open(self._segment_path(number), "rb") as f:
+                for line in f:
+                    length = len(line)
+                    try:
+                        item = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        conn.execute("INSERT OR IGNORE INTO docs VALUES (?, ?, ?, ?, ?)",
+                                     (item.get("url", ""), number, offset, length, item.get("date")))
+                        rows += 1
+                    offset += length
+        conn.commit()
+        print(f"  [Storage] Rebuilt {self.index_path} from {rows} segment lines")
+
+    def _segment_path(self, number):
+        return self.root / f"seg-{number:06d}.jsonl"
+
+    def _segments(self):
+        if not self.root.exists():
+            return []
+        return sorted(int(p.stem[4:]) for p in self.root.glob("seg-*.jsonl"))
+
+    def _migrate_legacy(self, conn):
+        """旧形式の JSON 配列ファイルをセグメントへ取り込み、.migrated に改名する"""
+        if not self.legacy_json or not self.legacy_json.exists():
+            return
+        try:
+            with open(self.legacy_json, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            items = []
+        # 旧ファイルは日付の新しい順なので、古い順に追記する
+        self._append(conn, list(reversed(items)))
+        conn.commit()
+        os.replace(self.legacy_json, self.legacy_json.with_suffix(".json.migrated"))
+
+    def _append(self, conn, items):
+        segments = self._segments()
+        number = segments[-1] if segments else self.first_segment
+
+        urls = [item.get("url", "") for item in items]
+        known = set()
+        # SQLite の変数上限を避けて分割して問い合わせる
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            rows = conn.execute(
+                f"SELECT url FROM docs WHERE url IN ({','.join('?' * len(chunk))})", chunk
+            )
+            known.update(row[0] for row in rows)
+
+        rows = []
+        f = open(self._segment_path(number), "ab")
+        try:
+            offset = f.seek(0, os.SEEK_END)
+            for item in items:
+                url = item.get("url", "")
+                if url in known:
+                    continue
+                known.add(url)
+                line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+                # 1回の追記が大きくてもセグメントが上限を超えないよう、書く前に次へ切り替える
+                if offset and offset + len(line) > self.SEGMENT_MAX_BYTES:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    number += 1
+                    f = open(self._segment_path(number), "ab")
+                    offset = 0
+                f.write(line)
+                rows.append((url, number, offset, len(line), item.get("date")))
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        # セグメント書き込み後に索引を更新（途中で落ちても索引にない行は compact で消える）
+        conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?)", rows)
+        self._record_sizes(conn, self._segment_sizes())
+        return len(rows)
+
+    def append(self, items):
+        """未登録URLのドキュメントだけを追記し、追加件数を返す"""
+        conn = self._connect()
+        try:
+            self._migrate_legacy(conn)
+            added = self._append(conn, items)
+            conn.commit()
+            return added
+        finally:
+            conn.close()
+
+    def __contains__(self, url):
+        conn = self._connect()
+        try:
+            self._migrate_legacy(conn)
+            return conn.execute("SELECT 1 FROM docs WHERE url = ?", (url,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def recent_dates(self, limit=50):
+        """新しい順の公表日（重複なし）。収集頻度の推定に使う（読み取りでは何も作らない）"""
+        if not self.exists:
+            if self.legacy_json and self.legacy_json.exists():
+                with open(self.legacy_json, "r", encoding="utf-8") as f:
+                    dates = {str(item["date"]) for item in json.load(f) if item.get("date")}
+                return sorted(dates, reverse=True)[:limit]
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT date FROM docs WHERE date IS NOT NULL ORDER BY date DESC LIMIT ?", (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def files(self):
+        """内容を構成するファイル（差分インデックスの変更検知用）"""
+        files = [self._segment_path(n) for n in self._segments()]
+        if self.legacy_json and self.legacy_json.exists():
+            files.append(self.legacy_json)
+        return files
+
+    def _read_rows(self, rows):
+        handles = {}
+        try:
+            for segment, offset, length in rows:
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self._segment_path(segment), "rb")
+                f.seek(offset)
+                # 国コード・地域・重要度などの値は全文書で共有させる
+                yield intern_fields(json.loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def iter_all(self):
+        """全ドキュメントを日付の新しい順（同日は追加順）に1件ずつ返す"""
+        if not self.exists:
+            # 未移行の旧ファイルはそのまま読む（読み取りでは変更しない）
+            if self.legacy_json and self.legacy_json.exists():
+                with open(self.legacy_json, "r", encoding="utf-8") as f:
+                    return iter(json.load(f))
+            return iter(())
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT segment, offset, length FROM docs ORDER BY date DESC, rowid ASC"
+            ).fetchall()
+        finally:
+            conn.close()
+        return self._read_rows(rows)
+
+    def read_all(self):
+        """全ドキュメントを日付の新しい順（同日は追加順）のリストで返す"""
+        return list(self.iter_all())
+
+    def compact(self):
+        """
+        全ドキュメントを日付順に新しいセグメントへ書き直し、索引を再構築する。
+        索引に載っていない孤立行（書き込み途中の失敗）もここで取り除かれる。
+        新しいセグメントは既存と重ならない番号で書き、索引を置き換えてから古いセグメントを消すので、
+        途中で落ちてもどちらかの索引とセグメントの組が必ず残る（残った孤立セグメントは次回の compact で消える）。
+        (ドキュメント数, 古いセグメント数, 新しいセグメント数) を返す。
+        """
+        if not self.exists and not (self.legacy_json and self.legacy_json.exists()):
+            return 0, 0, 0
+        conn = self._connect()
+        try:
+            self._migrate_legacy(conn)
+        finally:
+            conn.close()
+        # 古い日付から書く（同じ日付の中では追加順を保つ）
+        docs = sorted(self.read_all(), key=lambda d: str(d.get("date") or ""))
+        old_segments = self._segments()
+        tmp_root = self.root.with_name(self.root.name + ".compact")
+        # 前回の compact が途中で落ちた残骸は使わない
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        tmp_root.mkdir(parents=True)
+        tmp = SegmentStore(tmp_root, first_segment=(old_segments[-1] + 1) if old_segments else 1)
+        conn = tmp._connect()
+        try:
+            tmp._append(conn, docs)
+            conn.commit()
+        finally:
+            conn.close()
+        new_segments = tmp._segments()
+
+        # 新しいセグメント -> 索引（ここで切り替わる）-> 古いセグメントの削除 の順に行う
+        for number in new_segments:
+            os.replace(tmp._segment_path(number), self._segment_path(number))
+        os.replace(tmp.index_path, self.index_path)
+        for number in old_segments:
+            self._segment_path(number).unlink()
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        return len(docs), len(old_segments), len(new_segments)
+
+
+def iter_country_stores(regions_path):
+    """data/regions 以下の (region, country_code, SegmentStore) を列挙する（旧形式も含む）"""
+    regions_path = Path(regions_path)
+    if not regions_path.exists():
+        return
+    for region_dir in sorted(p for p in regions_path.iterdir() if p.is_dir()):
+        codes = {p.stem for p in region_dir.glob("*.json")}
+        codes.update(p.name for p in region_dir.iterdir()
+                     if p.is_dir() and SegmentStore(p).exists)
+        for code in sorted(codes):
+            yield region_dir.name, code, SegmentStore.for_country(region_dir, code)
+
+
+def compact_all(regions_path="data/regions"):
+    for region, code, store in iter_country_stores(regions_path):
+        docs, old_segments, new_segments = store.compact()
+        print(f"  [Compact] {region}/{code}: {docs} docs, {old_segments} segments -> {new_segments}")
+
+
+if __name__ == "__main__":
+    compact_all(sys.argv[1] if len(sys.argv) > 1 else "data/regions")
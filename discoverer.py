@@ -1,8 +1,12 @@
+import argparse
 import json
 import os
 import requests
 import time
 
+from collectors.registry import REGISTRY_PATH
+from collectors.source_verifier import SourceIndex, SourceVerifier, promote
+
 class SourceDiscoverer:
     """
     Gemini APIを使用して、インターネットから新しい経済文書のソース（公式サイト）を探索するクラス。
@@ -20,6 +24,8 @@ class SourceDiscoverer:
 
         existing_orgs = [s['org'] for s in existing_sources]
         existing_urls = [s['url'] for s in existing_sources]
+        # 登録済みURLの索引（www. や末尾の / などの表記揺れも同じページとみなす）
+        index = SourceIndex(existing_sources)
         
         system_instruction = """あなたは世界中の公的経済データの所在を特定するエキスパートです。
 必ず指定されたJSON形式の配列のみを回答してください。説明文は一切不要です。"""
@@ -66,11 +72,12 @@ class SourceDiscoverer:
                         print("    [Error] AI returned invalid JSON. Retrying...")
                         continue
 
-                    # フィルタリング
+                    # フィルタリング（回答内の重複も除く。ページの確認は SourceVerifier で行う）
                     unique_new_sources = []
                     for ns in new_sources:
-                        if ns['url'] not in existing_urls:
+                        if isinstance(ns, dict) and ns.get('url') and ns['url'] not in index:
                             unique_new_sources.append(ns)
+                            index.add(ns)
                     
                     print(f"    [Success] AI suggested {len(new_sources)} sources, {len(unique_new_sources)} are new.")
                     return unique_new_sources
@@ -82,3 +89,41 @@ class SourceDiscoverer:
                 time.sleep(2**i)
         
         return []
+
+
+def discover(registry_path=REGISTRY_PATH, candidates_path=None, dry_run=False, workers=8, per_domain=2):
+    """
+    新しい収集元を探し、ページを確認できたものだけを registry.json に追加する。
+    candidates_path を渡すと AI の代わりにそのJSON配列を候補にする（ローカル環境での確認用）。
+    """
+    with open(registry_path, "r", encoding="utf-8") as f:
+        existing = json.load(f)
+    if candidates_path:
+        with open(candidates_path, "r", encoding="utf-8") as f:
+            candidates = json.load(f)
+    else:
+        candidates = SourceDiscoverer().search_new_sources(existing)
+    if not candidates:
+        print("  [Discovery] No candidates.")
+        return []
+
+    verifier = SourceVerifier(max_workers=workers, per_domain=per_domain)
+    try:
+        checks = verifier.verify(candidates, existing)
+    finally:
+        verifier.close()
+    verifier.report(checks)
+    if dry_run:
+        return [c.candidate for c in checks if c.verified]
+    return promote(checks, registry_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discover, verify and register new document sources")
+    parser.add_argument("--registry", default=str(REGISTRY_PATH))
+    parser.add_argument("--candidates", help="AI の代わりに使う候補のJSON配列ファイル")
+    parser.add_argument("--dry-run", action="store_true", help="確認だけ行い registry.json は更新しない")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-domain", type=int, default=2, help="ドメインごとの同時接続数")
+    args = parser.parse_args()
+    discover(args.registry, args.candidates, args.dry_run, args.workers, args.per_domain)
@@ -0,0 +1,143 @@
+import json
+import os
+from datetime import date as date_cls, datetime
+from pathlib import Path
+
+from indexer.document import DocumentBatch
+
+DEFAULT_PATH = "data/current/aggregates.json"
+
+# 集計の軸
+DIMENSIONS = ("risk_level", "category", "country", "organization", "region", "day", "week")
+
+
+def _week_of(date_str):
+    try:
+        year, week, _ = date_cls.fromisoformat(date_str[:10]).isocalendar()
+        return f"{year}-W{week:02d}"
+    except (TypeError, ValueError):
+        return "unknown"
+
+
+def dimension_values(doc):
+    """ドキュメントから各集計軸の値を取り出す"""
+    date_str = str(doc.get("date") or "")
+    return {
+        "risk_level": doc.get("risk_level") or doc.get("status_level") or "Unknown",
+        "category": doc.get("category") or "Unknown",
+        "country": doc.get("country_code") or doc.get("country") or "Unknown",
+        "organization": doc.get("organization") or "Unknown",
+        "region": doc.get("region") or "Unknown",
+        "day": date_str[:10] if len(date_str) >= 10 else "unknown",
+        "week": _week_of(date_str),
+    }
+
+
+class Rollup:
+    """
+    集計軸ごとの件数。ソース単位で作って足し合わせ、
+    AI分析で risk_level / category が変わったドキュメントは remove → add で差し替える。
+    """
+    def __init__(self, counts=None, total=0):
+        self.counts = {d: dict((counts or {}).get(d, {})) for d in DIMENSIONS}
+        self.total = total
+
+    @classmethod
+    def from_docs(cls, docs):
+        rollup = cls()
+        for doc in docs:
+            rollup.add(doc)
+        return rollup
+
+    @classmethod
+    def from_batch(cls, batch):
+        """
+        DocumentBatch から集計する（from_docs と同じ結果）。
+        符号化した列のまま数え、値の組み合わせごとに1回だけ集計軸の値を求める。
+        """
+        rollup = cls()
+        counts = rollup.counts
+
+        def add(dim, value, n):
+            counts[dim][value] = counts[dim].get(value, 0) + n
+
+        for (risk, status), n in batch.pair_counts("risk_level", "status_level").items():
+            add("risk_level", risk or status or "Unknown", n)
+        for (code, country), n in batch.pair_counts("country_code", "country").items():
+            add("country", code or country or "Unknown", n)
+        for dim in ("category", "organization", "region"):
+            for value, n in batch.value_counts(dim).items():
+                add(dim, value or "Unknown", n)
+        for value, n in batch.value_counts("date").items():
+            date_str = str(value or "")
+            add("day", date_str[:10] if len(date_str) >= 10 else "unknown", n)
+            add("week", _week_of(date_str), n)
+        rollup.total = len(batch)
+        return rollup
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data.get("counts"), data.get("total", 0))
+
+    @classmethod
+    def combine(cls, rollups):
+        result = cls()
+        for rollup in rollups:
+            result.merge(rollup)
+        return result
+
+    def add(self, doc, sign=1):
+        for dim, value in dimension_values(doc).items():
+            bucket = self.counts[dim]
+            bucket[value] = bucket.get(value, 0) + sign
+            if bucket[value] <= 0:
+                del bucket[value]
+        self.total += sign
+
+    def remove(self, doc):
+        self.add(doc, -1)
+
+    def merge(self, other):
+        for dim in DIMENSIONS:
+            bucket = self.counts[dim]
+            for value, n in other.counts[dim].items():
+                bucket[value] = bucket.get(value, 0) + n
+        self.total += other.total
+
+    def to_json(self):
+        return {
+            "total": self.total,
+            "counts": {
+                dim: dict(sorted(self.counts[dim].items(), key=lambda kv: (-kv[1], kv[0])))
+                if dim not in ("day", "week") else dict(sorted(self.counts[dim].items()))
+                for dim in DIMENSIONS
+            },
+        }
+
+
+def summarize_docs(docs):
+    """IncrementalIndexBuilder の summarize フック用（DocumentBatch はそのまま、それ以外は詰め替えて数える）"""
+    batch = docs if isinstance(docs, DocumentBatch) else DocumentBatch.from_docs(docs)
+    return Rollup.from_batch(batch).to_json()
+
+
+def update_aggregates(rollup, section, path=DEFAULT_PATH):
+    """aggregates.json の指定セクション（"global" / "master"）だけを書き換える"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    section_data = rollup.to_json()
+    if data.get(section, {}).get("counts") == section_data["counts"] and data[section].get("total") == rollup.total:
+        return data
+    section_data["generated_at"] = datetime.now().isoformat()
+    data[section] = section_data
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    print(f"  [Aggregates] {section}: {rollup.total} docs -> {path}")
+    return data
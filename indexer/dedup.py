@@ -0,0 +1,231 @@
+import re
+import time
+import unicodedata
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 追跡用のクエリパラメータ（正規化時に削除）
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref", "ref_src", "cmpid", "spm",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# ディレクトリの既定ページ（"/a/index.html" と "/a/" は同じページ）
+INDEX_PAGE = re.compile(r"/(index|default)\.(html?|php|aspx?)$", re.IGNORECASE)
+
+# MinHash（one permutation hashing）: シングルごとに crc32 を1回だけ計算し、
+# 下位ビットで 16 個のビンに振り分けて各ビンの最小値を署名にする。
+# 署名を 4 バンド x 4 行に分けて LSH を行う
+# （Jaccard 0.95 のペアはほぼ確実に、0.5 程度のペアは 2 割程度しか候補にならない）
+SHINGLE_SIZE = 3
+BANDS = 4
+ROWS = 4
+SIGNATURE_SIZE = BANDS * ROWS
+EMPTY_BIN = 1 << 32
+# 署名の一致数がこれ未満の候補は Jaccard を計算せずに捨てる
+MIN_SIGNATURE_MATCH = 12
+# 近似重複と判定する最小の Jaccard 係数（LSH の候補だけを実際のシングルで検証する）
+MIN_JACCARD = 0.95
+# 1バケットあたりの比較上限（似た定型文が大量にあっても二乗にならないように）
+MAX_BUCKET_COMPARE = 64
+# 要約（タイトルと重なる部分を除く）がこれより短い文書は近似重複を判定せず、URL だけで重複を見る
+# （"Sunshine Act Meetings" のような定型タイトルで要約のない別々の告示を落とさないように）
+MIN_SUMMARY_CHARS = 40
+
+
+def canonicalize_url(url):
+    """
+    同じ文書を指すURLを同じ文字列にそろえる。
+    - スキームとホストを小文字化し、http は https に統一
+    - 先頭の www.、既定ポート、フラグメント、utm_* などの追跡パラメータを削除
+    - クエリは並べ替え、末尾の index.html / default.aspx などと末尾スラッシュを削除
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    original_scheme = parts.scheme.lower()
+    scheme = "https" if original_scheme == "http" else original_scheme
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port and port != DEFAULT_PORTS.get(original_scheme):
+        netloc = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    path = INDEX_PAGE.sub("/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    if path == "/":
+        path = ""
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ""))
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """文字 n-gram（空白で区切られない日本語でも使える）"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash(features):
+    """特徴量の MinHash 署名（crc32 なので実行ごとに同じ値）。重複した特徴量は結果に影響しない"""
+    signature = [EMPTY_BIN] * SIGNATURE_SIZE
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        slot = h % SIGNATURE_SIZE
+        if h < signature[slot]:
+            signature[slot] = h
+    return tuple(signature)
+
+
+def jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def source_of(doc):
+    """文書の収集元（"source" が無ければ正規化URLのホスト）。近似重複は収集元をまたぐ場合だけ判定する"""
+    if doc.get("source"):
+        return str(doc["source"])
+    return urlsplit(canonicalize_url(doc.get("url"))).netloc
+
+
+def summary_text(doc):
+    """
+    近似重複の判定に使える要約。無い・短い・タイトルを言い換えただけ（"日本 e-Gov: <タイトル>" など）なら ""。
+    """
+    summary = normalize_text(doc.get("summary"))
+    title = normalize_text(doc.get("title"))
+    rest = summary.replace(title, "") if title else summary
+    return summary if len(rest.strip()) >= MIN_SUMMARY_CHARS else ""
+
+
+def title_numbers(title):
+    """タイトル中の数字列（年度・号数など）。これが違う文書は別物として扱う"""
+    return tuple(re.findall(r"\d+", normalize_text(title)))
+
+
+class Deduplicator:
+    """
+    収集元をまたいだ重複排除。
+    1. 正規化URLが一致するものは重複
+    2. 収集元（URL のホスト）が異なり、日付か発行機関が一致し、十分な長さの要約を持つもの同士だけ、
+       タイトル+要約の MinHash を LSH（バンド分割）で引き、候補を Jaccard で検証する
+    同じ収集元の定型タイトルの告示（要約なし）などは近似重複としては扱わない。
+    バケットはタイトル中の数字列でも分けるため、「Issue 1」と「Issue 2」は比較されない。
+    全体で O(N) のハッシュ計算と、バケット内の限られた比較だけで済む。
+    """
+    def __init__(self, min_jaccard=MIN_JACCARD):
+        self.min_jaccard = min_jaccard
+        self.by_url = {}
+        self.buckets = {}
+        self.entries = []
+        self.stats = {"seen": 0, "url_duplicates": 0, "near_duplicates": 0, "comparisons": 0}
+
+    def check(self, doc):
+        """既出なら代表ドキュメントのインデックスを、新規なら None を返して登録する"""
+        self.stats["seen"] += 1
+        url = canonicalize_url(doc.get("url"))
+        if url and url in self.by_url:
+            self.stats["url_duplicates"] += 1
+            return self.by_url[url]
+
+        # シングル集合は候補の検証時にだけ作り、保持するのは正規化テキストと署名（と比較条件）だけにする
+        summary = summary_text(doc)
+        keys = []
+        if summary:
+            text = normalize_text(f"{doc.get('title') or ''} {summary}")
+            source = source_of(doc)
+            date = str(doc.get("date") or "")[:10]
+            organization = normalize_text(doc.get("organization"))
+            size = SHINGLE_SIZE
+            signature = minhash(text[i:i + size] for i in range(max(len(text) - size + 1, 1)))
+            numbers = title_numbers(doc.get("title"))
+            keys = [
+                (band, numbers, signature[band * ROWS:(band + 1) * ROWS])
+                for band in range(BANDS)
+            ]
+            features = None
+            checked = set()
+            for key in keys:
+                for index in self.buckets.get(key, ())[-MAX_BUCKET_COMPARE:]:
+                    if index in checked:
+                        continue
+                    checked.add(index)
+                    other_text, other_signature, other_source, other_date, other_organization = self.entries[index]
+                    # 同じ収集元の中では URL だけで重複を見る。日付も発行機関も違えば別の文書
+                    if other_source == source:
+                        continue
+                    if not ((date and date == other_date) or (organization and organization == other_organization)):
+                        continue
+                    self.stats["comparisons"] += 1
+                    matches = sum(a == b for a, b in zip(signature, other_signature))
+                    if matches < MIN_SIGNATURE_MATCH:
+                        continue
+                    if features is None:
+                        features = shingles(text)
+                    if jaccard(features, shingles(other_text)) >= self.min_jaccard:
+                        self.stats["near_duplicates"] += 1
+                        if url:
+                            self.by_url[url] = index
+                        return index
+            entry = (text, signature, source, date, organization)
+        else:
+            entry = None
+
+        index = len(self.entries)
+        self.entries.append(entry)
+        if url:
+            self.by_url[url] = index
+        for key in keys:
+            self.buckets.setdefault(key, []).append(index)
+        return None
+
+
+def iter_dedupe(docs, on_drop=None, stats=None):
+    """
+    dedupe() のストリーミング版。先に来たものを残しながら1件ずつ返し、
+    取り除いたものは on_drop(position, doc)（position は入力での0始まりの位置）に渡す。
+    stats を渡すと終了時に統計を書き込む。
+    保持するのは正規化テキストと署名だけなので、ドキュメント本体はメモリに溜まらない。
+    """
+    start = time.perf_counter()
+    dedup = Deduplicator()
+    kept = 0
+    for position, doc in enumerate(docs):
+        if dedup.check(doc) is None:
+            kept += 1
+            yield doc
+        elif on_drop is not None:
+            on_drop(position, doc)
+    result = dict(dedup.stats, kept=kept, elapsed=time.perf_counter() - start)
+    if stats is not None:
+        stats.update(result)
+    print(f"  [Dedup] {result['seen']} docs -> {result['kept']} kept "
+          f"({result['url_duplicates']} same URL, {result['near_duplicates']} near-duplicate, "
+          f"{result['comparisons']} comparisons) in {result['elapsed']:.2f}s")
+
+
+def dedupe(docs):
+    """
+    先に来たもの（日付の新しい順なら最新）を残して重複を取り除く。
+    戻り値は (残したドキュメント, 取り除いたドキュメント, 統計)。
+    """
+    dropped, stats = [], {}
+    kept = list(iter_dedupe(docs, on_drop=lambda position, doc: dropped.append(doc), stats=stats))
+    return kept, dropped, stats
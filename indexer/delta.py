@@ -0,0 +1,356 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+
+from indexer.jsonstream import JsonArrayWriter, dumps_compact, iter_json_array, iter_ndjson, write_ndjson
+
+DEFAULT_DIR = "data/current/delta"
+VERSION_NAME = "version.json"
+
+# スナップショットを作り直す間隔（版の数）と、差分の合計がスナップショットのこの割合を超えたら作り直す
+SNAPSHOT_EVERY = 30
+SNAPSHOT_DELTA_RATIO = 0.5
+# 残すスナップショットの数（差分は最も古いスナップショット以降の分だけ残す）
+KEEP_SNAPSHOTS = 2
+
+
+def doc_key(doc):
+    """差分でドキュメントを識別するキー（DocumentStore.doc_key と同じ）"""
+    return str(doc.get("doc_id") or doc.get("id") or doc.get("url") or doc.get("title", ""))
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _gzip_file(path):
+    """path の .gz 版を書き出し、そのサイズを返す（mtime=0 で毎回同じバイト列にする）"""
+    gz_path = path.with_name(path.name + ".gz")
+    tmp_path = gz_path.with_name(gz_path.name + ".tmp")
+    with open(path, "rb") as src, open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, gz_path)
+    return gz_path.stat().st_size
+
+
+def load_version(out_dir):
+    try:
+        with open(Path(out_dir) / VERSION_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+class DeltaPublisher:
+    """
+    グローバルインデックスの版ごとの差分フィードを書き出す。
+        <out_dir>/version.json               : 最新の版・スナップショットと差分の一覧（クライアントは最初にこれだけ読む）
+        <out_dir>/deltas/<版>.json(.gz)      : 前の版からの added / changed（ドキュメント）と removed（キー）
+        <out_dir>/snapshots/<版>.json(.gz)   : その版の全件（global-index.json と同じ形式）
+    前回の global-index.json（previous）と今回のドキュメントを比べて差分を作る。
+    前回分はキーと内容のハッシュ（各8バイト）の配列だけを持ち、今回分は add で1件ずつ受け取る。
+    変更がなければ版は上がらず、ファイルも書き換えない。
+    """
+    def __init__(self, out_dir=DEFAULT_DIR, previous=None, snapshot_every=SNAPSHOT_EVERY,
+                 keep_snapshots=KEEP_SNAPSHOTS):
+        self.out_dir = Path(out_dir)
+        self.work_dir = self.out_dir / ".work"
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.keep_snapshots = keep_snapshots
+        self.state = load_version(self.out_dir)
+        self.version = self.state["version"] if self.state else 0
+        self.count = 0
+        self.added = 0
+        self.changed = 0
+        self.removed = []
+        self.result = None
+
+        # 前回分を手元に固定する（global-index.json が書き換えられても removed のキーを読み直せるように）
+        self.previous = None
+        if self.state and previous and Path(previous).exists():
+            self.previous = self.work_dir / "previous.json"
+            try:
+                os.link(previous, self.previous)
+            except OSError:
+                shutil.copyfile(previous, self.previous)
+        # 版の履歴がない、または前回分が読めない場合は差分を作らず、スナップショットから始め直す
+        self.reset = self.previous is None
+        self.keys, self.hashes = self._load_previous()
+        self.seen = bytearray(len(self.keys))
+
+        self.added_writer = open(self.work_dir / "added.jsonl", "w", encoding="utf-8")
+        self.changed_writer = open(self.work_dir / "changed.jsonl", "w", encoding="utf-8")
+        self.snapshot = None
+        if self._snapshot_due(snapshot_every):
+            self.snapshot = JsonArrayWriter(self.work_dir / "snapshot.json")
+
+    def _load_previous(self):
+        """前回分のキーと内容のハッシュを、キーのハッシュ順の配列で返す"""
+        keys, hashes = array("Q"), array("Q")
+        if self.previous is None:
+            return keys, hashes
+        pairs = {}
+        for doc in iter_json_array(self.previous):
+            # 同じキーが複数ある場合は最初のものを使う
+            pairs.setdefault(_hash64(doc_key(doc)), _hash64(dumps_compact(doc)))
+        for key in sorted(pairs):
+            keys.append(key)
+            hashes.append(pairs[key])
+        return keys, hashes
+
+    def _snapshot_due(self, snapshot_every):
+        if self.reset or not self.state or not self.state.get("snapshots"):
+            return True
+        latest = self.state["snapshots"][-1]
+        since = [d for d in self.state.get("deltas", []) if d["version"] > latest["version"]]
+        return (self.version + 1 - latest["version"] >= snapshot_every
+                or sum(d["bytes"] for d in since) >= SNAPSHOT_DELTA_RATIO * latest["bytes"])
+
+    def _find(self, key_hash):
+        i = bisect_left(self.keys, key_hash)
+        return i if i < len(self.keys) and self.keys[i] == key_hash else -1
+
+    def add(self, doc):
+        line = dumps_compact(doc)
+        self.count += 1
+        if self.snapshot is not None:
+            self.snapshot.write(doc)
+        i = self._find(_hash64(doc_key(doc)))
+        if i < 0:
+            self.added_writer.write(line + "\n")
+            self.added += 1
+        else:
+            self.seen[i] = 1
+            if self.hashes[i] != _hash64(line):
+                self.changed_writer.write(line + "\n")
+                self.changed += 1
+
+    def _collect_removed(self):
+        """前回分を読み直し、今回現れなかったキーを集める"""
+        if self.previous is None or all(self.seen):
+            return
+        for doc in iter_json_array(self.previous):
+            key = doc_key(doc)
+            i = self._find(_hash64(key))
+            if i >= 0 and not self.seen[i]:
+                self.seen[i] = 1
+                self.removed.append(key)
+
+    def _write_delta(self, version):
+        path = self.out_dir / "deltas" / f"{version:06d}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(dumps_compact({"version": version, "base": self.version,
+                                   "generated_at": datetime.now().isoformat(timespec="seconds")})[:-1])
+            for name in ("added", "changed"):
+                f.write(f',\n"{name}":[')
+                with open(self.work_dir / f"{name}.jsonl", "r", encoding="utf-8") as lines:
+                    for n, line in enumerate(lines):
+                        f.write(("," if n else "") + "\n" + line.rstrip("\n"))
+                f.write("\n]")
+            f.write(',\n"removed":' + dumps_compact(self.removed) + "}\n")
+        os.replace(tmp_path, path)
+        return {
+            "version": version,
+            "base": self.version,
+            "path": path.relative_to(self.out_dir).as_posix(),
+            "added": self.added,
+            "changed": self.changed,
+            "removed": len(self.removed),
+            "bytes": path.stat().st_size,
+            "gz_bytes": _gzip_file(path),
+        }
+
+    def _write_snapshot(self, version):
+        path = self.out_dir / "snapshots" / f"{version:06d}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.snapshot.close()
+        os.replace(self.snapshot.path, path)
+        return {
+            "version": version,
+            "path": path.relative_to(self.out_dir).as_posix(),
+            "docs": self.snapshot.count,
+            "bytes": path.stat().st_size,
+            "gz_bytes": _gzip_file(path),
+        }
+
+    def _prune(self, snapshots, deltas):
+        """残すスナップショットと、それ以降の差分以外のファイルを削除する"""
+        snapshots = snapshots[-self.keep_snapshots:]
+        oldest = snapshots[0]["version"]
+        deltas = [d for d in deltas if d["base"] >= oldest]
+        live = {VERSION_NAME}
+        for entry in snapshots + deltas:
+            live.update({entry["path"], entry["path"] + ".gz"})
+        for sub in ("deltas", "snapshots"):
+            for path in sorted((self.out_dir / sub).glob("*")):
+                if path.relative_to(self.out_dir).as_posix() not in live:
+                    path.unlink()
+        return snapshots, deltas
+
+    def close(self):
+        """差分（と必要ならスナップショット）を書き出し、version.json を更新する。変更がなければ None"""
+        if self.result is not None:
+            return self.result
+        self.added_writer.close()
+        self.changed_writer.close()
+        self._collect_removed()
+        try:
+            if not self.reset and not (self.added or self.changed or self.removed):
+                if self.snapshot is not None:
+                    self.snapshot.abort()
+                print(f"  [Delta] version {self.version} unchanged ({self.count} docs)")
+                return None
+            version = self.version + 1
+            snapshots = [] if self.reset else list(self.state.get("snapshots", []))
+            deltas = [] if self.reset else list(self.state.get("deltas", []))
+            if not self.reset:
+                deltas.append(self._write_delta(version))
+            if self.snapshot is not None:
+                snapshots.append(self._write_snapshot(version))
+            snapshots, deltas = self._prune(snapshots, deltas)
+            self.result = {
+                "version": version,
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "docs": self.count,
+                "key": "doc_id|id|url",
+                "compression": ["gz"],
+                "snapshots": snapshots,
+                "deltas": deltas,
+            }
+            tmp_path = self.out_dir / (VERSION_NAME + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.result, f, ensure_ascii=False, indent=1)
+                f.write("\n")
+            os.replace(tmp_path, self.out_dir / VERSION_NAME)
+            detail = "reset" if self.reset else f"+{self.added} ~{self.changed} -{len(self.removed)}"
+            snapshot = " + snapshot" if self.snapshot is not None else ""
+            print(f"  [Delta] version {self.version} -> {version} ({detail}{snapshot}), {self.count} docs")
+            return self.result
+        finally:
+            self._cleanup()
+
+    def abort(self):
+        for f in (self.added_writer, self.changed_writer):
+            f.close()
+        if self.snapshot is not None:
+            self.snapshot.abort()
+        self._cleanup()
+
+    def _cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class DeltaClient:
+    """
+    差分フィードの同期クライアント。手元の版から最新版までの差分だけを取得して適用する。
+    手元の版が残っている差分より古い（または初回の）場合は、最新のスナップショットとそれ以降の差分を取得する。
+    source は配信元の URL（https://.../data/current/delta）またはローカルのディレクトリ。
+    手元の状態は state_dir の docs.jsonl と version.json に保存する。
+    """
+    def __init__(self, source, state_dir, compressed=True):
+        self.source = str(source).rstrip("/")
+        self.state_dir = Path(state_dir)
+        self.compressed = compressed
+        self.version = 0
+        self.docs = {}
+        self.bytes = 0
+        self.files = 0
+        self._load()
+
+    def _load(self):
+        state = load_version(self.state_dir)
+        docs_path = self.state_dir / "docs.jsonl"
+        if state and docs_path.exists():
+            self.version = state.get("version", 0)
+            self.docs = {doc_key(doc): doc for doc in iter_ndjson(docs_path)}
+
+    def save(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        write_ndjson(self.state_dir / "docs.jsonl", self.docs.values())
+        with open(self.state_dir / VERSION_NAME, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version}, f)
+
+    def _fetch(self, rel_path):
+        if self.source.startswith(("http://", "https://")):
+            from urllib.request import urlopen
+            with urlopen(f"{self.source}/{rel_path}", timeout=60) as response:
+                payload = response.read()
+        else:
+            payload = (Path(self.source) / rel_path).read_bytes()
+        self.bytes += len(payload)
+        self.files += 1
+        return payload
+
+    def _fetch_json(self, rel_path, compressed=False):
+        if compressed:
+            return json.loads(gzip.decompress(self._fetch(rel_path + ".gz")))
+        return json.loads(self._fetch(rel_path))
+
+    def sync(self):
+        """最新版まで追いつき、{"from", "to", "mode", "bytes", "files"} を返す"""
+        self.bytes = self.files = 0
+        start_version = self.version
+        remote = self._fetch_json(VERSION_NAME)
+        compressed = self.compressed and "gz" in remote.get("compression", [])
+        deltas = remote.get("deltas", [])
+        if self.version == remote["version"]:
+            mode = "up-to-date"
+            deltas = []
+        elif self.version and any(d["base"] == self.version for d in deltas):
+            mode = "delta"
+        else:
+            mode = "snapshot"
+            snapshot = remote["snapshots"][-1]
+            self.docs = {doc_key(doc): doc for doc in self._fetch_json(snapshot["path"], compressed)}
+            self.version = snapshot["version"]
+        for entry in sorted(deltas, key=lambda d: d["version"]):
+            if entry["version"] <= self.version:
+                continue
+            delta = self._fetch_json(entry["path"], compressed)
+            if delta["base"] != self.version:
+                raise ValueError(f"delta {entry['path']} expects version {delta['base']}, have {self.version}")
+            for doc in delta["added"] + delta["changed"]:
+                self.docs[doc_key(doc)] = doc
+            for key in delta["removed"]:
+                self.docs.pop(key, None)
+            self.version = delta["version"]
+        return {"from": start_version, "to": self.version, "mode": mode, "bytes": self.bytes, "files": self.files}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync a local copy of the global index from the delta feed")
+    parser.add_argument("source", help="差分フィードの URL またはディレクトリ（例: data/current/delta）")
+    parser.add_argument("--state", default="data/cache/delta-client", help="手元の状態の保存先")
+    parser.add_argument("--plain", action="store_true", help=".gz ではなく素の JSON を取得する")
+    args = parser.parse_args(argv)
+    client = DeltaClient(args.source, args.state, compressed=not args.plain)
+    result = client.sync()
+    client.save()
+    print(f"  [Delta] {result['mode']}: version {result['from']} -> {result['to']}, "
+          f"{len(client.docs)} docs, {result['files']} files, {result['bytes'] / 1024:.1f}KB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
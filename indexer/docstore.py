@@ -0,0 +1,276 @@
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from indexer.jsonstream import iter_documents
+
+DEFAULT_PATH = "data/index/documents.sqlite"
+
+# 絞り込みに使える列（CLI の引数名 -> 列名）
+FILTER_COLUMNS = {
+    "country": "country",
+    "country_code": "country_code",
+    "organization": "organization",
+    "region": "region",
+    "category": "category",
+    "risk_level": "risk_level",
+    "source": "source",
+}
+
+
+def fts_tokenizer(conn):
+    """
+    日本語タイトル（例: 令和7年度予算案の概要）は空白で区切られないため、
+    SQLite 3.34 以降では trigram トークナイザーを使う。古い SQLite では unicode61。
+    """
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.tokenizer_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.tokenizer_probe")
+        return "trigram"
+    except sqlite3.OperationalError:
+        return "unicode61"
+
+
+class DocumentStore:
+    """
+    ドキュメントの SQLite ストア（任意機能）。
+    日付・国・組織・地域・カテゴリ・重要度に索引を張り、
+    title / summary / insights は FTS5 で全文検索できる。
+    ページングは (date, id) のキーセット方式で、深いページでも一定時間で返る。
+    """
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        c = self.conn
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                doc_key TEXT NOT NULL,
+                source TEXT NOT NULL,
+                title TEXT,
+                url TEXT,
+                date TEXT,
+                country TEXT,
+                country_code TEXT,
+                organization TEXT,
+                region TEXT,
+                category TEXT,
+                risk_level TEXT,
+                summary TEXT,
+                insights TEXT,
+                doc TEXT NOT NULL,
+                UNIQUE (source, doc_key)
+            )
+        """)
+        # 日付のない文書は空文字列で持つ（NULL だと並び順とページングのカーソルが崩れる）
+        c.execute("UPDATE docs SET date = '' WHERE date IS NULL")
+        c.execute("CREATE INDEX IF NOT EXISTS docs_date ON docs(date, id)")
+        for column in ("country", "country_code", "organization", "region", "category", "risk_level", "source"):
+            c.execute(f"CREATE INDEX IF NOT EXISTS docs_{column}_date ON docs({column}, date, id)")
+
+        exists = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'docs_fts'").fetchone()
+        if not exists:
+            tokenizer = fts_tokenizer(c)
+            c.execute(f"""
+                CREATE VIRTUAL TABLE docs_fts USING fts5(
+                    title, summary, insights,
+                    content='docs', content_rowid='id', tokenize='{tokenizer}'
+                )
+            """)
+            c.executescript("""
+                CREATE TRIGGER docs_ai AFTER INSERT ON docs BEGIN
+                    INSERT INTO docs_fts(rowid, title, summary, insights)
+                    VALUES (new.id, new.title, new.summary, new.insights);
+                END;
+                CREATE TRIGGER docs_ad AFTER DELETE ON docs BEGIN
+                    INSERT INTO docs_fts(docs_fts, rowid, title, summary, insights)
+                    VALUES ('delete', old.id, old.title, old.summary, old.insights);
+                END;
+                CREATE TRIGGER docs_au AFTER UPDATE ON docs BEGIN
+                    INSERT INTO docs_fts(docs_fts, rowid, title, summary, insights)
+                    VALUES ('delete', old.id, old.title, old.summary, old.insights);
+                    INSERT INTO docs_fts(rowid, title, summary, insights)
+                    VALUES (new.id, new.title, new.summary, new.insights);
+                END;
+            """)
+        c.commit()
+
+    @property
+    def tokenizer(self):
+        row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'docs_fts'").fetchone()
+        return "trigram" if row and "trigram" in row[0] else "unicode61"
+
+    @staticmethod
+    def doc_key(doc):
+        return doc.get("doc_id") or doc.get("id") or doc.get("url") or doc.get("title", "")
+
+    def _row(self, doc, source):
+        insights = doc.get("insights")
+        if isinstance(insights, list):
+            insights = "\n".join(str(i) for i in insights)
+        return (
+            str(self.doc_key(doc)), source,
+            doc.get("title"), doc.get("url"), str(doc.get("date") or ""),
+            doc.get("country"), doc.get("country_code"), doc.get("organization"),
+            doc.get("region"), doc.get("category"),
+            doc.get("risk_level") or doc.get("status_level"),
+            doc.get("summary"), insights,
+            json.dumps(doc, ensure_ascii=False, sort_keys=True),
+        )
+
+    UPSERT_SQL = """
+        INSERT INTO docs (doc_key, source, title, url, date, country, country_code,
+                          organization, region, category, risk_level, summary, insights, doc)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source, doc_key) DO UPDATE SET
+            title = excluded.title, url = excluded.url,
+            date = excluded.date, country = excluded.country,
+            country_code = excluded.country_code, organization = excluded.organization,
+            region = excluded.region, category = excluded.category,
+            risk_level = excluded.risk_level, summary = excluded.summary,
+            insights = excluded.insights, doc = excluded.doc
+        WHERE docs.doc <> excluded.doc
+    """
+
+    def sync(self, docs, source):
+        """
+        source（"global" / "master"）の内容を docs と一致させる。
+        変化のない行は書き換えないので、FTS の更新も変更分だけになる。
+        """
+        start = time.perf_counter()
+        c = self.conn
+        existing = {row[0] for row in c.execute("SELECT doc_key FROM docs WHERE source = ?", (source,))}
+        seen = set()
+        with c:
+            batch = []
+            for doc in docs:
+                row = self._row(doc, source)
+                seen.add(row[0])
+                batch.append(row)
+                if len(batch) >= 1000:
+                    c.executemany(self.UPSERT_SQL, batch)
+                    batch = []
+            c.executemany(self.UPSERT_SQL, batch)
+            stale = existing - seen
+            c.executemany("DELETE FROM docs WHERE source = ? AND doc_key = ?", ((source, k) for k in stale))
+        print(f"  [DocStore] {source}: {len(seen)} docs synced, {len(stale)} removed "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    def _fts_query(self, terms):
+        """語のリストをフレーズ検索に変換する（FTS5 の演算子として解釈させない）"""
+        return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+    def query(self, text=None, filters=None, date_from=None, date_to=None, limit=20, after=None):
+        """
+        条件に合うドキュメントを新しい順に返す。
+        after は前ページの next_cursor（"date|id"、日付のない文書は空の date）。戻り値は (docs, next_cursor)。
+        trigram は3文字未満の語（予算・経済など）を索引で引けないため、その語だけ部分一致（LIKE）で絞る。
+        3文字以上の語があれば FTS で候補を絞ってから LIKE を当てるので、全件を走査するのは
+        短い語だけの検索の場合に限られる。
+        """
+        where, params = [], []
+        join = ""
+        if text:
+            terms = text.split()
+            short = [t for t in terms if len(t) < 3] if self.tokenizer == "trigram" else []
+            indexed = [t for t in terms if t not in short]
+            if indexed:
+                join = "JOIN docs_fts f ON f.rowid = d.id"
+                where.append("docs_fts MATCH ?")
+                params.append(self._fts_query(indexed))
+            for t in short:
+                where.append("(d.title LIKE ? OR d.summary LIKE ? OR d.insights LIKE ?)")
+                params += [f"%{t}%"] * 3
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            where.append(f"d.{FILTER_COLUMNS[name]} = ?")
+            params.append(value)
+        if date_from:
+            where.append("d.date >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("d.date <= ? AND d.date <> ''")
+            params.append(date_to)
+        if after:
+            cursor_date, cursor_id = after.rsplit("|", 1)
+            where.append("(d.date < ? OR (d.date = ? AND d.id < ?))")
+            params += [cursor_date, cursor_date, int(cursor_id)]
+
+        sql = f"SELECT d.id, d.date, d.doc FROM docs d {join}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY d.date DESC, d.id DESC LIMIT ?"
+        params.append(limit)
+
+        rows = self.conn.execute(sql, params).fetchall()
+        docs = [json.loads(row["doc"]) for row in rows]
+        next_cursor = f"{rows[-1]['date']}|{rows[-1]['id']}" if len(rows) == limit else None
+        return docs, next_cursor
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite document store")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="JSONインデックスファイル（JSON配列 / NDJSON）からストアを同期する")
+    load.add_argument("--global-index", default="data/current/global-index.json")
+    load.add_argument("--master-index", default="data/master_index.json")
+
+    q = sub.add_parser("query", help="絞り込み・全文検索")
+    q.add_argument("text", nargs="?", help="全文検索語（title / summary / insights）")
+    for name in FILTER_COLUMNS:
+        q.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    q.add_argument("--from", dest="date_from")
+    q.add_argument("--to", dest="date_to")
+    q.add_argument("--limit", type=int, default=20)
+    q.add_argument("--after", help="前ページの next_cursor")
+    q.add_argument("--json", action="store_true", help="結果をJSONで出力")
+
+    args = parser.parse_args(argv)
+    store = DocumentStore(args.db)
+    try:
+        if args.command == "load":
+            for source, path in (("global", args.global_index), ("master", args.master_index)):
+                if Path(path).exists():
+                    store.sync(iter_documents(path), source)
+            print(f"  [DocStore] total {store.count()} docs ({store.tokenizer})")
+            return
+
+        filters = {name: getattr(args, name) for name in FILTER_COLUMNS}
+        start = time.perf_counter()
+        docs, next_cursor = store.query(args.text, filters, args.date_from, args.date_to,
+                                        args.limit, args.after)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps({"docs": docs, "next_cursor": next_cursor, "ms": round(elapsed_ms, 2)},
+                             ensure_ascii=False, indent=2))
+            return
+        for doc in docs:
+            where = doc.get("country_code") or doc.get("country") or "-"
+            level = doc.get("risk_level") or doc.get("status_level") or "-"
+            print(f"{doc.get('date', '')}  [{where}] {level:<8} {doc.get('title', '')}")
+        print(f"-- {len(docs)} docs in {elapsed_ms:.1f} ms" + (f", next: --after '{next_cursor}'" if next_cursor else ""))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
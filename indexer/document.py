@@ -0,0 +1,157 @@
+import sys
+from array import array
+from collections import Counter
+
+# 値の種類が少なく、同じ文字列が大量に繰り返されるフィールド
+CATEGORICAL_FIELDS = ("country_code", "country", "region", "status_level", "risk_level",
+                      "category", "organization", "source")
+# 文書ごとに値が異なるフィールド
+TEXT_FIELDS = ("title", "url", "summary", "collected_at", "pdf_local_path")
+# date は種類が少ない（1日1値）ので、バッチでは符号化して持つ
+FIELDS = ("title", "url", "date", "summary") + CATEGORICAL_FIELDS + ("collected_at", "pdf_local_path")
+_FIELD_SET = frozenset(FIELDS)
+
+_intern = sys.intern
+
+
+def intern_value(value):
+    return _intern(value) if type(value) is str else value
+
+
+def intern_fields(doc):
+    """
+    doc の分類フィールドと日付を sys.intern した文字列に置き換える（doc をそのまま返す）。
+    JSON から読んだ値は文書ごとに別オブジェクトになるので、大量に保持する前に共有させる。
+    """
+    for field in CATEGORICAL_FIELDS + ("date",):
+        value = doc.get(field)
+        if type(value) is str:
+            doc[field] = _intern(value)
+    return doc
+
+
+def hashable(value):
+    """Vocabulary で符号化できる値か（リストや dict の値は符号化せず行ごとに持つ）"""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class Vocabulary:
+    """
+    値 <-> 整数コードの対応表。コード 0 は値なし（None / 未設定）。
+    値はハッシュ可能であること（リストなどは TypeError。DocumentBatch は行ごとに別で持つ）。
+    """
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(intern_value(value))
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class DocumentBatch:
+    """
+    列指向のドキュメント集合。分類フィールドと日付は Vocabulary で符号化した
+    array('I') に、本文系は列ごとのリストに持つ（1文書あたりの dict を作らない）。
+    並べ替え・集計はコード配列の上で行い、必要になった行だけ dict に戻す。
+    各行のキーの並び（レイアウト）も符号化して持つので、row() は元の dict と同じキー順・
+    同じ値（None を含む）に戻る。
+    """
+    CODED_FIELDS = CATEGORICAL_FIELDS + ("date",)
+
+    def __init__(self):
+        self.vocab = {field: Vocabulary() for field in self.CODED_FIELDS}
+        self.codes = {field: array("I") for field in self.CODED_FIELDS}
+        self.text = {field: [] for field in TEXT_FIELDS}
+        self.layouts = Vocabulary()
+        self.layout_codes = array("I")
+        # 既知のフィールド以外（と符号化できない値）を持つ行だけ {行番号: dict}
+        self.extra = {}
+        self.size = 0
+
+    @classmethod
+    def from_docs(cls, docs):
+        batch = cls()
+        batch.extend(docs)
+        return batch
+
+    def extend(self, docs):
+        vocab_codes = [(self.codes[f], self.vocab[f].codes, self.vocab[f].code, f) for f in self.CODED_FIELDS]
+        text_columns = [(self.text[f], f) for f in TEXT_FIELDS]
+        layout_codes, layout_code = self.layout_codes, self.layouts.code
+        for doc in docs:
+            extra = None
+            for column, codes, code, field in vocab_codes:
+                value = doc.get(field)
+                try:
+                    c = codes.get(value)
+                except TypeError:
+                    # リストなどは符号化せず、その行の extra に入れる
+                    extra = extra or {}
+                    extra[field] = value
+                    c = 0
+                column.append(code(value) if c is None else c)
+            for column, field in text_columns:
+                column.append(doc.get(field))
+            if not _FIELD_SET.issuperset(doc):
+                extra = extra or {}
+                extra.update((k, v) for k, v in doc.items() if k not in _FIELD_SET)
+            if extra:
+                self.extra[self.size] = extra
+            layout_codes.append(layout_code(tuple(doc)))
+            self.size += 1
+        return self
+
+    def __len__(self):
+        return self.size
+
+    def value_counts(self, field):
+        """{値: 件数}（コードのまま数えてから値に戻す）"""
+        values = self.vocab[field].values
+        return {values[c]: n for c, n in Counter(self.codes[field]).items()}
+
+    def pair_counts(self, first, second):
+        """{(first の値, second の値): 件数}。フォールバック付きの集計軸に使う"""
+        a, b = self.vocab[first].values, self.vocab[second].values
+        return {(a[x], b[y]): n for (x, y), n in Counter(zip(self.codes[first], self.codes[second])).items()}
+
+    def order_by_date(self, reverse=True):
+        """
+        日付順に並べた行番号（同じ日付の中では元の順序を保つ）。
+        日付の種類は文書数よりずっと少ないので、種類ごとのバケットに振り分けて連結する。
+        """
+        vocab = self.vocab["date"].values
+        # indexer.incremental.date_key と同じ順序（日付がないものは一番下）
+        missing = "0000-00-00"
+        ranked = sorted(range(len(vocab)), key=lambda c: str(vocab[c] or missing), reverse=reverse)
+        buckets = [[] for _ in vocab]
+        for i, c in enumerate(self.codes["date"]):
+            buckets[c].append(i)
+        return [i for c in ranked for i in buckets[c]]
+
+    def row(self, i):
+        """i 行目を元の dict（同じキー順・同じ値）に戻す"""
+        extra = self.extra.get(i) or {}
+        doc = {}
+        for field in self.layouts.values[self.layout_codes[i]]:
+            if field in extra:
+                doc[field] = extra[field]
+            elif field in self.codes:
+                doc[field] = self.vocab[field].values[self.codes[field][i]]
+            else:
+                doc[field] = self.text[field][i]
+        return doc
+
+    def take(self, rows):
+        """指定した行の dict を順に返す"""
+        return (self.row(i) for i in rows)
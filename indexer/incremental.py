@@ -0,0 +1,190 @@
+import hashlib
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+
+from indexer.document import DocumentBatch
+from indexer.jsonstream import iter_ndjson, write_ndjson
+
+
+def date_key(doc):
+    """インデックスの並び順（日付がない・空のものは一番下に）"""
+    return str(doc.get("date") or "0000-00-00")
+
+
+class IndexSource:
+    """
+    インデックスの入力単位（国ファイル、組織ディレクトリなど）。
+    files は変更検知に使うファイル群、loader はドキュメントを順に返す関数（ジェネレーターでよい）。
+    """
+    def __init__(self, source_id, files, loader):
+        self.source_id = source_id
+        self.files = [Path(p) for p in files]
+        self.loader = loader
+
+    def stat_signature(self):
+        h = hashlib.sha256()
+        for p in sorted(self.files):
+            st = p.stat()
+            h.update(f"{p.as_posix()}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def content_hash(self):
+        h = hashlib.sha256()
+        for p in sorted(self.files):
+            h.update(p.as_posix().encode("utf-8") + b"\0")
+            with open(p, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    h.update(chunk)
+        return h.hexdigest()
+
+
+class IncrementalIndexBuilder:
+    """
+    変更マニフェストに基づく差分インデックスビルダー。
+    - ソースごとに mtime/サイズ/内容ハッシュを manifest.json に記録
+    - 変更のあったソースだけを読み直し、日付順のランとして runs/ に保存
+    - 各ランは既に日付順なので、全体は k-way マージで結合する（全件ソートしない）
+    - summarize を渡すと、変更のあったソースだけ集計し直してマニフェストに保存する
+    読み直したソースは DocumentBatch（列指向）に詰めてから並べ替え・集計・書き出しを行うので、
+    ソース1つ分のドキュメントを dict のリストとして持つことはない（summarize には batch を渡す）。
+    """
+    def __init__(self, state_dir, key=date_key, summarize=None):
+        self.state_dir = Path(state_dir)
+        self.summarize = summarize
+        self.runs_dir = self.state_dir / "runs"
+        self.manifest_path = self.state_dir / "manifest.json"
+        self.key = key
+        self.stats = {}
+        self.manifest = {}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _run_path(self, source_id):
+        digest = hashlib.sha1(source_id.encode("utf-8")).hexdigest()
+        return self.runs_dir / f"{digest}.jsonl"
+
+    def _write_run(self, source_id, docs):
+        if self.key is not date_key:
+            docs = sorted(docs, key=self.key, reverse=True)
+            write_ndjson(self._run_path(source_id), docs)
+            return docs
+        batch = DocumentBatch.from_docs(docs)
+        # 日付の種類ごとのバケットに振り分けるだけなので O(n)
+        write_ndjson(self._run_path(source_id), batch.take(batch.order_by_date()))
+        return batch
+
+    def _read_run(self, source_id):
+        return iter_ndjson(self._run_path(source_id))
+
+    def _is_unchanged(self, source, entry):
+        if entry is None or not self._run_path(source.source_id).exists():
+            return False
+        if self.summarize is not None and "summary" not in entry:
+            return False
+        signature = source.stat_signature()
+        if entry.get("stat") == signature:
+            return True
+        # mtime だけが変わった場合（チェックアウト直後など）は内容ハッシュで判定
+        if entry.get("sha256") == source.content_hash():
+            entry["stat"] = signature
+            return True
+        return False
+
+    def update(self, sources, full=False):
+        """
+        変更のあったソースだけを読み直してランとマニフェストを更新する（ドキュメントは保持しない）。
+        full=True ならマニフェストを無視して全ソースを読み直す。
+        """
+        start = time.perf_counter()
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        old_manifest = {} if full else self._load_manifest()
+        manifest = {}
+        changed = unchanged = 0
+
+        for source in sources:
+            entry = old_manifest.get(source.source_id)
+            if self._is_unchanged(source, entry):
+                manifest[source.source_id] = entry
+                unchanged += 1
+                continue
+            docs = self._write_run(source.source_id, source.loader())
+            manifest[source.source_id] = {
+                "stat": source.stat_signature(),
+                "sha256": source.content_hash(),
+                "count": len(docs),
+            }
+            if self.summarize is not None:
+                manifest[source.source_id]["summary"] = self.summarize(docs)
+            changed += 1
+            del docs
+
+        removed = 0
+        for source_id in set(old_manifest) - set(manifest):
+            try:
+                self._run_path(source_id).unlink()
+            except OSError:
+                pass
+            removed += 1
+        if full:
+            # 前回の状態を使わないので、どのソースにも属さない古いランを掃除する
+            live = {self._run_path(s).name for s in manifest}
+            for path in self.runs_dir.glob("*.jsonl"):
+                if path.name not in live:
+                    path.unlink()
+        self._save_manifest(manifest)
+        self.manifest = manifest
+        scan_time = time.perf_counter() - start
+
+        self.stats = {
+            "mode": "full" if full else "incremental",
+            "sources": len(manifest),
+            "changed": changed,
+            "unchanged": unchanged,
+            "removed": removed,
+            "docs": sum(entry.get("count", 0) for entry in manifest.values()),
+            "scan_time": scan_time,
+            "merge_time": 0.0,
+            "elapsed": scan_time,
+        }
+        return self
+
+    def iter_docs(self):
+        """
+        直近の update() のランを k-way マージし、日付の新しい順に1件ずつ返す。
+        同じ状態なら何度呼んでも同じ順序になる（メモリはラン数分のバッファだけ）。
+        """
+        runs = [self._read_run(source_id) for source_id in sorted(self.manifest)]
+        return heapq.merge(*runs, key=self.key, reverse=True)
+
+    def build(self, sources, full=False):
+        """update() してから全件をリストで返す（日付の新しい順）"""
+        self.update(sources, full=full)
+        start = time.perf_counter()
+        docs = list(self.iter_docs())
+        merge_time = time.perf_counter() - start
+        self.stats.update(docs=len(docs), merge_time=merge_time, elapsed=self.stats["scan_time"] + merge_time)
+        return docs
+
+    def summaries(self):
+        """直近の update() で有効なソースごとの集計結果"""
+        return [entry["summary"] for entry in self.manifest.values() if "summary" in entry]
+
+    def report(self):
+        s = self.stats
+        print(f"  [Index] {s['mode']} build: {s['changed']} changed / {s['unchanged']} unchanged / "
+              f"{s['removed']} removed sources, {s['docs']} docs in {s['elapsed']:.3f}s "
+              f"(scan {s['scan_time']:.3f}s, merge {s['merge_time']:.3f}s)")
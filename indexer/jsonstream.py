@@ -0,0 +1,181 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+# 読み込み時に一度に読むサイズ（文字数）
+READ_CHUNK = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+# デコードエラーの位置がバッファ末尾からこの文字数以内なら、チャンクの境目で途切れただけとみなす
+# （true / false / null / Infinity などのリテラルが途中で切れた場合）
+_TRUNCATION_MARGIN = 16
+
+
+def dumps_compact(doc):
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+
+
+class _StreamWriter(ABC):
+    """
+    ドキュメントを1件ずつ書き出すライター（一時ファイルに書き、close で置き換える）。
+    with 文の中で例外が起きた場合は一時ファイルを捨て、元のファイルを残す。
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.count = 0
+
+    @abstractmethod
+    def write(self, doc):
+        """1件書き出す"""
+        pass
+
+    def write_all(self, docs):
+        for doc in docs:
+            self.write(doc)
+        return self
+
+    def _finish(self):
+        pass
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._finish()
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if not self.file.closed:
+            self.file.close()
+        try:
+            self.tmp_path.unlink()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonArrayWriter(_StreamWriter):
+    """
+    コンパクトな JSON 配列として書き出す（1行1ドキュメント）。
+    ファイル全体は普通の JSON なので、フロントエンドはそのまま fetch して読める。
+    """
+    def write(self, doc):
+        self.file.write(",\n" if self.count else "[\n")
+        self.file.write(dumps_compact(doc))
+        self.count += 1
+
+    def _finish(self):
+        self.file.write("\n]\n" if self.count else "[]\n")
+
+
+class NdjsonWriter(_StreamWriter):
+    """JSON Lines（NDJSON）として書き出す"""
+    def write(self, doc):
+        self.file.write(dumps_compact(doc))
+        self.file.write("\n")
+        self.count += 1
+
+
+def write_json_array(path, docs):
+    """docs（ジェネレーター可）をコンパクトな JSON 配列で書き出し、件数を返す"""
+    with JsonArrayWriter(path) as writer:
+        writer.write_all(docs)
+    return writer.count
+
+
+def write_ndjson(path, docs):
+    """docs（ジェネレーター可）を NDJSON で書き出し、件数を返す"""
+    with NdjsonWriter(path) as writer:
+        writer.write_all(docs)
+    return writer.count
+
+
+def iter_ndjson(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _truncated(error, buf):
+    """デコードエラーがチャンクの境目で要素が途切れたためか（続きを読めば読める可能性があるか）"""
+    return error.msg.startswith("Unterminated string") or error.pos >= len(buf) - _TRUNCATION_MARGIN
+
+
+def iter_json_array(path, chunk_size=READ_CHUNK):
+    """
+    JSON 配列のファイルを要素ごとに読み出す。
+    ファイル全体を読み込まないので、インデントの有無やサイズに関わらずメモリは要素1件分で済む。
+    壊れた要素があればその場で ValueError（json.JSONDecodeError）にする（残りを読み込まない）。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                fill()
+                continue
+            char = buf[pos]
+            if not started:
+                if char != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if char == "]":
+                return
+            if char == ",":
+                pos += 1
+                continue
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof or not _truncated(e, buf):
+                    raise json.JSONDecodeError(f"{path}: {e.msg}", e.doc, e.pos) from None
+                fill()
+                continue
+            # 数値はチャンクの境目で途切れていても読めてしまう（"1234567." -> 1234567, "2.5e" -> 2.5）ので、
+            # 後ろに区切り（, か ]）が見えない値がバッファ末尾近くで終わっていたら、続きを読んでから確定する
+            after = end
+            while after < len(buf) and buf[after] in _WHITESPACE:
+                after += 1
+            if not eof and (after == len(buf) or buf[after] not in ",]" and end >= len(buf) - _TRUNCATION_MARGIN):
+                fill()
+                continue
+            pos = end
+            yield value
+
+
+def iter_documents(path):
+    """拡張子で形式を判定して読み出す（.jsonl / .ndjson は NDJSON、それ以外は JSON 配列）"""
+    if Path(path).suffix in (".jsonl", ".ndjson"):
+        return iter_ndjson(path)
+    return iter_json_array(path)
@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # brotli は任意（無ければ .br は出力しない）
+    brotli = None
+
+MANIFEST_NAME = "manifest.json"
+
+
+def compact_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_if_changed(path, payload):
+    """内容が同じなら書き換えない（git の差分と mtime を安定させる）"""
+    if path.exists() and path.read_bytes() == payload:
+        return False
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _write_variants(path, payload):
+    """path と、その .gz / .br 圧縮版を書き出す"""
+    changed = _write_if_changed(path, payload)
+    gz_path = path.with_name(path.name + ".gz")
+    if changed or not gz_path.exists():
+        # mtime=0 で毎回同じバイト列にする
+        gz_path.write_bytes(gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        br_path = path.with_name(path.name + ".br")
+        if changed or not br_path.exists():
+            br_path.write_bytes(brotli.compress(payload, quality=11))
+    return changed
+
+
+def partition_key(doc):
+    date = str(doc.get("date") or "")
+    month = date[:7] if len(date) >= 7 else "unknown"
+    return month, doc.get("region") or "global"
+
+
+class PartitionWriter:
+    """
+    日付の新しい順に届くドキュメントを 月 x 地域 のチャンクに分けて書き出す。
+        <out_dir>/manifest.json             : 月ごとのチャンク一覧（新しい月が先頭）
+        <out_dir>/<YYYY-MM>/<region>.json   : コンパクトJSON（+ .gz / .br）
+    月が変わった時点で前の月のチャンクを書き出すので、保持するのは1か月分だけ。
+    順序が崩れて書き出し済みの月が再び現れた場合は、close 時にそのチャンクへ追記する。
+    フロントエンドはマニフェストと最新月だけを読み、古い月は必要な時に取得できる。
+    """
+    def __init__(self, out_dir="data/current/partitions"):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.month = None
+        self.groups = {}
+        self.late = {}
+        self.parts = {}
+        self.flushed_months = set()
+        self.live = {MANIFEST_NAME, MANIFEST_NAME + ".gz", MANIFEST_NAME + ".br"}
+        self.rewritten = set()
+        self.manifest = None
+
+    def add(self, doc):
+        key = partition_key(doc)
+        month = key[0]
+        if month != self.month:
+            self._flush()
+            self.month = month
+        if month in self.flushed_months:
+            self.late.setdefault(key, []).append(doc)
+        else:
+            self.groups.setdefault(key, []).append(doc)
+
+    def _write_chunk(self, key, chunk):
+        month, region = key
+        rel_path = f"{month}/{region}.json"
+        path = self.out_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = compact_json(chunk)
+        if _write_variants(path, payload):
+            self.rewritten.add(key)
+        self.live.update({rel_path, rel_path + ".gz", rel_path + ".br"})
+        self.parts[key] = {
+            "region": region,
+            "path": rel_path,
+            "count": len(chunk),
+            "bytes": len(payload),
+            "sha256": hashlib.sha256(payload).hexdigest(),
+        }
+
+    def _flush(self):
+        for key, chunk in self.groups.items():
+            self._write_chunk(key, chunk)
+        if self.month is not None:
+            self.flushed_months.add(self.month)
+        self.groups = {}
+
+    def close(self):
+        self._flush()
+        for key, docs in self.late.items():
+            chunk = []
+            if key in self.parts:
+                chunk = json.loads((self.out_dir / self.parts[key]["path"]).read_bytes())
+            self._write_chunk(key, chunk + docs)
+        self.late = {}
+
+        # 消えたチャンクを削除
+        removed = 0
+        for path in sorted(self.out_dir.rglob("*"), reverse=True):
+            rel_path = path.relative_to(self.out_dir).as_posix()
+            if path.is_file() and rel_path not in self.live:
+                path.unlink()
+                removed += 1
+            elif path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+
+        months = {}
+        for (month, _), part in self.parts.items():
+            months.setdefault(month, []).append(part)
+        manifest = {
+            "version": 1,
+            "total": sum(p["count"] for p in self.parts.values()),
+            "compression": ["gz", "br"] if brotli is not None else ["gz"],
+            "months": [
+                {
+                    "month": month,
+                    "count": sum(p["count"] for p in parts),
+                    "partitions": sorted(parts, key=lambda p: p["region"]),
+                }
+                # "unknown" は常に最後
+                for month, parts in sorted(months.items(), key=lambda kv: (kv[0] != "unknown", kv[0]), reverse=True)
+            ],
+        }
+        # 内容が同じなら generated_at も据え置く
+        manifest_path = self.out_dir / MANIFEST_NAME
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        previous_generated_at = previous.pop("generated_at", None)
+        manifest["generated_at"] = previous_generated_at if previous == manifest else datetime.now().isoformat()
+        _write_variants(manifest_path, compact_json(manifest))
+
+        print(f"  [Partitions] {len(self.parts)} chunks ({len(self.rewritten)} rewritten, {removed} files removed) "
+              f"across {len(months)} months")
+        self.manifest = manifest
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def write_partitions(docs, out_dir="data/current/partitions"):
+    """日付の新しい順に並んだ docs を 月 x 地域 のチャンクに分けて書き出し、マニフェストを返す"""
+    with PartitionWriter(out_dir) as writer:
+        for doc in docs:
+            writer.add(doc)
+    return writer.manifest
@@ -1,77 +1,279 @@
+import time
+STARTED_AT = time.perf_counter()  # 起動時間の計測用（他の import より前に記録する）
+
 import os
-import json
-import requests
+import argparse
 from pathlib import Path
-from collectors.sources.real_collectors import JapanEgovCollector, USFederalRegisterCollector
+from collectors.base_collector import EconomicDocumentCollector
+from collectors.registry import CollectorRegistry
+from collectors.polling import PollingScheduler
 from collectors.sources.pdf_analyzer import PDFAnalyzer
+from collectors.engine import CollectionEngine
+from collectors.http_cache import HttpCache
+from collectors.pdf_store import PDFStore
+from collectors.storage import iter_country_stores
+from collectors.analysis_cache import AnalysisCache
+from collectors.analysis_scheduler import AnalysisScheduler, RetryQueue
+from collectors.pipeline import DocumentPipeline, wants_pdf
+from collectors.metrics import metrics, profile_run
+from indexer.incremental import IncrementalIndexBuilder, IndexSource
+from indexer.partitions import PartitionWriter
+from indexer.delta import DeltaPublisher
+from indexer.aggregates import Rollup, summarize_docs, update_aggregates
+from indexer.docstore import DocumentStore, DEFAULT_PATH as DOCSTORE_DEFAULT_PATH
+from indexer.dedup import canonicalize_url, iter_dedupe
+from indexer.jsonstream import JsonArrayWriter, iter_json_array
+
+IMPORTED_AT = time.perf_counter()
+
+
+def load_collectors(only=None):
+    """registry.json から実行するコレクターを作る（選ばれた収集元のモジュールだけを読み込む）"""
+    start = time.perf_counter()
+    registry = CollectorRegistry()
+    collectors = registry.create(only)
+    registry.report(collectors)
+    metrics.gauge("startup.seconds", round(time.perf_counter() - start, 4), phase="collectors")
+    return collectors, registry.errors
+
+
+def polling_scheduler():
+    budget = os.environ.get("POLL_BUDGET_SECONDS")
+    return PollingScheduler(
+        budget=float(budget) if budget else None,
+        workers=int(os.environ.get("COLLECT_WORKERS", "8")),
+    )
 
-def download_file(url, target_path):
-    """ファイルをリポジトリ内に保存"""
-    if target_path.exists():
-        return True
-    try:
-        r = requests.get(url, timeout=30, stream=True)
-        r.raise_for_status()
-        with open(target_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-        return True
-    except:
-        return False
-
-def main():
+
+def run_direct_collectors(collectors, polling=None):
+    """機関サイトの個別資料を data/<国>/<機関>/ に保存する（master_index.json 側に入る）"""
+    errors = []
+    for collector in collectors:
+        name = f"{collector.__class__.__name__}[{collector.country_code}]"
+        start = time.perf_counter()
+        error = None
+        try:
+            collector.fetch_latest_documents()
+        except Exception as e:
+            error = e
+            errors.append(f"{name}: {e}")
+            metrics.incr("collect.errors", collector=name)
+        metrics.incr("collect.added", collector.added, collector=name)
+        if polling is not None:
+            polling.record(collector, time.perf_counter() - start, collector.added, error)
+    return errors
+
+
+def main(full=False, docstore_path=None, collectors=None, client=None, only=None, poll_all=False):
+    """
+    collectors / client を渡すとそれを使う（ローカルの偽サーバー・偽モデルでの通し実行用）。
+    渡さなければ registry.json から作る。only は国コード（ISO3）やIDで収集元を絞る（例: "JPN,USA"）。
+    registry から作った場合は、公表頻度から見て確認時期に来た収集元だけを実行する
+    （only / poll_all を指定した場合は指定どおり全て実行する）。
+    """
     print("--- Start AI Document Pipeline ---")
+    metrics.reset()
+    metrics.gauge("startup.seconds", round(IMPORTED_AT - STARTED_AT, 4), phase="imports")
     api_key = os.environ.get("GEMINI_API_KEY", "")
-    analyzer = PDFAnalyzer(api_key)
+    analysis_cache = AnalysisCache()
+    analysis_cache.invalidate(PDFAnalyzer.PROMPT_VERSION, PDFAnalyzer.MODEL_NAME)
+    analyzer = PDFAnalyzer(api_key, cache=analysis_cache, client=client)
+    scheduler = AnalysisScheduler(
+        analyzer,
+        max_in_flight=int(os.environ.get("ANALYSIS_IN_FLIGHT", "4")),
+        rpm=int(os.environ.get("GEMINI_RPM", "15")),
+        tpm=int(os.environ.get("GEMINI_TPM", "1000000")),
+        retry_queue=RetryQueue(),
+    )
     
-    # 1. 各国のデータ取得
-    collectors = [JapanEgovCollector(), USFederalRegisterCollector()]
-    pdf_dir = Path("data/pdfs")
-    pdf_dir.mkdir(parents=True, exist_ok=True)
-
-    for c in collectors:
-        print(f"Collecting: {c.country_code}...")
-        data = c.fetch()
-        c.save_data(data)
-        
-        # 資料の実体(PDFなど)があればダウンロード
-        for item in data:
-            # URLがPDFを指している、または官報のようにPDF取得が期待される場合
-            if ".pdf" in item["url"].lower() or "federalregister" in item["url"]:
-                fname = f"{item['date']}_{item['country_code']}_{hash(item['url'])}.pdf"
-                target = pdf_dir / fname
-                if download_file(item["url"], target):
-                    item["pdf_local_path"] = f"data/pdfs/{fname}"
-
-    # 2. PDFのAI分析とグローバルインデックス統合
+    # 1. 収集 -> PDFダウンロード -> AI分析 をパイプラインで並行実行
+    # （ページを保存するたびに次の段へ流れるので、収集中にもダウンロード・分析が進む）
+    registry_errors = []
+    polling = None
+    if collectors is None:
+        collectors, registry_errors = load_collectors(only)
+        if not only and not poll_all:
+            polling = polling_scheduler()
+            collectors = polling.select(collectors)
+    metrics.gauge("startup.seconds", round(time.perf_counter() - STARTED_AT, 4), phase="ready")
+    print(f"  [Startup] imports {IMPORTED_AT - STARTED_AT:.3f}s, ready in {time.perf_counter() - STARTED_AT:.3f}s")
+    # 機関サイトの個別資料は1件1ファイルで保存するだけなので、パイプラインの外で先に済ませる
+    direct = [c for c in collectors if isinstance(c, EconomicDocumentCollector)]
+    collectors = [c for c in collectors if not isinstance(c, EconomicDocumentCollector)]
+    direct_errors = run_direct_collectors(direct, polling)
+    http_cache = HttpCache()
+    http_cache.evict()
+    collect_workers = int(os.environ.get("COLLECT_WORKERS", "8"))
+    download_workers = int(os.environ.get("DOWNLOAD_WORKERS", "4"))
+    engine = CollectionEngine(
+        max_workers=collect_workers,
+        per_host_concurrency=int(os.environ.get("COLLECT_PER_HOST", "2")),
+        http_cache=http_cache,
+        # 収集とPDFダウンロードで同じクライアントを使うので、接続プールは多い方に合わせる
+        pool_size=max(collect_workers, download_workers),
+    )
+    pdf_store = PDFStore(http=engine.http, max_workers=download_workers)
+    pipeline = DocumentPipeline(
+        engine, pdf_store, scheduler,
+        download_workers=download_workers,
+        queue_size=int(os.environ.get("PIPELINE_QUEUE_SIZE", "64")),
+    )
+    print(f"Collecting: {', '.join(c.country_code for c in collectors)}...")
+    results, analyses = pipeline.run(collectors)
+    engine.report(results)
+    pipeline.report()
+    engine.close()
+    if polling is not None:
+        for r in results:
+            polling.record(r.collector, r.elapsed, r.added, r.error or r.timed_out)
+        polling.save()
+    metrics.lap("collect_download_analyze")
+
+    # 2. グローバルインデックス統合（パイプラインで分析済みのものはその結果を使う）
     regions_path = Path("data/regions")
-    global_index = []
-    
-    for json_file in regions_path.rglob("*.json"):
-        with open(json_file, "r", encoding="utf-8") as f:
-            docs = json.load(f)
-            for doc in docs:
-                doc["country_code"] = json_file.stem
-                doc["region"] = json_file.parent.name
-                
-                # PDFがあればAIで分析
-                if "pdf_local_path" in doc:
-                    pdf_path = Path(doc["pdf_local_path"])
-                    if pdf_path.exists():
-                        print(f"Analyzing PDF: {pdf_path.name}")
-                        analysis = analyzer.analyze(pdf_path)
-                        doc.update(analysis)
-                
-                global_index.append(doc)
-
-    # 3. 最新順に保存
-    global_index.sort(key=lambda x: x["date"], reverse=True)
+
+    # 変更のあった国ファイルだけを読み直し、日付順のランを k-way マージする
+    def country_loader(region, country_code, store):
+        def load():
+            # 1件ずつ渡す（IncrementalIndexBuilder が列指向のバッチに詰める）
+            for doc in store.iter_all():
+                doc["country_code"] = country_code
+                doc["region"] = region
+                yield doc
+        return load
+
+    sources = [
+        IndexSource(f"{region}/{country_code}", store.files(), country_loader(region, country_code, store))
+        for region, country_code, store in iter_country_stores(regions_path)
+    ]
+    index_builder = IncrementalIndexBuilder("data/cache/index/global", summarize=summarize_docs)
+    index_builder.update(sources, full=full)
+    index_builder.report()
+    for name in ("sources", "changed", "docs", "scan_time"):
+        metrics.gauge(f"index.{name}", index_builder.stats[name])
+    # 集計は変更のあったソース分だけ再計算済み。ここでは足し合わせるだけ
+    rollup = Rollup.combine(Rollup.from_json(s) for s in index_builder.summaries())
+
+    # マージ結果は全件をメモリに載せず、2回ストリーミングで読む。
+    # 1回目: 収集元をまたいだ重複（同一URL・ほぼ同じタイトル/要約）を除き、分析対象を集める
+    duplicates = set()  # 重複として除いたドキュメントのマージ順での位置
+
+    def drop_duplicate(position, doc):
+        duplicates.add(position)
+        rollup.remove(doc)
+
+    # 分析結果と PDF は正規化URLで引く（同じ資料の別表記のURLが残っても見つかるように）
+    analysis_jobs = []
+    pdf_urls = set()
+    missing_pdfs = []  # PDFがまだ無いドキュメントのURL（新しい順）
+    for doc in iter_dedupe(index_builder.iter_docs(), on_drop=drop_duplicate):
+        key = canonicalize_url(doc["url"])
+        local_path = doc.get("pdf_local_path") or pdf_store.path_for(doc["url"])
+        # PDFがあればAI分析の対象にする（今回の分析結果がないものだけ。多くはキャッシュヒット）
+        if local_path and Path(local_path).exists():
+            if key not in pdf_urls and key not in analyses:
+                analysis_jobs.append((key, Path(local_path)))
+            pdf_urls.add(key)
+        elif wants_pdf(doc["url"]):
+            missing_pdfs.append(doc["url"])
+    metrics.gauge("index.duplicates", len(duplicates))
+
+    # 前回ダウンロードに失敗したまま収集元に出てこなくなったPDFも取り直す（.part があれば続きから）
+    retry_limit = int(os.environ.get("PDF_RETRY_LIMIT", "200"))
+    for key, pdf_path in pipeline.download_missing(missing_pdfs, limit=retry_limit).items():
+        if key not in pdf_urls and key not in analyses:
+            analysis_jobs.append((key, pdf_path))
+        pdf_urls.add(key)
+    pdf_store.save_manifest()
+    metrics.lap("index_build")
+
+    # 前回失敗したドキュメントを優先して再試行する
+    queued = {key for key, _ in scheduler.retry_queue.pending()}
+    analysis_jobs.sort(key=lambda job: job[0] not in queued)
+    print(f"Analyzing PDFs: {len(analyses)} in pipeline, {len(analysis_jobs)} remaining ({len(queued)} re-queued)")
+    analyses.update(scheduler.run(analysis_jobs))
+    scheduler.report()
+
+    analysis_cache.save()
+    analysis_cache.report()
+    analyzer.report()
+    if analyzer.text_cache:
+        analyzer.text_cache.evict()
+    metrics.lap("analyze_remaining")
+
+    # 2回目: 分析結果を反映しながら、一括ファイルと分割チャンクへ同時に書き出す
+    def enriched_docs():
+        for position, doc in enumerate(index_builder.iter_docs()):
+            if position in duplicates:
+                continue
+            if "pdf_local_path" not in doc:
+                local_path = pdf_store.path_for(doc["url"])
+                if local_path:
+                    doc["pdf_local_path"] = local_path
+            key = canonicalize_url(doc["url"])
+            if key in pdf_urls and key in analyses:
+                # AI分析で重要度・カテゴリが変わる分だけ集計を差し替える
+                rollup.remove(doc)
+                doc.update(analyses[key])
+                rollup.add(doc)
+            yield doc
+
+    # 3. 最新順に保存（マージ済みなので再ソートは不要）
     out_dir = Path("data/current")
     out_dir.mkdir(parents=True, exist_ok=True)
-    with open(out_dir / "global-index.json", "w", encoding="utf-8") as f:
-        json.dump(global_index, f, ensure_ascii=False, indent=2)
+    global_index_path = out_dir / "global-index.json"
+    # 一括ファイルはコンパクトな JSON 配列（互換用）、フロントエンド用に 月 x 地域 の分割・圧縮済みチャンクも出力。
+    # 前回の global-index.json との差分を版付きの差分フィードとして出力する（利用側は差分だけ取得すればよい）
+    with JsonArrayWriter(global_index_path) as writer, PartitionWriter(out_dir / "partitions") as partitions, \
+            DeltaPublisher(out_dir / "delta", previous=global_index_path) as delta:
+        for doc in enriched_docs():
+            writer.write(doc)
+            partitions.add(doc)
+            delta.add(doc)
+    if delta.result:
+        metrics.gauge("index.version", delta.result["version"])
+    total_docs = writer.count
+    # Insights 画面用の集計（全件を読まずにグラフを描ける）
+    update_aggregates(rollup, "global", out_dir / "aggregates.json")
+
+    # 任意: SQLite ドキュメントストアへ同期（--docstore または DOCSTORE_PATH）
+    docstore_path = docstore_path or os.environ.get("DOCSTORE_PATH")
+    if docstore_path:
+        store = DocumentStore(docstore_path)
+        store.sync(iter_json_array(global_index_path), "global")
+        store.close()
+    metrics.lap("index_write")
+
+    # 実行結果を status.json と追記専用の履歴に残す（どの段が遅かったかを後から追える）
+    errors = [f"{r.name}: {'timeout' if r.timed_out else r.error}" for r in results if not r.ok]
+    errors += registry_errors + direct_errors
+    documents_collected = sum(r.added for r in results) + sum(c.added for c in direct)
+    metrics.gauge("index.total_docs", total_docs)
+    metrics.write_status(documents_collected=documents_collected, errors=errors)
+    metrics.append_history(documents_collected=documents_collected, errors=len(errors))
 
-    print(f"Pipeline complete. Total docs: {len(global_index)}")
+    print(f"Pipeline complete. Total docs: {total_docs}")
+    return {"docs": total_docs, "analyzed": len(analyses), "pipeline": pipeline.summary()}
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="AI Document Pipeline")
+    parser.add_argument("--full", action="store_true", help="インデックスを差分ではなく全件から再構築する")
+    parser.add_argument("--docstore", nargs="?", const=DOCSTORE_DEFAULT_PATH,
+                        help="SQLite ドキュメントストアにも書き込む（パス省略時は既定の場所）")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile / tracemalloc のレポートを data/metrics/profiles に出力する（PROFILE=1 でも可）")
+    parser.add_argument("--only", help="実行する収集元を国コード（ISO3）または registry.json の ID で絞る（例: JPN,USA）")
+    parser.add_argument("--list", action="store_true", help="実行対象のコレクター（と確認予定）を表示して終了する")
+    parser.add_argument("--all", action="store_true", help="公表頻度に関係なく全ての収集元を実行する")
+    args = parser.parse_args()
+    if args.list:
+        collectors = load_collectors(args.only)[0]
+        if args.only or args.all:
+            for collector in collectors:
+                print(f"{collector.__class__.__name__}[{collector.country_code}]")
+        else:
+            polling_scheduler().select(collectors)
+        print(f"  [Startup] ready in {time.perf_counter() - STARTED_AT:.3f}s")
+    else:
+        with profile_run(args.profile):
+            main(full=args.full, docstore_path=args.docstore, only=args.only, poll_all=args.all)
@@ -1,53 +1,111 @@
 import os
+import sys
 import json
+import argparse
 from datetime import datetime
 
-def rebuild_index():
+# インポートパスの解決（indexer は標準ライブラリのみに依存）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from indexer.incremental import IncrementalIndexBuilder, IndexSource
+from indexer.aggregates import Rollup, summarize_docs, update_aggregates
+from indexer.docstore import DocumentStore, DEFAULT_PATH as DOCSTORE_DEFAULT_PATH
+from indexer.dedup import iter_dedupe
+from indexer.jsonstream import iter_json_array, write_json_array
+
+# 個別ドキュメントを含まない（または別経路で索引化される）ディレクトリ
+SKIP_DIRS = {"current", "cache", "regions", "pdfs", "metrics"}
+
+
+def load_directory(root, files):
+    """ディレクトリ内の単一ドキュメントJSONを1件ずつ読み込む"""
+    def load():
+        for file in files:
+            full_path = os.path.join(root, file)
+            try:
+                with open(full_path, "r", encoding="utf-8") as f:
+                    content = json.load(f)
+            except Exception as e:
+                print(f"Skipping {file}: {e}")
+                continue
+            # 最低限必要なフィールドを保証
+            if isinstance(content, dict) and "title" in content:
+                yield content
+    return load
+
+
+def collect_sources(data_dir):
+    """ディレクトリ単位で IndexSource を作る（変更のないディレクトリは読み直さない）"""
+    sources = []
+    for root, dirs, files in os.walk(data_dir):
+        if root == data_dir:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        # 自身とステータスファイルは除外
+        json_files = sorted(
+            f for f in files
+            if f.endswith(".json") and f not in ["master_index.json", "status.json"]
+        )
+        if not json_files:
+            continue
+        source_id = os.path.relpath(root, data_dir).replace(os.sep, "/")
+        paths = [os.path.join(root, f) for f in json_files]
+        sources.append(IndexSource(source_id, paths, load_directory(root, json_files)))
+    return sources
+
+
+def rebuild_index(full=False, docstore_path=None):
     """
     クラスや外部ライブラリに依存せず、dataフォルダ内の全JSONをスキャンして
     master_index.json を再構築する独立スクリプト。
+    変更のあったディレクトリだけを読み直し、日付順のランをマージする。
     """
     print("--- Index Rebuild Started ---")
-    
+
     # 実行場所に関わらずリポジトリのルートにあるdataフォルダを探す
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     data_dir = os.path.join(base_dir, "data")
     index_path = os.path.join(data_dir, "master_index.json")
-    
+
     print(f"Target Directory: {data_dir}")
-    
+
     if not os.path.exists(data_dir):
         print(f"Error: Directory {data_dir} does not exist.")
         return
 
-    all_items = []
-    
-    # 再帰的に全ファイルを走査
-    for root, _, files in os.walk(data_dir):
-        for file in files:
-            # 自身とステータスファイルは除外
-            if file.endswith(".json") and file not in ["master_index.json", "status.json"]:
-                full_path = os.path.join(root, file)
-                try:
-                    with open(full_path, "r", encoding="utf-8") as f:
-                        content = json.load(f)
-                        if isinstance(content, dict):
-                            # 最低限必要なフィールドを保証
-                            if "title" in content:
-                                all_items.append(content)
-                except Exception as e:
-                    print(f"Skipping {file}: {e}")
-
-    # 日付でソート（日付がないものは一番下に）
-    all_items.sort(key=lambda x: str(x.get("date", "0000-00-00")), reverse=True)
-
-    # 書き出し
+    builder = IncrementalIndexBuilder(os.path.join(data_dir, "cache", "index", "master"), summarize=summarize_docs)
+    builder.update(collect_sources(data_dir), full=full)
+    builder.report()
+    # 集計（変更のあったディレクトリ分だけ再計算済み）
+    rollup = Rollup.combine(Rollup.from_json(s) for s in builder.summaries())
+
+    # 書き出し（マージ結果を1件ずつコンパクトな JSON 配列へ流す。全件をメモリに載せない）
+    # 別ファイル・別IDで保存された同じ資料は1件にまとめる（新しい日付のものを残す）
     try:
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(all_items, f, ensure_ascii=False, indent=4)
-        print(f"--- [Success] master_index.json updated with {len(all_items)} items ---")
+        count = write_json_array(index_path, iter_dedupe(builder.iter_docs(), on_drop=lambda position, doc: rollup.remove(doc)))
+        print(f"--- [Success] master_index.json updated with {count} items ---")
     except Exception as e:
         print(f"Critical Error saving index: {e}")
 
+    try:
+        update_aggregates(rollup, "master", os.path.join(data_dir, "current", "aggregates.json"))
+    except Exception as e:
+        print(f"Aggregates update failed: {e}")
+
+    # 任意: SQLite ドキュメントストアへ同期（--docstore または DOCSTORE_PATH）
+    docstore_path = docstore_path or os.environ.get("DOCSTORE_PATH")
+    if docstore_path:
+        if not os.path.isabs(docstore_path):
+            docstore_path = os.path.join(base_dir, docstore_path)
+        try:
+            store = DocumentStore(docstore_path)
+            store.sync(iter_json_array(index_path), "master")
+            store.close()
+        except Exception as e:
+            print(f"DocStore sync failed: {e}")
+
 if __name__ == "__main__":
-    rebuild_index()
+    parser = argparse.ArgumentParser(description="Rebuild data/master_index.json")
+    parser.add_argument("--full", action="store_true", help="マニフェストを無視して全件から再構築する")
+    parser.add_argument("--docstore", nargs="?", const=DOCSTORE_DEFAULT_PATH,
+                        help="SQLite ドキュメントストアにも書き込む（パス省略時は既定の場所）")
+    args = parser.parse_args()
+    rebuild_index(full=args.full, docstore_path=args.docstore)
@@ -0,0 +1,74 @@
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from collectors.base_collector import BaseCollector
+from collectors.engine import PooledHttpClient
+from collectors.http_cache import HttpCache
+
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        body = b'{"items": []}'
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FeedCollector(BaseCollector):
+    def fetch(self):
+        return []
+
+
+class ConditionalGetTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/feed"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = PooledHttpClient(per_host_concurrency=1)
+        self.collector = FeedCollector("Asia", "JPN")
+        self.collector.http = self.client
+        self.collector.http_cache = HttpCache(self.tmp.name)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_streamed_304_releases_host_slot(self):
+        response = self.collector.conditional_get(self.url, stream=True, timeout=5)
+        response.close()
+        self.collector.commit_validators()
+
+        # 枠が1つしかないので、304 の応答を閉じなければ2回目で止まる
+        results = []
+        worker = threading.Thread(target=lambda: results.extend(
+            self.collector.conditional_get(self.url, stream=True, timeout=5) for _ in range(3)), daemon=True)
+        worker.start()
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive(), "host slot leaked on 304")
+        self.assertEqual(results, [None, None, None])
+        self.assertTrue(self.collector.not_modified)
+
+        limiter = self.client.limiter(f"127.0.0.1:{self.server.server_port}")
+        self.assertTrue(limiter._semaphore.acquire(blocking=False))
+        limiter.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
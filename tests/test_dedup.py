@@ -0,0 +1,62 @@
+import unittest
+
+from indexer.dedup import dedupe
+
+SUMMARY = ("The ministry revised the fiscal outlook for the coming year, raising the deficit estimate "
+           "and announcing new spending on regional infrastructure and disaster prevention.")
+
+
+def doc(url, title, summary="", date="2024-05-01", organization="FR", source=None):
+    d = {"url": url, "title": title, "summary": summary, "date": date, "organization": organization}
+    if source:
+        d["source"] = source
+    return d
+
+
+class DeduplicatorTest(unittest.TestCase):
+    def test_boilerplate_titles_from_one_source_are_kept(self):
+        # 定型タイトルで要約のない別々の告示は落とさない
+        docs = [
+            doc(f"https://www.federalregister.gov/documents/2024/05/0{i}/{n}", title, date=f"2024-05-0{i}")
+            for i, (n, title) in enumerate([
+                ("2024-1", "Sunshine Act Meetings"),
+                ("2024-2", "Sunshine Act Meetings"),
+                ("2024-3", "Privacy Act of 1974; System of Records"),
+                ("2024-4", "Privacy Act of 1974; System of Records"),
+                ("2024-5", "Airworthiness Directives; The Boeing Company Airplanes"),
+                ("2024-6", "Airworthiness Directives; The Boeing Company Airplanes"),
+            ], 1)
+        ]
+        kept, dropped, _ = dedupe(docs)
+        self.assertEqual(len(kept), 6)
+        self.assertEqual(dropped, [])
+
+    def test_same_source_with_summary_is_not_near_duplicate(self):
+        docs = [doc("https://mof.go.jp/a.pdf", "Fiscal outlook", SUMMARY),
+                doc("https://mof.go.jp/b.pdf", "Fiscal outlook", SUMMARY)]
+        kept, _, _ = dedupe(docs)
+        self.assertEqual(len(kept), 2)
+
+    def test_different_sources_need_matching_date_or_organization(self):
+        docs = [doc("https://mof.go.jp/a.pdf", "Fiscal outlook", SUMMARY, date="2024-05-01", organization="MOF"),
+                doc("https://mirror.example/a.pdf", "Fiscal outlook", SUMMARY, date="2023-01-01", organization="Mirror")]
+        kept, _, _ = dedupe(docs)
+        self.assertEqual(len(kept), 2)
+
+    def test_republished_document_across_sources_is_dropped(self):
+        docs = [doc("https://mof.go.jp/a.pdf", "Fiscal outlook", SUMMARY, organization="MOF"),
+                doc("https://mirror.example/a.pdf", "Fiscal Outlook", SUMMARY, organization="Mirror")]
+        kept, dropped, stats = dedupe(docs)
+        self.assertEqual(kept, docs[:1])
+        self.assertEqual(stats["near_duplicates"], 1)
+
+    def test_canonical_url_duplicates_are_dropped(self):
+        docs = [doc("https://www.federalregister.gov/d/1?utm_source=x", "Sunshine Act Meetings"),
+                doc("http://federalregister.gov/d/1/", "Sunshine Act Meetings")]
+        kept, _, stats = dedupe(docs)
+        self.assertEqual(len(kept), 1)
+        self.assertEqual(stats["url_duplicates"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
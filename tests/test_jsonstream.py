@@ -0,0 +1,80 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from indexer.jsonstream import iter_documents, iter_json_array, write_json_array, write_ndjson
+
+DOCS = [
+    1234567.891,
+    2.5e10,
+    -17,
+    {"title": "a ] b, c", "summary": '[x], "quoted" \\ ] ,', "n": 0.125, "ok": True, "none": None},
+    ["]", ",", "[", 3e-7],
+    "日本語のタイトル ]",
+    False,
+    {"nested": {"list": [1, 2.75, {"k": "v,]"}]}, "date": "2024-01-01"},
+]
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = self.dir / name
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_numbers_split_at_chunk_boundaries(self):
+        path = self.write("numbers.json", "[1234567.891, 2.5e10]")
+        for chunk_size in range(1, 25):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_array(path, chunk_size=chunk_size)), [1234567.891, 2.5e10])
+
+    def test_every_chunk_size(self):
+        for name, text in (("compact.json", json.dumps(DOCS, ensure_ascii=False, separators=(",", ":"))),
+                           ("indented.json", json.dumps(DOCS, ensure_ascii=False, indent=2))):
+            path = self.write(name, text)
+            for chunk_size in range(1, len(text) + 2):
+                with self.subTest(name=name, chunk_size=chunk_size):
+                    self.assertEqual(list(iter_json_array(path, chunk_size=chunk_size)), DOCS)
+
+    def test_written_array_round_trips(self):
+        path = self.dir / "docs.json"
+        self.assertEqual(write_json_array(path, iter(DOCS)), len(DOCS))
+        self.assertEqual(json.loads(path.read_text(encoding="utf-8")), DOCS)
+        self.assertEqual(list(iter_documents(path)), DOCS)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(self.write("empty.json", " [ ] "), chunk_size=1)), [])
+
+    def test_ndjson(self):
+        path = self.dir / "docs.jsonl"
+        self.assertEqual(write_ndjson(path, DOCS), len(DOCS))
+        self.assertEqual(list(iter_documents(path)), DOCS)
+
+    def test_malformed_element_fails_fast(self):
+        path = self.write("broken.json", '[{"a": 1}, {"a": tru}, {"a": 3}]')
+        for chunk_size in (1, 4, 64):
+            with self.subTest(chunk_size=chunk_size):
+                docs = iter_json_array(path, chunk_size=chunk_size)
+                self.assertEqual(next(docs), {"a": 1})
+                with self.assertRaises(json.JSONDecodeError):
+                    next(docs)
+
+    def test_unterminated_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self.write("cut.json", "[1, 2"), chunk_size=2))
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self.write("object.json", '{"a": 1}')))
+
+
+if __name__ == "__main__":
+    unittest.main()